@@ -15,6 +15,8 @@ load_dotenv()
 BASE_DIR = Path(__file__).resolve().parent
 LOGS_DIR = BASE_DIR / "logs"
 LOGS_DIR.mkdir(exist_ok=True)
+DATA_DIR = Path(os.getenv("DATA_DIR", BASE_DIR / "data"))
+DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 # ============================================
 # RUTAS UNC
@@ -24,6 +26,17 @@ SOURCE_PATH = os.getenv(
 DEST_PATH = os.getenv(
     "DEST_PATH", r"\\dataserver\Comunes\MARKETING\01.CATALOGOS SELK")
 
+# Descubrimiento de catálogos: recorrer subcarpetas y procesar solo archivos
+# nuevos o modificados respecto al último recorrido
+DISCOVERY_RECURSIVE = os.getenv("DISCOVERY_RECURSIVE", "false").lower() == "true"
+DISCOVERY_CHANGED_ONLY = os.getenv("DISCOVERY_CHANGED_ONLY", "false").lower() == "true"
+DISCOVERY_SNAPSHOT_FILE = Path(os.getenv(
+    "DISCOVERY_SNAPSHOT_FILE", DATA_DIR / "discovery_snapshot.json"))
+
+# Copia local: comparar por hash (además del tamaño) en lugar de la fecha de
+# modificación para decidir si el destino ya es idéntico
+LOCAL_COPY_VERIFY_HASH = os.getenv("LOCAL_COPY_VERIFY_HASH", "false").lower() == "true"
+
 # ============================================
 # GOOGLE DRIVE (Service Account - Sin intervención del usuario)
 # ============================================
@@ -48,6 +61,26 @@ MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 MONGO_DB = os.getenv("MONGO_DB", "catalog_db")
 MONGO_COLLECTION = os.getenv("MONGO_COLLECTION", "catalog_operations")
 
+# Pool de conexiones y reconexión en segundo plano
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 20))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 2))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000))
+MONGO_RECONNECT_INTERVAL = int(os.getenv("MONGO_RECONNECT_INTERVAL", 5))  # segundos
+MONGO_RECONNECT_MAX_INTERVAL = int(os.getenv("MONGO_RECONNECT_MAX_INTERVAL", 300))  # segundos
+
+# Métricas de ejecución (colección time-series con expiración TTL)
+MONGO_METRICS_COLLECTION = os.getenv("MONGO_METRICS_COLLECTION", "catalog_metrics")
+METRICS_RETENTION_DAYS = int(os.getenv("METRICS_RETENTION_DAYS", 90))
+
+# Diario local (SQLite) con las operaciones pendientes de aplicar en MongoDB
+JOURNAL_FILE = Path(os.getenv("JOURNAL_FILE", DATA_DIR / "journal.db"))
+JOURNAL_RETENTION_DAYS = int(os.getenv("JOURNAL_RETENTION_DAYS", 7))
+
+# Puntos de control (SQLite) de las etapas completadas, para reanudar con --resume
+CHECKPOINT_FILE = Path(os.getenv("CHECKPOINT_FILE", DATA_DIR / "checkpoints.db"))
+CHECKPOINT_RETENTION_DAYS = int(os.getenv("CHECKPOINT_RETENTION_DAYS", 7))
+
 # ============================================
 # EMAIL NOTIFICATIONS (SMTP)
 # ============================================
@@ -70,15 +103,100 @@ SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL", "")
 SLACK_CHANNEL = os.getenv("SLACK_CHANNEL", "#catalog-publication")
 SLACK_USERNAME = os.getenv("SLACK_USERNAME", "Catalog-Bot")
 
+# Agrupa las alertas de cada ejecución en un resumen por severidad
+NOTIFICATION_DIGEST_ENABLED = os.getenv(
+    "NOTIFICATION_DIGEST_ENABLED", "true").lower() == "true"
+
+# Deduplicación de alertas: repeticiones de la misma alerta (etapa, error, archivo)
+# dentro del enfriamiento se suprimen y se resumen en el siguiente envío
+NOTIFICATION_COOLDOWN_MINUTES = int(os.getenv("NOTIFICATION_COOLDOWN_MINUTES", 120))
+ALERT_STATE_FILE = Path(os.getenv("ALERT_STATE_FILE", DATA_DIR / "alert_state.json"))
+
+# Bandeja de salida persistente: reintentos con espera exponencial hasta entregar
+NOTIFICATION_OUTBOX_FILE = Path(os.getenv("NOTIFICATION_OUTBOX_FILE", DATA_DIR / "outbox.db"))
+NOTIFICATION_OUTBOX_INTERVAL = int(os.getenv("NOTIFICATION_OUTBOX_INTERVAL", 30))  # segundos
+NOTIFICATION_RETRY_BASE_SECONDS = int(os.getenv("NOTIFICATION_RETRY_BASE_SECONDS", 30))
+NOTIFICATION_RETRY_MAX_SECONDS = int(os.getenv("NOTIFICATION_RETRY_MAX_SECONDS", 3600))
+NOTIFICATION_OUTBOX_RETENTION_DAYS = int(os.getenv("NOTIFICATION_OUTBOX_RETENTION_DAYS", 7))
+
+# Plazo máximo (segundos) para enviar las notificaciones pendientes al detener el proceso
+NOTIFICATION_FLUSH_TIMEOUT = int(os.getenv("NOTIFICATION_FLUSH_TIMEOUT", 60))
+
 # ============================================
 # SCHEDULE
 # ============================================
 SCHEDULE_TIME = int(os.getenv("SCHEDULE_TIME", 15))
 
+# ============================================
+# MÉTRICAS (Prometheus)
+# ============================================
+# Endpoint HTTP /metrics en modo programado (puerto 0 lo deshabilita)
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9464))
+# Solo local por defecto; 0.0.0.0 para que Prometheus lo lea desde otra máquina
+METRICS_BIND_ADDRESS = os.getenv("METRICS_BIND_ADDRESS", "127.0.0.1")
+# Carpeta del textfile collector de node_exporter para --once (vacía lo deshabilita)
+METRICS_TEXTFILE_DIR = os.getenv("METRICS_TEXTFILE_DIR", "")
+
+# ============================================
+# CIRCUIT BREAKERS
+# ============================================
+# Fallos consecutivos de un destino (local, Drive, FTP, MongoDB, SMTP, Slack) que
+# abren su circuito: el destino se omite hasta la siguiente ejecución
+CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+CIRCUIT_BREAKER_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", 3))
+
+# Preflight: antes de procesar catálogos se prueban todos los destinos en paralelo;
+# los que no responden dentro de su plazo (segundos) se omiten en la ejecución
+PREFLIGHT_ENABLED = os.getenv("PREFLIGHT_ENABLED", "true").lower() == "true"
+PREFLIGHT_TIMEOUTS = {
+    "default": float(os.getenv("PREFLIGHT_TIMEOUT", 10)),
+    "local": float(os.getenv("PREFLIGHT_TIMEOUT_LOCAL", 5)),
+    "drive": float(os.getenv("PREFLIGHT_TIMEOUT_DRIVE", 10)),
+    "ftp": float(os.getenv("PREFLIGHT_TIMEOUT_FTP", 10)),
+    "mongo": float(os.getenv("PREFLIGHT_TIMEOUT_MONGO", 6)),
+    "smtp": float(os.getenv("PREFLIGHT_TIMEOUT_SMTP", 10)),
+}
+
+# ============================================
+# TRAZAS DE EJECUCIÓN
+# ============================================
+# Traza por ejecución con los spans de cada etapa y llamada externa
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").lower() == "true"
+# Dónde se guarda: "file", "mongo" o "both"
+TRACE_STORE = os.getenv("TRACE_STORE", "file").lower()
+# Formato del archivo: "chrome" (chrome://tracing, Perfetto) u "otlp" (OpenTelemetry JSON)
+TRACE_FORMAT = os.getenv("TRACE_FORMAT", "chrome").lower()
+TRACE_DIR = Path(os.getenv("TRACE_DIR", LOGS_DIR / "traces"))
+MONGO_TRACES_COLLECTION = os.getenv("MONGO_TRACES_COLLECTION", "catalog_traces")
+
+# ============================================
+# MEMORIA
+# ============================================
+# Presupuesto de memoria residente (MB): el siguiente catálogo espera si no cabe.
+# Debe quedar por debajo de max_memory_restart de PM2 (500M). 0 lo deshabilita
+MEMORY_BUDGET_MB = int(os.getenv("MEMORY_BUDGET_MB", 400))
+# Copias en memoria de cada archivo durante su procesamiento (lectura + subidas)
+MEMORY_COPY_FACTOR = float(os.getenv("MEMORY_COPY_FACTOR", 3))
+MEMORY_ADMISSION_TIMEOUT = int(os.getenv("MEMORY_ADMISSION_TIMEOUT", 60))  # segundos
+MEMORY_SAMPLE_INTERVAL = float(os.getenv("MEMORY_SAMPLE_INTERVAL", 0.2))  # segundos
+
+# ============================================
+# LIMPIEZA
+# ============================================
+# Eliminaciones concurrentes de archivos origen tras la publicación
+CLEANUP_MAX_WORKERS = int(os.getenv("CLEANUP_MAX_WORKERS", 4))
+
 # ============================================
 # LOGGING
 # ============================================
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Días de logs rotados que se conservan (el archivo rota a medianoche)
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", 30))
+# Llamadas externas o etapas que superan este umbral se registran como lentas
+SLOW_CALL_THRESHOLD_MS = int(os.getenv("SLOW_CALL_THRESHOLD_MS", 10000))
+# Formato del archivo de log: "text" o "json" (una línea JSON por registro con
+# execution_id, fileName, stage, duration_ms y bytes)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
 
 # ============================================
 # MAPEO DE NOMBRES DE CATALOGOS
@@ -114,6 +232,18 @@ CATALOG_NAME_MAPPING = {
     "PEQUEÑO MATERIAL CARPINTERIA.pdf": "PEQUENIO_MATERIAL_CARPINTERIA.pdf",
 }
 
+# Mapeo externo (recargado sin reiniciar cuando cambia): archivo JSON/YAML o
+# colección de MongoDB. Si no se configura se usa CATALOG_NAME_MAPPING
+CATALOG_MAPPING_FILE = os.getenv("CATALOG_MAPPING_FILE", "")
+CATALOG_MAPPING_COLLECTION = os.getenv("CATALOG_MAPPING_COLLECTION", "")
+# Espera máxima a la conexión perezosa de MongoDB antes de recurrir al mapeo actual
+CATALOG_MAPPING_MONGO_TIMEOUT = float(os.getenv("CATALOG_MAPPING_MONGO_TIMEOUT", 6))  # segundos
+
+# Nombres con erratas: aceptar la entrada del mapeo más parecida (similitud de
+# trigramas) cuando supera el umbral; si está deshabilitado solo se sugiere
+CATALOG_NAME_FUZZY_MATCH = os.getenv("CATALOG_NAME_FUZZY_MATCH", "false").lower() == "true"
+CATALOG_NAME_SIMILARITY_THRESHOLD = float(os.getenv("CATALOG_NAME_SIMILARITY_THRESHOLD", 0.8))
+
 
 def validate_config():
     """Valida que las configuraciones mínimas estén presentes"""
@@ -3,6 +3,8 @@ module.exports = {
     {
       name: 'catalog-publication',
       script: 'main.py',
+      // Tras un reinicio, reanudar la ejecución interrumpida sin repetir subidas
+      args: '--resume',
       // Usar pythonw.exe (sin ventana visible) del entorno virtual (.venv)
       interpreter: '.venv/Scripts/pythonw.exe',
       interpreter_args: '',
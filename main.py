@@ -2,29 +2,51 @@
 Script principal para la publicación automatizada de catálogos
 Migración del flujo n8n a Python
 """
-import sys
+import argparse
+import contextvars
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import schedule
 
-from config import SCHEDULE_TIME, SOURCE_PATH, validate_config
-from utils.logger import logger
-from utils.name_mapper import normalize_catalog_name
+from config import (
+    SCHEDULE_TIME, CLEANUP_MAX_WORKERS, NOTIFICATION_FLUSH_TIMEOUT,
+    NOTIFICATION_OUTBOX_INTERVAL, PREFLIGHT_ENABLED, TRACE_STORE, validate_config
+)
+from utils.logger import logger, bind_log_context, reset_log_context, log_context
+from utils.circuit_breaker import circuit_breakers
+from utils.instrumentation import instrumentation
+from utils.memory import MemoryBudget, MemoryMonitor, get_memory_usage
+from utils.profiler import RunProfiler
+from utils.tracing import Trace, tracer
+from utils.name_mapper import normalize_catalog_name, suggest_catalog_name
 from services.file_service import FileService
 from services.drive_service import DriveService
 from services.ftp_service import FTPService
 from services.mongo_service import MongoService
-from services.notifications import NotificationManager, run_notification_sync
+from services.checkpoint_store import CheckpointStore
+from services.mapping_service import MappingService
+from services.notifications import NotificationManager, NotificationDispatcher
+from services.metrics_exporter import MetricsExporter
+from services.preflight import PreflightChecker
 
 
 class CatalogPublisher:
     """Orquesta el proceso de publicación de catálogos"""
 
-    def __init__(self):
-        """Inicializa todos los servicios"""
+    def __init__(self, profiler: Optional[RunProfiler] = None, resume: bool = False):
+        """
+        Inicializa todos los servicios
+
+        Args:
+            profiler: Perfilador de ejecuciones (--profile)
+            resume: Reanudar en la primera ejecución la última ejecución interrumpida (--resume)
+        """
+        self.profiler = profiler
+        self.resume = resume
         logger.info("=" * 80)
         logger.info("🚀 Iniciando CatalogPublisher")
         logger.info("=" * 80)
@@ -39,232 +61,552 @@ class CatalogPublisher:
         self.drive_service = DriveService()
         self.ftp_service = FTPService()
         self.mongo_service = MongoService()
+        self.checkpoints = CheckpointStore()
+        self.mapping_service = MappingService(self.mongo_service)
+        self.mapping_service.refresh()
         self.notifier = NotificationManager()
+        self.dispatcher = NotificationDispatcher()
+        self.dispatcher.schedule_periodic(
+            self.notifier.process_outbox, NOTIFICATION_OUTBOX_INTERVAL)
+        self.preflight = self._build_preflight()
+        self.memory_monitor = MemoryMonitor()
+        self.memory_monitor.start()
+        self.memory_budget = MemoryBudget()
+        self.metrics_exporter = MetricsExporter(gauges={
+            'resident_memory_bytes': (
+                "Memoria residente del proceso", lambda: get_memory_usage()['rss']),
+            'circuit_breakers_open': (
+                "Circuit breakers abiertos", circuit_breakers.open_count),
+            'notification_queue_depth': (
+                "Notificaciones encoladas o en curso en el despachador", self.dispatcher.pending),
+            'notification_outbox_pending': (
+                "Notificaciones pendientes en la bandeja de salida",
+                self.notifier.outbox.pending_count),
+            'mongo_journal_pending': (
+                "Operaciones del diario local pendientes de aplicar en MongoDB",
+                self.mongo_service.journal.pending_count)
+        })
 
         logger.info("✅ Servicios inicializados")
 
-    def process_catalog(self, catalog: Dict, execution_id: str) -> Dict:
+    def _build_preflight(self) -> PreflightChecker:
+        """Registra la comprobación previa de cada destino"""
+        preflight = PreflightChecker()
+        preflight.register('local', lambda timeout: self.file_service.check_destination())
+        preflight.register('drive', self.drive_service.test_connection)
+        preflight.register('ftp', self.ftp_service.test_connection)
+        preflight.register('mongo', self.mongo_service.ping)
+        if self.notifier.email_config['enabled']:
+            preflight.register('smtp', lambda timeout: self.dispatcher.run_sync(
+                self.notifier.check_smtp(), timeout))
+        return preflight
+
+    def shutdown(self):
+        """Envía las notificaciones pendientes y libera los servicios"""
+        pending = self.dispatcher.pending()
+        if pending:
+            logger.info("📤 Enviando %s notificaciones pendientes...", pending)
+        self.dispatcher.submit(self.notifier.process_outbox())
+        self.dispatcher.submit(self.notifier.close())
+        self.dispatcher.shutdown(NOTIFICATION_FLUSH_TIMEOUT)
+        self.memory_monitor.stop()
+        self.preflight.close()
+        self.checkpoints.close()
+        self.mongo_service.close()
+
+    def _register_alert(self, title: str, message: str, details: Dict = None,
+                        stage: str = None, error_class: str = None) -> Optional[Dict]:
+        """
+        Aplica la deduplicación entre ejecuciones a una alerta
+
+        Returns:
+            Detalles a notificar (con las repeticiones suprimidas) o None si se suprime
+        """
+        details = dict(details or {})
+        repeats = self.notifier.register_alert(
+            stage or title, error_class or message, details.get('archivo'))
+        if repeats is None:
+            logger.info("🔕 Alerta repetida suprimida: %s", title)
+            return None
+        if repeats:
+            details['repeticiones_suprimidas'] = repeats
+        return details
+
+    def _notify_critical(self, title: str, message: str, details: Dict = None, fatal: bool = False,
+                         stage: str = None, error_class: str = None):
+        """
+        Notifica un error crítico: se agrupa en el resumen de la ejecución
+        salvo que sea fatal o el modo resumen esté desactivado
+        """
+        details = self._register_alert(title, message, details, stage, error_class)
+        if details is None:
+            return
+        if not fatal and self.notifier.collect('critical', title, message, details):
+            return
+        self.dispatcher.submit(
+            self.notifier.notify_critical_error(title, message, details))
+
+    def _notify_warning(self, title: str, message: str, details: Dict = None,
+                        stage: str = None, error_class: str = None):
+        """Notifica una advertencia (agrupada en el resumen si está activo)"""
+        details = self._register_alert(title, message, details, stage, error_class)
+        if details is None:
+            return
+        if self.notifier.collect('warning', title, message, details):
+            return
+        self.dispatcher.submit(
+            self.notifier.notify_warning(title, message, details))
+
+    def _resolve_alerts(self, stage: str, file_name: str = None):
+        """Da por resueltas las alertas activas de una etapa tras completarse"""
+        for entry in self.notifier.resolve_alerts(stage, file_name):
+            title = f"Resuelto: {entry['stage']}"
+            message = f"{entry['errorClass']} ya no se produce"
+            details = {'archivo': entry['fileName']} if entry['fileName'] else {}
+            if not self.notifier.collect('resolved', title, message, details):
+                self.dispatcher.submit(
+                    self.notifier.notify_success(title, message))
+
+    def _flush_digest(self):
+        """Envía el resumen agrupado de alertas de la ejecución"""
+        events = self.notifier.take_digest()
+        if any(events.values()):
+            self.dispatcher.submit(self.notifier.send_digest(events))
+
+    @staticmethod
+    def _stage_metrics(stage: str, success: bool, duration_ms: float, size: int) -> Dict:
+        """Construye las métricas de una etapa para el resultado del catálogo"""
+        instrumentation.record(f"stage.{stage}", duration_ms)
+        instrumentation.count(f"stage.{stage}.{'success' if success else 'errors'}")
+        tracer.set_attributes(bytes=size if success else 0)
+        if not success:
+            tracer.set_error(f"Etapa {stage} fallida")
+        logger.info(
+            "⏱️  Etapa %s en %.0f ms", 'completada' if success else 'fallida', duration_ms,
+            extra={'duration_ms': round(duration_ms, 1), 'bytes': size if success else 0})
+        return {
+            'outcome': 'success' if success else 'error',
+            'durationMs': duration_ms,
+            'bytes': size if success else 0
+        }
+
+    @staticmethod
+    def _new_result(catalog: Dict) -> Dict:
+        """Resultado vacío (ninguna etapa completada) de un catálogo"""
+        return {
+            'fileName': catalog['fileName'],
+            'relPath': catalog['relPath'],
+            'fullPath': catalog['fullPath'],
+            'local': False,
+            'drive': False,
+            'ftp': False,
+            'stages': {},
+            'errors': []
+        }
+
+    def _resume_stage(self, result: Dict, stage: str, checkpoint: Dict):
+        """Da por completada una etapa hecha en la ejecución interrumpida"""
+        logger.info(
+            "⏭️  Etapa %s ya completada con este contenido en "
+            "%s (%s), se omite", stage, checkpoint['executionId'], checkpoint['completedAt'])
+        result[stage] = True
+        result['stages'][stage] = {
+            'outcome': 'resumed', 'durationMs': 0, 'bytes': 0}
+        instrumentation.count(f"stage.{stage}.resumed")
+        tracer.set_attributes(resumed=True)
+
+    def process_catalog(self, catalog: Dict, execution_id: str, resume: bool = False) -> Dict:
         """
         Procesa un catálogo individual: copia local, sube a Drive y FTP
 
+        Cada etapa completada queda registrada por archivo y SHA-256; al
+        reanudar se omiten las que ya se completaron con el mismo contenido.
+
         Args:
             catalog: Información del catálogo
             execution_id: ID de ejecución
+            resume: Omitir las etapas completadas en la ejecución interrumpida
 
         Returns:
             Diccionario con el resultado del procesamiento
         """
         file_name = catalog['fileName']
+        # Identifica el archivo en MongoDB y en las alertas (único también en subcarpetas)
+        file_key = catalog['relPath']
         full_path = catalog['fullPath']
 
-        logger.info(f"\n{'='*60}")
-        logger.info(f"📄 Procesando: {file_name}")
-        logger.info(f"{'='*60}")
+        logger.info("\n" + "=" * 60)
+        logger.info("📄 Procesando: %s", file_key)
+        logger.info("=" * 60)
 
-        result = {
-            'fileName': file_name,
-            'local': False,
-            'drive': False,
-            'ftp': False,
-            'errors': []
-        }
+        result = self._new_result(catalog)
 
         # 1. Normalizar nombre del archivo
+        self._enter_stage("normalizacion")
         normalized_name, found_in_mapping = normalize_catalog_name(file_name)
 
         if not found_in_mapping:
             error_msg = f"No se encontró mapeo para el archivo: {file_name}"
-            logger.error(f"❌ {error_msg}")
+            logger.error("❌ %s", error_msg)
             result['errors'].append(error_msg)
-            run_notification_sync(
-                self.notifier.notify_critical_error(
-                    "Normalización de nombre",
-                    error_msg,
-                    {"archivo": file_name}
-                )
+            tracer.set_error(error_msg)
+            details = {"archivo": file_key}
+            suggestion = suggest_catalog_name(file_name)
+            if suggestion:
+                details["sugerencia"] = suggestion
+            self._notify_critical(
+                "Normalización de nombre",
+                error_msg,
+                details,
+                stage="normalizacion"
             )
             return result
 
-        logger.info(f"📝 Nombre normalizado: {normalized_name}")
+        logger.info("📝 Nombre normalizado: %s", normalized_name)
+        self._resolve_alerts("normalizacion", file_key)
 
-        # 2. Leer contenido del archivo
-        file_content = self.file_service.read_file(full_path)
-        if not file_content:
+        # 2. Leer contenido del archivo (los checksums se calculan en la misma pasada)
+        self._enter_stage("lectura")
+        with instrumentation.timer('stage.lectura'):
+            read = self.file_service.read_file_with_checksums(full_path)
+        if not read or not read['content']:
             error_msg = f"No se pudo leer el archivo: {full_path}"
-            logger.error(f"❌ {error_msg}")
+            logger.error("❌ %s", error_msg)
             result['errors'].append(error_msg)
+            tracer.set_error(error_msg)
             return result
 
+        file_content = read['content']
+        result['checksums'] = {
+            'size': read['size'], 'sha256': read['sha256'], 'md5': read['md5']}
+        self.mongo_service.update_stage(
+            execution_id, file_key, "lectura", "success", result['checksums'])
+
+        # Al reanudar, se omiten las etapas ya completadas con este mismo contenido
+        completed = self.checkpoints.completed_stages(full_path, read['sha256']) if resume else {}
+        if completed.get('ftp', {}).get('details', {}).get('normalized_name') not in (None, normalized_name):
+            # El mapeo cambió desde la ejecución interrumpida: volver a subir con el nombre actual
+            completed.pop('ftp')
+
         # 3. Copiar a carpeta local de destino
-        logger.info("📋 Paso 1/3: Copiando a carpeta local...")
-        if self.file_service.copy_to_destination(full_path, file_name):
-            result['local'] = True
-            self.mongo_service.insert_log(
-                execution_id, file_name, "local", "success",
-                {'source': full_path, 'action': 'copy'}
-            )
+        self._enter_stage("local")
+        if 'local' in completed:
+            self._resume_stage(result, 'local', completed['local'])
         else:
-            error_msg = f"Error al copiar archivo localmente"
-            result['errors'].append(error_msg)
-            self.mongo_service.insert_log(
-                execution_id, file_name, "local", "error",
-                {'error': error_msg}
-            )
-            run_notification_sync(
-                self.notifier.notify_critical_error(
+            logger.info("📋 Paso 1/3: Copiando a carpeta local...")
+            stage_start = time.perf_counter()
+            copy_result = self.file_service.copy_to_destination(
+                full_path, file_name, source_sha256=read['sha256'], content=file_content)
+            duration_ms = (time.perf_counter() - stage_start) * 1000
+            result['stages']['local'] = self._stage_metrics(
+                'local', copy_result['success'], duration_ms, copy_result['bytes'])
+            if copy_result['success']:
+                result['local'] = True
+                self._resolve_alerts("local", file_key)
+                self.mongo_service.update_stage(
+                    execution_id, file_key, "local", "success",
+                    {'source': full_path, 'action': copy_result['action'],
+                        'throughputBps': copy_result['throughputBps']}, duration_ms
+                )
+                self.checkpoints.mark_stage(
+                    execution_id, full_path, read['sha256'], 'local',
+                    {'action': copy_result['action']})
+            else:
+                error_msg = f"Error al copiar archivo localmente"
+                if copy_result.get('error') == 'circuit_open':
+                    error_msg = f"Copia local omitida: circuito de la carpeta destino abierto"
+                result['errors'].append(error_msg)
+                self.mongo_service.update_stage(
+                    execution_id, file_key, "local", "error",
+                    {'error': error_msg}, duration_ms
+                )
+                self._notify_critical(
                     "Copia local",
                     error_msg,
-                    {"archivo": file_name}
+                    {"archivo": file_key},
+                    stage="local"
                 )
-            )
 
         # 4. Subir/actualizar en Google Drive
-        logger.info("☁️  Paso 2/3: Subiendo a Google Drive...")
-        drive_result = self.drive_service.upload_or_update(
-            file_content, file_name)
-
-        if drive_result['success']:
-            result['drive'] = True
-            self.mongo_service.insert_log(
-                execution_id, file_name, "drive", "success",
-                {'action': drive_result['action'],
-                    'file_id': drive_result.get('file_id')}
-            )
+        self._enter_stage("drive")
+        if 'drive' in completed:
+            self._resume_stage(result, 'drive', completed['drive'])
         else:
-            error_msg = f"Error al subir a Drive"
-            result['errors'].append(error_msg)
-            self.mongo_service.insert_log(
-                execution_id, file_name, "drive", "error",
-                {'error': error_msg}
-            )
-            run_notification_sync(
-                self.notifier.notify_critical_error(
+            logger.info("☁️  Paso 2/3: Subiendo a Google Drive...")
+            stage_start = time.perf_counter()
+            drive_result = self.drive_service.upload_or_update(
+                file_content, file_name, expected_md5=read['md5'])
+            duration_ms = (time.perf_counter() - stage_start) * 1000
+            result['stages']['drive'] = self._stage_metrics(
+                'drive', drive_result['success'], duration_ms, len(file_content))
+
+            if drive_result['success']:
+                result['drive'] = True
+                self._resolve_alerts("drive", file_key)
+                self.mongo_service.update_stage(
+                    execution_id, file_key, "drive", "success",
+                    {'action': drive_result['action'],
+                        'file_id': drive_result.get('file_id'),
+                        'md5Checksum': drive_result.get('md5Checksum')}, duration_ms
+                )
+                self.checkpoints.mark_stage(
+                    execution_id, full_path, read['sha256'], 'drive',
+                    {'file_id': drive_result.get('file_id'),
+                        'md5Checksum': drive_result.get('md5Checksum')})
+            else:
+                error_msg = f"Error al subir a Drive"
+                if drive_result.get('error') == 'checksum_mismatch':
+                    error_msg = f"El checksum de Drive no coincide con el origen"
+                elif drive_result.get('error') == 'circuit_open':
+                    error_msg = f"Subida a Drive omitida: circuito abierto"
+                result['errors'].append(error_msg)
+                self.mongo_service.update_stage(
+                    execution_id, file_key, "drive", "error",
+                    {'error': error_msg, 'md5Checksum': drive_result.get('md5Checksum')},
+                    duration_ms
+                )
+                self._notify_critical(
                     f"Google Drive ({drive_result['action']})",
                     error_msg,
-                    {"archivo": file_name}
+                    {"archivo": file_key},
+                    stage="drive"
                 )
-            )
 
         # 5. Subir a FTP
-        logger.info("🌐 Paso 3/3: Subiendo a FTP...")
-        if self.ftp_service.upload_file(file_content, normalized_name):
-            result['ftp'] = True
-            self.mongo_service.insert_log(
-                execution_id, file_name, "ftp", "success",
-                {'normalized_name': normalized_name}
-            )
+        self._enter_stage("ftp")
+        if 'ftp' in completed:
+            self._resume_stage(result, 'ftp', completed['ftp'])
         else:
-            error_msg = f"Error al subir a FTP"
-            result['errors'].append(error_msg)
-            self.mongo_service.insert_log(
-                execution_id, file_name, "ftp", "error",
-                {'error': error_msg, 'normalized_name': normalized_name}
-            )
-            run_notification_sync(
-                self.notifier.notify_critical_error(
+            logger.info("🌐 Paso 3/3: Subiendo a FTP...")
+            ftp_skipped = self.ftp_service.breaker.is_open
+            stage_start = time.perf_counter()
+            uploaded = self.ftp_service.upload_file(
+                file_content, normalized_name, verify_size=True)
+            duration_ms = (time.perf_counter() - stage_start) * 1000
+            result['stages']['ftp'] = self._stage_metrics(
+                'ftp', uploaded, duration_ms, len(file_content))
+            if uploaded:
+                result['ftp'] = True
+                self._resolve_alerts("ftp", file_key)
+                self.mongo_service.update_stage(
+                    execution_id, file_key, "ftp", "success",
+                    {'normalized_name': normalized_name, 'size': read['size']}, duration_ms
+                )
+                self.checkpoints.mark_stage(
+                    execution_id, full_path, read['sha256'], 'ftp',
+                    {'normalized_name': normalized_name})
+            else:
+                error_msg = f"Error al subir a FTP"
+                if ftp_skipped:
+                    error_msg = f"Subida a FTP omitida: circuito abierto"
+                result['errors'].append(error_msg)
+                self.mongo_service.update_stage(
+                    execution_id, file_key, "ftp", "error",
+                    {'error': error_msg, 'normalized_name': normalized_name},
+                    duration_ms
+                )
+                self._notify_critical(
                     "FTP",
                     error_msg,
-                    {"archivo": file_name, "nombre_normalizado": normalized_name}
+                    {"archivo": file_key, "nombre_normalizado": normalized_name},
+                    stage="ftp"
                 )
-            )
 
         # Resumen del procesamiento
         if result['local'] and result['drive'] and result['ftp']:
-            logger.info(f"✅ Archivo procesado exitosamente: {file_name}")
+            logger.info("✅ Archivo procesado exitosamente: %s", file_key)
         else:
-            logger.warning(f"⚠️  Archivo procesado parcialmente: {file_name}")
+            logger.warning("⚠️  Archivo procesado parcialmente: %s", file_key)
             logger.warning(
-                f"   Local: {result['local']}, Drive: {result['drive']}, FTP: {result['ftp']}")
+                "   Local: %s, Drive: %s, FTP: %s", result['local'], result['drive'], result['ftp'])
 
         return result
 
-    def cleanup_source_files(self, execution_id: str) -> Tuple[List[str], List[str]]:
+    def cleanup_source_files(self, execution_id: str, results: List[Dict]) -> Tuple[List[str], List[str]]:
         """
         Limpia archivos que se procesaron exitosamente en todas las etapas
 
+        La decisión se toma con los resultados en memoria de la ejecución;
+        MongoDB solo se usa como registro de auditoría.
+
         Args:
             execution_id: ID de ejecución
+            results: Resultados de process_catalog para cada catálogo
 
         Returns:
             Tupla con (archivos_eliminados, archivos_con_error)
         """
         logger.info("\n🗑️  Iniciando limpieza de archivos...")
 
-        # Obtener archivos que pueden ser eliminados
-        files_to_check = self.mongo_service.get_files_to_delete(execution_id)
-
-        deleted_files = []
+        deletable = []
         error_files = []
 
-        for file_info in files_to_check:
-            file_name = file_info['fileName']
-            can_delete = file_info['canDelete']
-
-            if can_delete:
-                # Construir ruta completa
-                file_path = f"{SOURCE_PATH}\\{file_name}"
-
-                # Intentar eliminar
-                if self.file_service.delete_file(file_path):
-                    deleted_files.append(file_name)
-                    # Limpiar logs de MongoDB
-                    self.mongo_service.delete_logs(execution_id, file_name)
-                else:
-                    error_files.append(file_name)
-                    run_notification_sync(
-                        self.notifier.notify_warning(
+        for result in results:
+            if result['local'] and result['drive'] and result['ftp']:
+                deletable.append(result)
+            else:
+                logger.info(
+                    "⏭️  Archivo no eliminado (proceso incompleto): %s", result['relPath'])
+                error_files.append(result['relPath'])
+
+        logger.info(
+            "📋 %s archivos pueden ser eliminados de %s procesados", len(deletable), len(results))
+
+        # Eliminar archivos origen de forma concurrente
+        deleted_files = []
+        if deletable:
+            workers = min(CLEANUP_MAX_WORKERS, len(deletable))
+            # Cada eliminación conserva el contexto de logging de la ejecución
+            contexts = [contextvars.copy_context() for _ in deletable]
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                outcomes = executor.map(
+                    lambda r, ctx: ctx.run(self.file_service.delete_file, r['fullPath']),
+                    deletable, contexts)
+                for result, deleted in zip(deletable, outcomes):
+                    if deleted:
+                        deleted_files.append(result['relPath'])
+                        self._resolve_alerts("eliminacion", result['relPath'])
+                    else:
+                        error_files.append(result['relPath'])
+                        self._notify_warning(
                             "Eliminación de archivo",
                             f"No se pudo eliminar el archivo del origen",
-                            {"archivo": file_name}
+                            {"archivo": result['relPath']},
+                            stage="eliminacion"
                         )
-                    )
-            else:
-                logger.info(
-                    f"⏭️  Archivo no eliminado (proceso incompleto): {file_name}")
-                error_files.append(file_name)
 
-        # Limpiar documentos de archivos que no se pudieron procesar completamente
-        non_deletable = [f for f in files_to_check if not f['canDelete']]
-        if non_deletable:
-            for file_info in non_deletable:
-                self.mongo_service.delete_logs(
-                    execution_id, file_info['fileName'])
+        # Limpiar documentos de MongoDB de todos los archivos procesados
+        self.mongo_service.delete_logs(
+            execution_id, [r['relPath'] for r in results])
 
         logger.info(
-            f"✅ Limpieza completada: {len(deleted_files)} eliminados, {len(error_files)} con errores")
+            "✅ Limpieza completada: %s eliminados, %s con errores", len(deleted_files), len(error_files))
 
         return deleted_files, error_files
 
+    def _enter_stage(self, stage: str):
+        """Marca el inicio de una etapa en el contexto de logging, la traza y el perfilador"""
+        bind_log_context(stage=stage)
+        tracer.mark_stage(stage)
+        if self.profiler:
+            self.profiler.mark_stage(stage)
+
     def run(self):
-        """Ejecuta el flujo completo de publicación"""
+        """Ejecuta el flujo completo de publicación (perfilado si se pidió --profile)"""
         logger.info("\n" + "="*80)
         logger.info("🔄 INICIANDO EJECUCIÓN DEL FLUJO")
         logger.info("="*80)
 
-        # Generar ID de ejecución único
-        execution_id = f"exec_{uuid.uuid4().hex[:12]}_{int(time.time())}"
-        logger.info(f"📋 Execution ID: {execution_id}")
+        # Reanudar la ejecución interrumpida (solo la primera vez) o generar un ID único
+        execution_id = None
+        if self.resume:
+            self.resume = False
+            execution_id = self.checkpoints.last_incomplete_run()
+            if execution_id:
+                logger.info("♻️  Reanudando la ejecución interrumpida %s", execution_id)
+            else:
+                logger.info("♻️  No hay ninguna ejecución interrumpida que reanudar")
+        resume = execution_id is not None
+        if not resume:
+            execution_id = f"exec_{uuid.uuid4().hex[:12]}_{int(time.time())}"
+        logger.info("📋 Execution ID: %s", execution_id)
+        self.checkpoints.start_run(execution_id)
+
+        with tracer.trace(execution_id) as trace:
+            if self.profiler:
+                self.profiler.profile(execution_id, self._run, execution_id, resume)
+            else:
+                self._run(execution_id, resume)
+        if trace:
+            self._save_trace(trace)
+
+    def _save_trace(self, trace: Trace):
+        """Guarda la traza de la ejecución en archivo y/o MongoDB según TRACE_STORE"""
+        if TRACE_STORE in ('file', 'both'):
+            tracer.save(trace)
+        if TRACE_STORE in ('mongo', 'both'):
+            self.mongo_service.record_trace(trace.to_dict())
+
+    def _run(self, execution_id: str, resume: bool = False):
+        """Flujo de publicación de una ejecución"""
+        context_token = bind_log_context(execution_id=execution_id)
+        instrumentation.reset()
+        # Los circuitos abiertos en la ejecución anterior pasan a prueba
+        circuit_breakers.tick()
+        run_start = time.perf_counter()
+        run_peak_rss = get_memory_usage()['rss']
+        results = []
+        interrupted = False
+        self.notifier.start_digest()
 
         try:
+            # Recargar el mapeo de nombres si la fuente externa ha cambiado
+            self.mapping_service.refresh()
+
             # 1. Listar catálogos disponibles
             logger.info("\n📂 Buscando catálogos...")
-            catalogs = self.file_service.list_catalogs()
+            with tracer.span("descubrimiento"):
+                catalogs = self.file_service.list_catalogs()
+                tracer.set_attributes(catalogs=len(catalogs))
 
             if not catalogs:
                 logger.warning("⚠️  No se encontraron catálogos para procesar")
                 return
 
-            logger.info(f"✅ Encontrados {len(catalogs)} catálogos")
+            logger.info("✅ Encontrados %s catálogos", len(catalogs))
+
+            # Probar los destinos en paralelo; los que fallan se omiten en esta ejecución
+            if PREFLIGHT_ENABLED:
+                with tracer.span("preflight"):
+                    self.preflight.run()
 
             # 2. Procesar cada catálogo
-            results = []
             for catalog in catalogs:
-                result = self.process_catalog(catalog, execution_id)
+                # Esperar a que el catálogo quepa en el presupuesto de memoria
+                if not self.memory_budget.admit(catalog['size']):
+                    result = self._new_result(catalog)
+                    error_msg = (
+                        f"Sin memoria para procesar el archivo (unos "
+                        f"{self.memory_budget.estimate(catalog['size']) / 1024 / 1024:.0f} MB) tras "
+                        f"esperar {self.memory_budget.timeout:.0f} s: sube MEMORY_ADMISSION_TIMEOUT o "
+                        f"MEMORY_BUDGET_MB (por debajo del límite de PM2)")
+                    result['errors'].append(error_msg)
+                    self._notify_warning(
+                        "Presupuesto de memoria",
+                        error_msg,
+                        {"archivo": catalog['relPath'], "tamaño_bytes": catalog['size']},
+                        stage="memoria"
+                    )
+                    results.append(result)
+                    continue
+
+                # El contexto (y la etapa fijada dentro) se descarta al salir del bloque
+                try:
+                    with log_context(fileName=catalog['relPath']), \
+                            tracer.span("catalogo", fileName=catalog['relPath'],
+                                        size=catalog['size']), \
+                            self.memory_monitor.window() as memory:
+                        result = self.process_catalog(catalog, execution_id, resume)
+                finally:
+                    self.memory_budget.release(catalog['size'])
+                result['memory'] = memory
+                run_peak_rss = max(run_peak_rss, memory['peakRssBytes'])
                 results.append(result)
 
             # 3. Limpieza de archivos procesados exitosamente
-            deleted_files, error_files = self.cleanup_source_files(
-                execution_id)
+            with log_context(stage="limpieza"):
+                self._enter_stage("limpieza")
+                deleted_files, error_files = self.cleanup_source_files(
+                    execution_id, results)
+            tracer.mark_stage(None)
+
+            # Los procesados que siguen en el origen no se vuelven a descubrir hasta que
+            # cambien; los rechazados por memoria (sin ventana de memoria) se reintentan
+            self.file_service.mark_processed(
+                [r['relPath'] for r in results if 'memory' in r and r['relPath'] not in deleted_files])
+            # Los publicados y eliminados del origen ya no necesitan puntos de control
+            self.checkpoints.forget(
+                [r['fullPath'] for r in results if r['relPath'] in deleted_files])
 
             # 4. Enviar resumen final
             logger.info("\n📤 Enviando resumen final...")
@@ -274,7 +616,7 @@ class CatalogPublisher:
                 # Construir lista de archivos publicados
                 files_list = "\n".join([f"> {file}" for file in deleted_files])
                 success_msg = f"✅ Se publicaron {len(deleted_files)} catálogos exitosamente.\n{files_list}"
-                run_notification_sync(
+                self.dispatcher.submit(
                     self.notifier.notify_success(
                         "Publicación completada",
                         success_msg
@@ -283,37 +625,88 @@ class CatalogPublisher:
 
             if error_files:
                 error_msg = f"⚠️ {len(error_files)} catálogos con errores: {', '.join(error_files)}"
-                run_notification_sync(
-                    self.notifier.notify_warning(
-                        "Catálogos con errores",
-                        error_msg,
-                        {"archivos_con_error": error_files}
-                    )
+                self._notify_warning(
+                    "Catálogos con errores",
+                    error_msg,
+                    {"archivos_con_error": error_files},
+                    stage="resumen"
                 )
+            else:
+                self._resolve_alerts("resumen")
 
             # 5. Resumen final
             logger.info("\n" + "="*80)
             logger.info("📊 RESUMEN DE EJECUCIÓN")
             logger.info("="*80)
-            logger.info(f"Total catálogos procesados: {len(results)}")
-            logger.info(f"Publicados exitosamente: {len(deleted_files)}")
-            logger.info(f"Con errores: {len(error_files)}")
+            logger.info("Total catálogos procesados: %s", len(results))
+            logger.info("Publicados exitosamente: %s", len(deleted_files))
+            logger.info("Con errores: %s", len(error_files))
+            usage = get_memory_usage()
+            logger.info(
+                "Memoria: %.0f MB al terminar, "
+                "pico de la ejecución %.0f MB, "
+                "pico del proceso %.0f MB",
+                usage['rss'] / 1024 / 1024, run_peak_rss / 1024 / 1024, usage['peak'] / 1024 / 1024)
+            catalog_memory = [
+                {'fileName': r['relPath'], 'peakRssBytes': r['memory']['peakRssBytes'],
+                 'deltaBytes': r['memory']['deltaBytes']}
+                for r in results if r.get('memory')
+            ]
+            for entry in catalog_memory:
+                logger.info(
+                    "  🧠 %s: pico %.0f MB, "
+                    "variación %+.0f MB",
+                    entry['fileName'], entry['peakRssBytes'] / 1024 / 1024, entry['deltaBytes'] / 1024 / 1024)
+            circuits = circuit_breakers.states()
+            circuit_breakers.log_summary(circuits)
+            instrumentation.log_summary()
             logger.info("="*80 + "\n")
 
+            outcome = 'success' if not error_files else (
+                'partial' if deleted_files else 'failed')
+            instrumentation.count(f"runs.{outcome}")
+            self.mongo_service.record_run_metrics(
+                execution_id, results, (time.perf_counter() - run_start) * 1000, outcome,
+                instrumentation.summary(),
+                {'rssBytes': usage['rss'], 'peakRssBytes': run_peak_rss,
+                 'catalogs': catalog_memory}, circuits)
+            self._resolve_alerts("flujo")
+
         except Exception as e:
             error_msg = f"Error crítico en el flujo: {str(e)}"
-            logger.error(f"❌ {error_msg}", exc_info=True)
-            run_notification_sync(
-                self.notifier.notify_critical_error(
-                    "Flujo principal",
-                    error_msg,
-                    {"traceback": str(e)}
-                )
+            logger.error("❌ %s", error_msg, exc_info=True)
+            self._notify_critical(
+                "Flujo principal",
+                error_msg,
+                {"traceback": str(e)},
+                fatal=True,
+                stage="flujo",
+                error_class=type(e).__name__
             )
+            instrumentation.count("runs.error")
+            self.mongo_service.record_run_metrics(
+                execution_id, results, (time.perf_counter() - run_start) * 1000, 'error',
+                instrumentation.summary())
+
+        except BaseException:
+            # Interrupción (Ctrl+C, reinicio de PM2): la ejecución queda abierta para --resume
+            interrupted = True
+            raise
+
+        finally:
+            self._flush_digest()
+            # Terminada (con o sin errores): ya no se reanuda
+            if not interrupted:
+                self.checkpoints.finish_run(execution_id)
+            # En modo programado el proceso no se reinicia: los puntos de control caducan aquí
+            self.checkpoints.prune()
+            # Las entradas ya reenviadas del diario local caducan aunque no haya reconexiones
+            self.mongo_service.purge_journal()
+            reset_log_context(context_token)
 
     def run_scheduled(self):
         """Ejecuta el flujo en modo programado"""
-        logger.info(f"⏰ Programando ejecución cada {SCHEDULE_TIME} minutos")
+        logger.info("⏰ Programando ejecución cada %s minutos", SCHEDULE_TIME)
         logger.info(
             "   Horario: Cada 15 minutos, de 8:00 a 16:00, Lunes a Viernes")
         logger.info("   (Presiona Ctrl+C para detener)\n")
@@ -321,6 +714,9 @@ class CatalogPublisher:
         # Programar ejecución cada X minutos
         schedule.every(SCHEDULE_TIME).minutes.do(self.run)
 
+        # Endpoint /metrics para Prometheus mientras el proceso siga vivo
+        self.metrics_exporter.serve()
+
         # Loop principal
         try:
             # Ejecutar inmediatamente al iniciar
@@ -333,6 +729,8 @@ class CatalogPublisher:
 
         except KeyboardInterrupt:
             logger.info("\n\n⏹️  Deteniendo el programador...")
+            self.metrics_exporter.shutdown()
+            self.shutdown()
             logger.info("👋 Hasta pronto!")
 
 
@@ -347,14 +745,30 @@ def main():
     except Exception:
         pass  # Ignorar errores de codificación en pythonw.exe
 
+    parser = argparse.ArgumentParser(description="Publicación automatizada de catálogos")
+    parser.add_argument("--once", action="store_true",
+                        help="Ejecutar el flujo una sola vez y terminar")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reanudar la última ejecución interrumpida, omitiendo las etapas ya completadas")
+    parser.add_argument("--profile", action="store_true",
+                        help="Perfilar cada ejecución con cProfile (resultados en logs/)")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="Con --profile, registrar además el pico de memoria por etapa")
+    args = parser.parse_args()
+
     # Crear instancia del publicador
-    publisher = CatalogPublisher()
+    profiler = None
+    if args.profile or args.profile_memory:
+        profiler = RunProfiler(trace_memory=args.profile_memory)
+    publisher = CatalogPublisher(profiler, resume=args.resume)
 
     # Determinar modo de ejecución
-    if len(sys.argv) > 1 and sys.argv[1] == "--once":
+    if args.once:
         # Ejecución única
         logger.info("🔧 Modo: Ejecución única")
         publisher.run()
+        publisher.metrics_exporter.write_textfile()
+        publisher.shutdown()
     else:
         # Ejecución programada
         logger.info("🔧 Modo: Ejecución programada")
@@ -0,0 +1,128 @@
+"""
+Estado persistente de alertas para deduplicación entre ejecuciones
+Identifica cada alerta por (etapa, tipo de error, archivo) y aplica un
+periodo de enfriamiento durante el cual las repeticiones se suprimen
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import ALERT_STATE_FILE, NOTIFICATION_COOLDOWN_MINUTES
+from utils.logger import logger
+
+# Alertas sin repetirse en este plazo se consideran olvidadas
+STALE_AFTER = timedelta(days=7)
+
+
+class AlertStateStore:
+    """Guarda en un archivo JSON la huella y el último envío de cada alerta"""
+
+    def __init__(self, path: Path = ALERT_STATE_FILE,
+                 cooldown_minutes: int = NOTIFICATION_COOLDOWN_MINUTES):
+        self.path = Path(path)
+        self.cooldown = timedelta(minutes=cooldown_minutes)
+        self._lock = threading.Lock()
+        self._state = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        """Carga el estado desde disco (vacío si no existe o está corrupto)"""
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("No se pudo leer el estado de alertas, se reinicia: %s", e)
+            return {}
+
+    def _save(self):
+        """Escribe el estado de forma atómica"""
+        tmp_path = self.path.with_suffix('.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("No se pudo guardar el estado de alertas: %s", e)
+
+    @staticmethod
+    def fingerprint(stage: str, error_class: str, file_name: Optional[str]) -> str:
+        """Calcula la huella de una alerta"""
+        key = f"{stage}|{error_class}|{file_name or ''}"
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def register(self, stage: str, error_class: str, file_name: Optional[str] = None) -> Optional[int]:
+        """
+        Registra una ocurrencia de la alerta
+
+        Args:
+            stage: Etapa en la que ocurrió
+            error_class: Tipo de error
+            file_name: Archivo afectado (opcional)
+
+        Returns:
+            None si debe suprimirse (dentro del enfriamiento); si debe enviarse,
+            el número de repeticiones suprimidas desde el último envío
+        """
+        now = datetime.now()
+        fp = self.fingerprint(stage, error_class, file_name)
+
+        with self._lock:
+            self._prune(now)
+            entry = self._state.get(fp)
+
+            if entry and now - datetime.fromisoformat(entry['lastSent']) < self.cooldown:
+                entry['suppressed'] += 1
+                entry['lastSeen'] = now.isoformat()
+                self._save()
+                logger.debug("Alerta suprimida por enfriamiento: %s - %s - %s",
+                             stage, error_class, file_name)
+                return None
+
+            suppressed = entry['suppressed'] if entry else 0
+            self._state[fp] = {
+                'stage': stage,
+                'errorClass': error_class,
+                'fileName': file_name,
+                'firstSeen': entry['firstSeen'] if entry else now.isoformat(),
+                'lastSeen': now.isoformat(),
+                'lastSent': now.isoformat(),
+                'suppressed': 0
+            }
+            self._save()
+            return suppressed
+
+    def resolve(self, stage: str, file_name: Optional[str] = None) -> List[Dict]:
+        """
+        Marca como resueltas las alertas activas de una etapa y archivo
+
+        Args:
+            stage: Etapa que se completó correctamente
+            file_name: Archivo afectado (opcional)
+
+        Returns:
+            Lista de alertas que estaban activas y se han resuelto
+        """
+        with self._lock:
+            resolved = [
+                fp for fp, entry in self._state.items()
+                if entry['stage'] == stage and entry['fileName'] == file_name
+            ]
+            if not resolved:
+                return []
+            entries = [self._state.pop(fp) for fp in resolved]
+            self._save()
+            return entries
+
+    def _prune(self, now: datetime):
+        """Olvida alertas que llevan tiempo sin repetirse"""
+        stale = [
+            fp for fp, entry in self._state.items()
+            if now - datetime.fromisoformat(entry['lastSeen']) > STALE_AFTER
+        ]
+        for fp in stale:
+            del self._state[fp]
@@ -0,0 +1,159 @@
+"""
+Puntos de control de la publicación
+Registra en SQLite cada etapa completada por archivo y hash de contenido, y
+qué ejecuciones terminaron, para reanudar una ejecución interrumpida
+(reinicio de PM2, corte de luz) sin repetir las subidas ya hechas
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from config import CHECKPOINT_FILE, CHECKPOINT_RETENTION_DAYS
+from utils.logger import logger
+
+
+class CheckpointStore:
+    """Etapas completadas por (archivo, sha256) y estado de cada ejecución"""
+
+    def __init__(self, path=CHECKPOINT_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # FULL: cada etapa confirmada sobrevive a un corte de luz
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                execution_id TEXT PRIMARY KEY,
+                started_at TEXT NOT NULL,
+                finished_at TEXT
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                file_path TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                execution_id TEXT NOT NULL,
+                details TEXT,
+                completed_at TEXT NOT NULL,
+                PRIMARY KEY (file_path, sha256, stage)
+            )
+        """)
+        self.conn.commit()
+        self.prune()
+        logger.debug("Puntos de control inicializados: %s", self.path)
+
+    def start_run(self, execution_id: str):
+        """Registra el inicio (o la reanudación) de una ejecución"""
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO runs (execution_id, started_at) VALUES (?, ?) "
+                "ON CONFLICT(execution_id) DO UPDATE SET finished_at = NULL",
+                (execution_id, datetime.now().isoformat())
+            )
+            self.conn.commit()
+
+    def finish_run(self, execution_id: str):
+        """Marca una ejecución como terminada (ya no se puede reanudar)"""
+        with self._lock:
+            self.conn.execute(
+                "UPDATE runs SET finished_at = ? WHERE execution_id = ?",
+                (datetime.now().isoformat(), execution_id)
+            )
+            self.conn.commit()
+
+    def last_incomplete_run(self) -> Optional[str]:
+        """
+        Obtiene la última ejecución si quedó sin terminar
+
+        Returns:
+            execution_id de la ejecución interrumpida o None
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT execution_id, finished_at FROM runs ORDER BY started_at DESC LIMIT 1"
+            ).fetchone()
+        if row and row[1] is None:
+            return row[0]
+        return None
+
+    def mark_stage(self, execution_id: str, file_path: str, sha256: str,
+                   stage: str, details: Dict = None):
+        """
+        Registra una etapa completada para el contenido actual de un archivo
+
+        Args:
+            execution_id: ID de ejecución
+            file_path: Ruta completa del archivo origen
+            sha256: SHA-256 del contenido publicado
+            stage: Etapa (local, drive, ftp)
+            details: Detalles de la etapa
+        """
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints "
+                "(file_path, sha256, stage, execution_id, details, completed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (file_path, sha256, stage, execution_id,
+                 json.dumps(details or {}, default=str), datetime.now().isoformat())
+            )
+            self.conn.commit()
+
+    def completed_stages(self, file_path: str, sha256: str) -> Dict[str, Dict]:
+        """
+        Obtiene las etapas ya completadas con este mismo contenido
+
+        Args:
+            file_path: Ruta completa del archivo origen
+            sha256: SHA-256 del contenido actual
+
+        Returns:
+            Diccionario {etapa: {'executionId', 'details', 'completedAt'}}
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT stage, execution_id, details, completed_at FROM checkpoints "
+                "WHERE file_path = ? AND sha256 = ?",
+                (file_path, sha256)
+            ).fetchall()
+        return {
+            row[0]: {'executionId': row[1], 'details': json.loads(row[2] or '{}'),
+                     'completedAt': row[3]}
+            for row in rows
+        }
+
+    def forget(self, file_paths: List[str]):
+        """Elimina los puntos de control de archivos ya publicados y borrados del origen"""
+        if not file_paths:
+            return
+        with self._lock:
+            self.conn.executemany(
+                "DELETE FROM checkpoints WHERE file_path = ?", [(path,) for path in file_paths])
+            self.conn.commit()
+
+    def prune(self, retention_days: int = CHECKPOINT_RETENTION_DAYS) -> int:
+        """
+        Elimina puntos de control y ejecuciones antiguas
+
+        Args:
+            retention_days: Días que se conservan
+
+        Returns:
+            Número de puntos de control eliminados
+        """
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM checkpoints WHERE completed_at < ?", (cutoff,))
+            self.conn.execute(
+                "DELETE FROM runs WHERE started_at < ? AND finished_at IS NOT NULL", (cutoff,))
+            self.conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        """Cierra la base de datos"""
+        with self._lock:
+            self.conn.close()
@@ -3,17 +3,21 @@ Servicio para interactuar con Google Drive
 Sube, actualiza y busca archivos en la carpeta de catálogos
 Usa Service Account para autenticación sin intervención del usuario
 """
-import io
 import os
 from pathlib import Path
 from typing import Optional, Dict
+import httplib2
 from google.oauth2.service_account import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload
 from googleapiclient.errors import HttpError
 
 from config import GOOGLE_SERVICE_ACCOUNT_FILE, GOOGLE_DRIVE_FOLDER_ID, BASE_DIR
 from utils.logger import logger
+from utils.circuit_breaker import circuit_breakers
+from utils.instrumentation import instrumentation
+from utils.memory import BufferReader
 
 # Scopes requeridos para Google Drive
 SCOPES = ['https://www.googleapis.com/auth/drive']
@@ -24,7 +28,9 @@ class DriveService:
 
     def __init__(self):
         self.service = None
+        self.credentials = None
         self.folder_id = GOOGLE_DRIVE_FOLDER_ID
+        self.breaker = circuit_breakers.get('drive')
         self._authenticate()
 
     def _authenticate(self):
@@ -32,7 +38,7 @@ class DriveService:
         credentials_path = BASE_DIR / GOOGLE_SERVICE_ACCOUNT_FILE
 
         if not credentials_path.exists():
-            logger.error(f"❌ Archivo de Service Account no encontrado: {credentials_path}")
+            logger.error("❌ Archivo de Service Account no encontrado: %s", credentials_path)
             logger.error("Por favor, crea una Service Account en Google Cloud Console")
             return
 
@@ -43,18 +49,42 @@ class DriveService:
                 scopes=SCOPES
             )
 
-            # Crear servicio
+            # Crear servicio (la conexión se valida en test_connection)
             self.service = build('drive', 'v3', credentials=creds)
-
-            # Validar conexión
-            self.service.about().get(fields="user").execute()
-            logger.info("✅ Autenticación con Service Account exitosa")
+            self.credentials = creds
             logger.info("✅ Servicio de Google Drive inicializado")
 
         except Exception as e:
-            logger.error(f"❌ Error al autenticar con Service Account: {str(e)}")
+            logger.error("❌ Error al autenticar con Service Account: %s", e)
             self.service = None
     
+    def test_connection(self, timeout: float = 30) -> bool:
+        """
+        Prueba la conexión y las credenciales con Google Drive
+        (reintenta la autenticación si falló al arrancar)
+        
+        Args:
+            timeout: Timeout de socket en segundos (también para renovar el token)
+            
+        Returns:
+            True si la conexión es exitosa, False en caso contrario
+        """
+        if not self.service:
+            self._authenticate()
+            if not self.service:
+                return False
+        
+        try:
+            with instrumentation.timer('drive.about'):
+                # Conexión propia con plazo: la del servicio no tiene timeout de socket
+                http = AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=timeout))
+                self.service.about().get(fields="user").execute(http=http)
+            logger.info("✅ Autenticación con Service Account exitosa")
+            return True
+        except Exception as e:
+            logger.error("❌ Error al validar la conexión con Google Drive: %s", e)
+            return False
+    
     def search_file(self, file_name: str) -> Optional[Dict]:
         """
         Busca un archivo en la carpeta de catálogos
@@ -71,27 +101,28 @@ class DriveService:
         
         try:
             query = f"name='{file_name}' and '{self.folder_id}' in parents and trashed=false"
-            results = self.service.files().list(
-                q=query,
-                spaces='drive',
-                fields='files(id, name, mimeType, modifiedTime, size)',
-                pageSize=10
-            ).execute()
+            with instrumentation.timer('drive.list'):
+                results = self.service.files().list(
+                    q=query,
+                    spaces='drive',
+                    fields='files(id, name, mimeType, modifiedTime, size)',
+                    pageSize=10
+                ).execute()
             
             files = results.get('files', [])
             
             if files:
-                logger.debug(f"Archivo encontrado en Drive: {file_name}")
+                logger.debug("Archivo encontrado en Drive: %s", file_name)
                 return files[0]  # Retornar el primero si hay múltiples
             else:
-                logger.debug(f"Archivo no encontrado en Drive: {file_name}")
+                logger.debug("Archivo no encontrado en Drive: %s", file_name)
                 return None
                 
         except HttpError as e:
-            logger.error(f"❌ Error al buscar archivo en Drive: {str(e)}")
+            logger.error("❌ Error al buscar archivo en Drive: %s", e)
             return None
     
-    def upload_file(self, file_content: bytes, file_name: str) -> Optional[str]:
+    def upload_file(self, file_content: bytes, file_name: str) -> Optional[Dict]:
         """
         Sube un nuevo archivo a Google Drive
         
@@ -100,7 +131,7 @@ class DriveService:
             file_name: Nombre del archivo
             
         Returns:
-            ID del archivo creado o None si hay error
+            Diccionario con id, name y md5Checksum del archivo creado o None si hay error
         """
         if not self.service:
             logger.error("Servicio de Google Drive no disponible")
@@ -113,25 +144,27 @@ class DriveService:
             }
             
             media = MediaIoBaseUpload(
-                io.BytesIO(file_content),
+                BufferReader(file_content),
                 mimetype='application/pdf',
                 resumable=True
             )
             
-            file = self.service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields='id, name'
-            ).execute()
+            with instrumentation.timer('drive.create'):
+                file = self.service.files().create(
+                    body=file_metadata,
+                    media_body=media,
+                    fields='id, name, md5Checksum'
+                ).execute()
+            instrumentation.count('bytes.drive', len(file_content))
             
-            logger.info(f"✅ Archivo subido a Drive: {file_name} (ID: {file.get('id')})")
-            return file.get('id')
+            logger.info("✅ Archivo subido a Drive: %s (ID: %s)", file_name, file.get('id'))
+            return file
             
         except HttpError as e:
-            logger.error(f"❌ Error al subir archivo a Drive: {str(e)}")
+            logger.error("❌ Error al subir archivo a Drive: %s", e)
             return None
     
-    def update_file(self, file_id: str, file_content: bytes, file_name: str) -> bool:
+    def update_file(self, file_id: str, file_content: bytes, file_name: str) -> Optional[Dict]:
         """
         Actualiza un archivo existente en Google Drive
         
@@ -141,61 +174,92 @@ class DriveService:
             file_name: Nombre del archivo
             
         Returns:
-            True si se actualizó correctamente, False en caso contrario
+            Diccionario con id, name y md5Checksum del archivo o None si hay error
         """
         if not self.service:
             logger.error("Servicio de Google Drive no disponible")
-            return False
+            return None
         
         try:
             media = MediaIoBaseUpload(
-                io.BytesIO(file_content),
+                BufferReader(file_content),
                 mimetype='application/pdf',
                 resumable=True
             )
             
-            self.service.files().update(
-                fileId=file_id,
-                media_body=media,
-                fields='id, name, modifiedTime'
-            ).execute()
+            with instrumentation.timer('drive.update'):
+                file = self.service.files().update(
+                    fileId=file_id,
+                    media_body=media,
+                    fields='id, name, modifiedTime, md5Checksum'
+                ).execute()
+            instrumentation.count('bytes.drive', len(file_content))
             
-            logger.info(f"✅ Archivo actualizado en Drive: {file_name}")
-            return True
+            logger.info("✅ Archivo actualizado en Drive: %s", file_name)
+            return file
             
         except HttpError as e:
-            logger.error(f"❌ Error al actualizar archivo en Drive: {str(e)}")
-            return False
+            logger.error("❌ Error al actualizar archivo en Drive: %s", e)
+            return None
     
-    def upload_or_update(self, file_content: bytes, file_name: str) -> Dict[str, any]:
+    def upload_or_update(self, file_content: bytes, file_name: str,
+                         expected_md5: Optional[str] = None) -> Dict[str, any]:
         """
         Sube un archivo o lo actualiza si ya existe
         
         Args:
             file_content: Contenido del archivo
             file_name: Nombre del archivo
+            expected_md5: MD5 del origen; si se indica, se compara con el
+                md5Checksum que devuelve Drive
             
         Returns:
-            Diccionario con el resultado de la operación
+            Diccionario con el resultado de la operación (error 'circuit_open'
+            si se omitió por tener el circuito de Drive abierto)
         """
-        # Buscar si el archivo ya existe
-        existing_file = self.search_file(file_name)
+        if not self.breaker.allow():
+            logger.warning("⚡ Circuito de Drive abierto, se omite la subida de %s", file_name)
+            return {'success': False, 'action': 'skipped', 'file_id': None,
+                    'file_name': file_name, 'md5Checksum': None, 'error': 'circuit_open'}
         
-        if existing_file:
-            # Actualizar archivo existente
-            success = self.update_file(existing_file['id'], file_content, file_name)
-            return {
-                'success': success,
-                'action': 'updated',
-                'file_id': existing_file['id'],
-                'file_name': file_name
-            }
+        try:
+            # Buscar si el archivo ya existe
+            existing_file = self.search_file(file_name)
+            
+            if existing_file:
+                # Actualizar archivo existente
+                file = self.update_file(existing_file['id'], file_content, file_name)
+                result = {
+                    'success': bool(file),
+                    'action': 'updated',
+                    'file_id': existing_file['id'],
+                    'file_name': file_name
+                }
+            else:
+                # Crear nuevo archivo
+                file = self.upload_file(file_content, file_name)
+                result = {
+                    'success': bool(file),
+                    'action': 'created',
+                    'file_id': file.get('id') if file else None,
+                    'file_name': file_name
+                }
+        except Exception as e:
+            # Timeouts y errores de red (no son HttpError)
+            logger.error("❌ Error de conexión con Drive: %s", e)
+            self.breaker.record_failure()
+            return {'success': False, 'action': 'error', 'file_id': None,
+                    'file_name': file_name, 'md5Checksum': None}
+        
+        if file:
+            self.breaker.record_success()
         else:
-            # Crear nuevo archivo
-            file_id = self.upload_file(file_content, file_name)
-            return {
-                'success': bool(file_id),
-                'action': 'created',
-                'file_id': file_id,
-                'file_name': file_name
-            }
+            self.breaker.record_failure()
+        result['md5Checksum'] = file.get('md5Checksum') if file else None
+        if result['success'] and expected_md5 and result['md5Checksum'] != expected_md5:
+            logger.error(
+                "❌ Checksum de Drive no coincide para %s: "
+                "%s != %s", file_name, result['md5Checksum'], expected_md5)
+            result['success'] = False
+            result['error'] = 'checksum_mismatch'
+        return result
@@ -2,15 +2,36 @@
 Servicio para manejo de archivos en rutas UNC
 Incluye: listar, leer, copiar y eliminar archivos PDF
 """
+import hashlib
+import json
 import os
 import shutil
+import sys
+import time
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 from datetime import datetime
 
-from config import SOURCE_PATH, DEST_PATH
+from config import (
+    SOURCE_PATH, DEST_PATH, DISCOVERY_RECURSIVE, DISCOVERY_CHANGED_ONLY,
+    DISCOVERY_SNAPSHOT_FILE, LOCAL_COPY_VERIFY_HASH
+)
+from utils.circuit_breaker import circuit_breakers
+from utils.instrumentation import instrumentation
 from utils.logger import logger
 
+# Tamaño de bloque para copias y hashes cuando no hay copia en el kernel
+COPY_BLOCK_SIZE = 8 * 1024 * 1024
+
+# Linux copia entre archivos dentro del kernel (copy_file_range, sendfile; en CIFS
+# copy_file_range puede copiar en el propio servidor); en el resto de sistemas la
+# copia local escribe desde memoria el contenido ya leído en lugar de releer el origen
+KERNEL_COPY = sys.platform.startswith('linux')
+
+# Diferencia de fecha de modificación tolerada al comparar origen y destino
+# (SMB y FAT guardan las fechas con menos precisión)
+MTIME_TOLERANCE = 2
+
 
 class FileService:
     """Maneja operaciones con archivos en rutas UNC"""
@@ -18,44 +39,158 @@ class FileService:
     def __init__(self):
         self.source_path = Path(SOURCE_PATH)
         self.dest_path = Path(DEST_PATH)
-        logger.info(f"FileService inicializado - Source: {self.source_path}")
+        # Archivos procesados que siguen en el origen: {ruta_relativa: [tamaño, mtime_ns]}
+        self._snapshot = self._load_snapshot() if DISCOVERY_CHANGED_ONLY else {}
+        # Archivos devueltos por el último recorrido, pendientes de procesar
+        self._pending: Dict[str, List[int]] = {}
+        logger.info("FileService inicializado - Source: %s", self.source_path)
     
-    def list_catalogs(self) -> List[Dict[str, any]]:
+    def list_catalogs(self, changed_only: Optional[bool] = None,
+                      recursive: Optional[bool] = None) -> List[Dict[str, any]]:
         """
-        Lista todos los archivos PDF en la carpeta origen
+        Lista los archivos PDF en la carpeta origen
+        
+        Recorre la carpeta con os.scandir, que devuelve nombre y metadatos en
+        una sola enumeración del directorio (sin un stat() por archivo en SMB).
+        Los archivos se identifican por su ruta relativa a la carpeta origen
+        (relPath), única también al recorrer subcarpetas. Solo pasan a la
+        instantánea los que se confirman con mark_processed (procesados y que
+        siguen en el origen); los que no llegan a procesarse se vuelven a devolver.
+        
+        Args:
+            changed_only: Devolver solo archivos nuevos o modificados respecto
+                a los ya procesados (DISCOVERY_CHANGED_ONLY si se omite)
+            recursive: Recorrer también las subcarpetas (DISCOVERY_RECURSIVE si se omite)
         
         Returns:
             Lista de diccionarios con información de archivos
         """
+        changed_only = DISCOVERY_CHANGED_ONLY if changed_only is None else changed_only
+        recursive = DISCOVERY_RECURSIVE if recursive is None else recursive
+        
         try:
             if not self.source_path.exists():
-                logger.error(f"La ruta origen no existe: {self.source_path}")
+                logger.error("La ruta origen no existe: %s", self.source_path)
                 return []
             
-            pdf_files = list(self.source_path.glob("*.pdf"))
-            
             catalogs = []
-            for pdf_file in pdf_files:
+            scanned = {}
+            pending = {}
+            for entry in self._scan_pdfs(self.source_path, recursive):
                 try:
-                    stat = pdf_file.stat()
-                    catalogs.append({
-                        'fileName': pdf_file.name,
-                        'fullPath': str(pdf_file),
-                        'size': stat.st_size,
-                        'modified': datetime.fromtimestamp(stat.st_mtime),
-                        'exists': True
-                    })
-                except Exception as e:
-                    logger.warning(f"Error al obtener info de {pdf_file.name}: {str(e)}")
-            
-            logger.info(f"✅ Encontrados {len(catalogs)} catálogos en {self.source_path}")
+                    stat = entry.stat()
+                except OSError as e:
+                    logger.warning("Error al obtener info de %s: %s", entry.name, e)
+                    continue
+                
+                rel_path = os.path.relpath(entry.path, self.source_path).replace(os.sep, '/')
+                signature = [stat.st_size, stat.st_mtime_ns]
+                scanned[rel_path] = signature
+                if changed_only and self._snapshot.get(rel_path) == signature:
+                    continue
+                
+                pending[rel_path] = signature
+                catalogs.append({
+                    'fileName': entry.name,
+                    'relPath': rel_path,
+                    'fullPath': entry.path,
+                    'size': stat.st_size,
+                    'modified': datetime.fromtimestamp(stat.st_mtime),
+                    'exists': True
+                })
+            
+            removed = len(self._snapshot.keys() - scanned.keys())
+            # Se conservan solo los procesados que siguen igual; los devueltos quedan pendientes
+            self._snapshot = {
+                path: signature for path, signature in scanned.items()
+                if path not in pending and self._snapshot.get(path) == signature
+            }
+            self._pending = pending
+            if DISCOVERY_CHANGED_ONLY:
+                self._save_snapshot()
+            
+            if changed_only:
+                logger.info(
+                    "✅ Encontrados %s catálogos en %s "
+                    "(%s nuevos o modificados, %s desaparecidos)",
+                    len(scanned), self.source_path, len(catalogs), removed)
+            else:
+                logger.info("✅ Encontrados %s catálogos en %s", len(catalogs), self.source_path)
             return catalogs
             
         except Exception as e:
-            logger.error(f"❌ Error al listar catálogos: {str(e)}")
+            logger.error("❌ Error al listar catálogos: %s", e)
             return []
     
-    def read_file(self, file_path: str) -> Optional[bytes]:
+    @staticmethod
+    def _scan_pdfs(root: Path, recursive: bool) -> Iterator[os.DirEntry]:
+        """
+        Recorre una carpeta con os.scandir y devuelve las entradas PDF
+        
+        Args:
+            root: Carpeta a recorrer
+            recursive: Si se recorren también las subcarpetas
+        
+        Yields:
+            Entradas de directorio de archivos PDF
+        """
+        pending = [str(root)]
+        while pending:
+            folder = pending.pop()
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if recursive:
+                                    pending.append(entry.path)
+                            elif entry.is_file() and entry.name.lower().endswith('.pdf'):
+                                yield entry
+                        except OSError as e:
+                            logger.warning("Error al leer la entrada %s: %s", entry.path, e)
+            except OSError as e:
+                logger.warning("Error al recorrer la carpeta %s: %s", folder, e)
+    
+    def mark_processed(self, rel_paths: List[str]):
+        """
+        Añade a la instantánea los archivos que se procesaron y siguen en el
+        origen (con errores o sin eliminar), con los metadatos del recorrido en
+        que se devolvieron, para no volver a devolverlos mientras no cambien
+        
+        Los publicados y eliminados no se añaden: si se vuelve a dejar un archivo
+        con el mismo nombre, se devuelve aunque coincidan tamaño y fecha.
+        
+        Args:
+            rel_paths: Rutas relativas (relPath) de los archivos
+        """
+        processed = [path for path in rel_paths if path in self._pending]
+        for path in processed:
+            self._snapshot[path] = self._pending.pop(path)
+        if processed and DISCOVERY_CHANGED_ONLY:
+            self._save_snapshot()
+    
+    def _load_snapshot(self) -> Dict[str, List[int]]:
+        """Carga el último recorrido desde disco (vacío si no existe o está corrupto)"""
+        if not DISCOVERY_SNAPSHOT_FILE.exists():
+            return {}
+        try:
+            with open(DISCOVERY_SNAPSHOT_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("No se pudo leer el último recorrido, se reinicia: %s", e)
+            return {}
+    
+    def _save_snapshot(self):
+        """Escribe el último recorrido de forma atómica"""
+        tmp_path = DISCOVERY_SNAPSHOT_FILE.with_suffix('.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._snapshot, f)
+            os.replace(tmp_path, DISCOVERY_SNAPSHOT_FILE)
+        except OSError as e:
+            logger.warning("No se pudo guardar el último recorrido: %s", e)
+    
+    def read_file(self, file_path: str) -> Optional[bytearray]:
         """
         Lee el contenido binario de un archivo
         
@@ -65,53 +200,213 @@ class FileService:
         Returns:
             Contenido del archivo en bytes o None si hay error
         """
+        read = self.read_file_with_checksums(file_path)
+        return read['content'] if read else None
+    
+    def read_file_with_checksums(self, file_path: str) -> Optional[Dict[str, any]]:
+        """
+        Lee el contenido binario de un archivo calculando SHA-256 y MD5 a medida
+        que se leen los bloques, sin una pasada adicional sobre el archivo
+        
+        El contenido se lee con readinto en un bytearray reservado con el tamaño
+        del archivo, así que en memoria solo hay una copia (sin lista de bloques
+        ni join final). Para subirlo sin copiarlo, usar utils.memory.BufferReader.
+        
+        Args:
+            file_path: Ruta completa del archivo
+            
+        Returns:
+            Diccionario con content (bytearray), size, sha256 y md5, o None si hay error
+        """
         try:
             path = Path(file_path)
             if not path.exists():
-                logger.error(f"Archivo no encontrado: {file_path}")
+                logger.error("Archivo no encontrado: %s", file_path)
                 return None
             
-            with open(path, 'rb') as f:
-                content = f.read()
+            sha256 = hashlib.sha256()
+            md5 = hashlib.md5()
+            with open(path, 'rb', buffering=0) as f:
+                content = bytearray(os.fstat(f.fileno()).st_size)
+                with memoryview(content) as view:
+                    offset = 0
+                    while offset < len(content):
+                        read = f.readinto(view[offset:offset + COPY_BLOCK_SIZE])
+                        if not read:
+                            break
+                        sha256.update(view[offset:offset + read])
+                        md5.update(view[offset:offset + read])
+                        offset += read
+                # El archivo cambió de tamaño mientras se leía
+                del content[offset:]
+                while chunk := f.read(COPY_BLOCK_SIZE):
+                    sha256.update(chunk)
+                    md5.update(chunk)
+                    content += chunk
             
-            logger.debug(f"Archivo leído: {path.name} ({len(content)} bytes)")
-            return content
+            logger.debug("Archivo leído: %s (%s bytes)", path.name, len(content))
+            return {
+                'content': content,
+                'size': len(content),
+                'sha256': sha256.hexdigest(),
+                'md5': md5.hexdigest()
+            }
             
         except Exception as e:
-            logger.error(f"❌ Error al leer archivo {file_path}: {str(e)}")
+            logger.error("❌ Error al leer archivo %s: %s", file_path, e)
             return None
     
-    def copy_to_destination(self, source_file: str, dest_filename: str) -> bool:
+    def copy_to_destination(self, source_file: str, dest_filename: str,
+                            source_sha256: Optional[str] = None,
+                            content=None) -> Dict[str, any]:
         """
         Copia un archivo a la carpeta destino
         
+        Si el destino ya tiene el mismo contenido (mismo tamaño y fecha de
+        modificación, o mismo hash con LOCAL_COPY_VERIFY_HASH) no se copia.
+        
         Args:
             source_file: Ruta del archivo origen
             dest_filename: Nombre del archivo destino
+            source_sha256: SHA-256 del origen si ya se conoce (evita releerlo)
+            content: Contenido ya leído del origen; se escribe desde memoria
+                cuando no hay copia en el kernel (KERNEL_COPY) en lugar de
+                volver a leer el origen (p. ej. por SMB)
             
         Returns:
-            True si la copia fue exitosa, False en caso contrario
+            Diccionario con success, action (copied/skipped), bytes copiados
+            y throughputBps
         """
+        result = {'success': False, 'action': 'copied', 'bytes': 0, 'throughputBps': None}
+        breaker = circuit_breakers.get('local')
+        if not breaker.allow():
+            logger.warning("⚡ Circuito de la carpeta destino abierto, se omite la copia de %s",
+                           dest_filename)
+            result.update(action='skipped', error='circuit_open')
+            return result
+        
         try:
             source = Path(source_file)
             destination = self.dest_path / dest_filename
             
             if not source.exists():
-                logger.error(f"Archivo origen no existe: {source}")
-                return False
+                logger.error("Archivo origen no existe: %s", source)
+                return result
             
             # Crear carpeta destino si no existe
             destination.parent.mkdir(parents=True, exist_ok=True)
             
-            # Copiar archivo
-            shutil.copy2(source, destination)
+            if self._is_identical(source, destination, source_sha256):
+                logger.info("⏭️  Copia omitida (destino idéntico): %s", destination)
+                breaker.record_success()
+                result.update(success=True, action='skipped')
+                return result
             
-            logger.info(f"✅ Archivo copiado: {source.name} -> {destination}")
-            return True
+            # Copiar a un temporal y reemplazar, para no dejar un destino a medias
+            start = time.perf_counter()
+            tmp_destination = destination.with_name(destination.name + '.tmp')
+            if content is not None and not KERNEL_COPY:
+                tmp_destination.write_bytes(content)
+                copied = len(content)
+            else:
+                copied = self._copy_contents(source, tmp_destination)
+            shutil.copystat(source, tmp_destination)
+            os.replace(tmp_destination, destination)
+            elapsed = time.perf_counter() - start
+            
+            throughput = copied / elapsed if elapsed > 0 else None
+            instrumentation.count('bytes.local', copied)
+            breaker.record_success()
+            result.update(success=True, bytes=copied, throughputBps=throughput)
+            logger.info(
+                "✅ Archivo copiado: %s -> %s "
+                "(%.1f MB, %.1f MB/s)",
+                source.name, destination, copied / 1024 / 1024, (throughput or 0) / 1024 / 1024)
+            return result
             
         except Exception as e:
-            logger.error(f"❌ Error al copiar archivo {source_file}: {str(e)}")
+            logger.error("❌ Error al copiar archivo %s: %s", source_file, e)
+            breaker.record_failure()
+            return result
+    
+    def _is_identical(self, source: Path, destination: Path,
+                      source_sha256: Optional[str] = None) -> bool:
+        """
+        Comprueba si el destino ya tiene el mismo contenido que el origen
+        
+        Args:
+            source: Archivo origen
+            destination: Archivo destino
+            source_sha256: SHA-256 del origen si ya se conoce
+            
+        Returns:
+            True si el destino existe y es idéntico
+        """
+        try:
+            dest_stat = destination.stat()
+        except FileNotFoundError:
             return False
+        source_stat = source.stat()
+        
+        if source_stat.st_size != dest_stat.st_size:
+            return False
+        if LOCAL_COPY_VERIFY_HASH:
+            return (source_sha256 or self._file_digest(source)) == self._file_digest(destination)
+        return abs(source_stat.st_mtime - dest_stat.st_mtime) <= MTIME_TOLERANCE
+    
+    @staticmethod
+    def _file_digest(path: Path) -> str:
+        """Calcula el SHA-256 de un archivo leyéndolo por bloques"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            while chunk := f.read(COPY_BLOCK_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _copy_contents(source: Path, destination: Path) -> int:
+        """
+        Copia el contenido de un archivo usando las vías sin copia en espacio de
+        usuario del kernel (copy_file_range, sendfile) cuando están disponibles,
+        y bloques grandes en otro caso
+        
+        Args:
+            source: Archivo origen
+            destination: Archivo destino (se sobrescribe)
+            
+        Returns:
+            Bytes copiados
+        """
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            size = os.fstat(src.fileno()).st_size
+            for kernel_copy in (getattr(os, 'copy_file_range', None), getattr(os, 'sendfile', None)):
+                if kernel_copy is None:
+                    continue
+                try:
+                    copied = 0
+                    while copied < size:
+                        if kernel_copy is os.sendfile:
+                            sent = os.sendfile(dst.fileno(), src.fileno(), copied, size - copied)
+                        else:
+                            sent = os.copy_file_range(src.fileno(), dst.fileno(), size - copied,
+                                                      copied, copied)
+                        if sent == 0:
+                            break
+                        copied += sent
+                    if copied == size:
+                        return copied
+                except OSError:
+                    pass
+                # Vía no soportada entre estos sistemas de archivos: reiniciar con la siguiente
+                dst.seek(0)
+                dst.truncate()
+            
+            src.seek(0)
+            copied = 0
+            while chunk := src.read(COPY_BLOCK_SIZE):
+                dst.write(chunk)
+                copied += len(chunk)
+            return copied
     
     def delete_file(self, file_path: str) -> bool:
         """
@@ -127,15 +422,33 @@ class FileService:
             path = Path(file_path)
             
             if not path.exists():
-                logger.warning(f"Archivo no existe (ya eliminado?): {file_path}")
+                logger.warning("Archivo no existe (ya eliminado?): %s", file_path)
                 return True  # Considerar exitoso si ya no existe
             
-            path.unlink()
-            logger.info(f"🗑️  Archivo eliminado: {path.name}")
+            with instrumentation.timer('local.delete'):
+                path.unlink()
+            logger.info("🗑️  Archivo eliminado: %s", path.name)
             return True
             
         except Exception as e:
-            logger.error(f"❌ Error al eliminar archivo {file_path}: {str(e)}")
+            logger.error("❌ Error al eliminar archivo %s: %s", file_path, e)
+            return False
+    
+    def check_destination(self) -> bool:
+        """
+        Comprueba que la carpeta destino existe (o se puede crear) y admite escritura
+        
+        Returns:
+            True si se puede escribir en la carpeta destino
+        """
+        probe = self.dest_path / f".preflight_{os.getpid()}.tmp"
+        try:
+            self.dest_path.mkdir(parents=True, exist_ok=True)
+            probe.write_bytes(b'')
+            probe.unlink()
+            return True
+        except OSError as e:
+            logger.error("❌ No se puede escribir en la carpeta destino %s: %s", self.dest_path, e)
             return False
     
     def file_exists(self, file_path: str) -> bool:
@@ -3,10 +3,12 @@ Servicio para subir archivos al FTP de Selk
 """
 import ftplib
 from typing import Optional
-from io import BytesIO
 
 from config import FTP_HOST, FTP_PORT, FTP_USER, FTP_PASSWORD, FTP_UPLOAD_PATH
 from utils.logger import logger
+from utils.circuit_breaker import circuit_breakers
+from utils.instrumentation import instrumentation
+from utils.memory import BufferReader
 
 
 class FTPService:
@@ -19,6 +21,7 @@ class FTPService:
         self.password = FTP_PASSWORD
         self.upload_path = FTP_UPLOAD_PATH
         self.ftp = None
+        self.breaker = circuit_breakers.get('ftp')
     
     def _connect(self) -> bool:
         """
@@ -29,23 +32,25 @@ class FTPService:
         """
         try:
             self.ftp = ftplib.FTP()
-            self.ftp.connect(self.host, self.port, timeout=30)
-            self.ftp.login(self.user, self.password)
+            with instrumentation.timer('ftp.connect'):
+                self.ftp.connect(self.host, self.port, timeout=30)
+            with instrumentation.timer('ftp.login'):
+                self.ftp.login(self.user, self.password)
             
             # Cambiar al directorio de subida
             try:
                 self.ftp.cwd(self.upload_path)
             except ftplib.error_perm:
-                logger.warning(f"Directorio {self.upload_path} no existe, intentando crear...")
+                logger.warning("Directorio %s no existe, intentando crear...", self.upload_path)
                 # Intentar crear directorios recursivamente
                 self._create_directory_recursive(self.upload_path)
                 self.ftp.cwd(self.upload_path)
             
-            logger.info(f"✅ Conectado al FTP: {self.host}:{self.port}")
+            logger.info("✅ Conectado al FTP: %s:%s", self.host, self.port)
             return True
             
         except ftplib.all_errors as e:
-            logger.error(f"❌ Error al conectar con FTP: {str(e)}")
+            logger.error("❌ Error al conectar con FTP: %s", e)
             self.ftp = None
             return False
     
@@ -66,9 +71,9 @@ class FTPService:
             except ftplib.error_perm:
                 try:
                     self.ftp.mkd(current_path)
-                    logger.debug(f"Directorio creado en FTP: {current_path}")
+                    logger.debug("Directorio creado en FTP: %s", current_path)
                 except ftplib.error_perm as e:
-                    logger.warning(f"No se pudo crear directorio {current_path}: {str(e)}")
+                    logger.warning("No se pudo crear directorio %s: %s", current_path, e)
     
     def _disconnect(self):
         """Cierra la conexión FTP"""
@@ -83,37 +88,76 @@ class FTPService:
                     pass
             self.ftp = None
     
-    def upload_file(self, file_content: bytes, remote_filename: str) -> bool:
+    def upload_file(self, file_content: bytes, remote_filename: str,
+                    verify_size: bool = False) -> bool:
         """
         Sube un archivo al servidor FTP
         
         Args:
             file_content: Contenido del archivo en bytes
             remote_filename: Nombre del archivo en el servidor
+            verify_size: Comprobar con SIZE que el servidor recibió todos los bytes
             
         Returns:
             True si la subida fue exitosa, False en caso contrario
         """
+        if not self.breaker.allow():
+            logger.warning("⚡ Circuito FTP abierto, se omite la subida de %s", remote_filename)
+            return False
+        
         if not self._connect():
+            self.breaker.record_failure()
             return False
         
         try:
-            # Crear un objeto BytesIO para simular un archivo
-            file_obj = BytesIO(file_content)
+            # Leer el contenido como archivo sin copiarlo
+            file_obj = BufferReader(file_content)
             
             # Subir archivo
-            self.ftp.storbinary(f'STOR {remote_filename}', file_obj)
+            with instrumentation.timer('ftp.stor'):
+                self.ftp.storbinary(f'STOR {remote_filename}', file_obj)
+            instrumentation.count('bytes.ftp', len(file_content))
+            self.breaker.record_success()
             
-            logger.info(f"✅ Archivo subido al FTP: {remote_filename}")
+            if verify_size and not self._verify_size(remote_filename, len(file_content)):
+                return False
+            
+            logger.info("✅ Archivo subido al FTP: %s", remote_filename)
             return True
             
         except ftplib.all_errors as e:
-            logger.error(f"❌ Error al subir archivo al FTP: {str(e)}")
+            logger.error("❌ Error al subir archivo al FTP: %s", e)
+            self.breaker.record_failure()
             return False
             
         finally:
             self._disconnect()
     
+    def _verify_size(self, remote_filename: str, expected_size: int) -> bool:
+        """
+        Compara el tamaño remoto (comando SIZE) con el esperado
+        
+        Args:
+            remote_filename: Nombre del archivo en el servidor
+            expected_size: Tamaño en bytes del origen
+            
+        Returns:
+            False solo si el servidor informa un tamaño distinto
+        """
+        try:
+            with instrumentation.timer('ftp.size'):
+                remote_size = self.ftp.size(remote_filename)
+        except ftplib.error_perm as e:
+            logger.warning("El servidor FTP no admite SIZE, no se verifica %s: %s", remote_filename, e)
+            return True
+        
+        if remote_size != expected_size:
+            logger.error(
+                "❌ Tamaño en FTP no coincide para %s: %s != %s",
+                remote_filename, remote_size, expected_size)
+            return False
+        return True
+    
     def file_exists(self, remote_filename: str) -> bool:
         """
         Verifica si un archivo existe en el servidor FTP
@@ -132,11 +176,11 @@ class FTPService:
             files = self.ftp.nlst()
             exists = remote_filename in files
             
-            logger.debug(f"Archivo {'existe' if exists else 'no existe'} en FTP: {remote_filename}")
+            logger.debug("Archivo %s en FTP: %s", 'existe' if exists else 'no existe', remote_filename)
             return exists
             
         except ftplib.all_errors as e:
-            logger.error(f"❌ Error al verificar archivo en FTP: {str(e)}")
+            logger.error("❌ Error al verificar archivo en FTP: %s", e)
             return False
             
         finally:
@@ -157,23 +201,44 @@ class FTPService:
         
         try:
             self.ftp.delete(remote_filename)
-            logger.info(f"🗑️  Archivo eliminado del FTP: {remote_filename}")
+            logger.info("🗑️  Archivo eliminado del FTP: %s", remote_filename)
             return True
             
         except ftplib.all_errors as e:
-            logger.error(f"❌ Error al eliminar archivo del FTP: {str(e)}")
+            logger.error("❌ Error al eliminar archivo del FTP: %s", e)
             return False
             
         finally:
             self._disconnect()
     
-    def test_connection(self) -> bool:
+    def test_connection(self, timeout: float = 30) -> bool:
         """
-        Prueba la conexión FTP
+        Prueba la conexión FTP (conexión, login y carpeta de subida) con una
+        conexión propia, sin tocar la de las subidas
         
+        Args:
+            timeout: Timeout de conexión en segundos
+            
         Returns:
             True si la conexión es exitosa, False en caso contrario
         """
-        result = self._connect()
-        self._disconnect()
-        return result
+        ftp = ftplib.FTP()
+        try:
+            with instrumentation.timer('ftp.connect'):
+                ftp.connect(self.host, self.port, timeout=timeout)
+            with instrumentation.timer('ftp.login'):
+                ftp.login(self.user, self.password)
+            ftp.cwd(self.upload_path)
+            return True
+            
+        except ftplib.all_errors as e:
+            logger.error("❌ Error al comprobar la conexión con FTP: %s", e)
+            return False
+            
+        finally:
+            # Sin conexión abierta quit() fallaría fuera de ftplib.all_errors
+            if ftp.sock is not None:
+                try:
+                    ftp.quit()
+                except Exception:
+                    ftp.close()
@@ -0,0 +1,239 @@
+"""
+Diario local (write-ahead) de operaciones sobre MongoDB
+Registra en SQLite cada cambio de estado antes de enviarlo a MongoDB
+para poder reenviarlo en bloque cuando la conexión se recupere
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from config import JOURNAL_FILE, JOURNAL_RETENTION_DAYS
+from utils.logger import logger
+
+
+class JournalService:
+    """Diario append-only en SQLite para operaciones pendientes de MongoDB"""
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                execution_id TEXT NOT NULL,
+                file_name TEXT,
+                operation TEXT,
+                status TEXT,
+                details TEXT,
+                duration_ms REAL,
+                timestamp TEXT NOT NULL,
+                replayed INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_entries_pending ON entries (replayed, id)")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_entries_execution ON entries (execution_id, file_name)")
+        self.conn.commit()
+        logger.debug("Diario local inicializado: %s", self.path)
+
+    def append_stage(self, execution_id: str, file_name: str, operation: str,
+                     status: str, details: Dict = None,
+                     duration_ms: Optional[float] = None,
+                     timestamp: Optional[datetime] = None) -> int:
+        """
+        Registra el resultado de una etapa
+
+        Args:
+            execution_id: ID de ejecución
+            file_name: Nombre del archivo
+            operation: Etapa (local, drive, ftp)
+            status: Estado (success, error)
+            details: Detalles adicionales
+            duration_ms: Duración de la etapa en milisegundos
+            timestamp: Momento de la operación (ahora si se omite)
+
+        Returns:
+            ID de la entrada en el diario
+        """
+        timestamp = timestamp or datetime.now()
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT INTO entries (kind, execution_id, file_name, operation, status, "
+                "details, duration_ms, timestamp) VALUES ('stage', ?, ?, ?, ?, ?, ?, ?)",
+                (execution_id, file_name, operation, status,
+                 json.dumps(details or {}, default=str), duration_ms,
+                 timestamp.isoformat())
+            )
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def append_delete(self, execution_id: str, file_names: Optional[List[str]] = None) -> int:
+        """
+        Registra una limpieza de documentos pendiente de aplicar en MongoDB
+
+        Args:
+            execution_id: ID de ejecución
+            file_names: Archivos a limpiar (todos los de la ejecución si se omite)
+
+        Returns:
+            ID de la entrada en el diario
+        """
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT INTO entries (kind, execution_id, details, timestamp) "
+                "VALUES ('delete', ?, ?, ?)",
+                (execution_id,
+                 json.dumps({'fileNames': file_names}),
+                 datetime.now().isoformat())
+            )
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def append_metrics(self, execution_id: str, records: List[Dict],
+                       timestamp: Optional[datetime] = None) -> int:
+        """
+        Registra las métricas de una ejecución pendientes de guardar en MongoDB
+
+        Args:
+            execution_id: ID de ejecución
+            records: Registros de la colección de métricas (sin timestamp)
+            timestamp: Momento de las métricas (ahora si se omite)
+
+        Returns:
+            ID de la entrada en el diario
+        """
+        timestamp = timestamp or datetime.now()
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT INTO entries (kind, execution_id, details, timestamp) "
+                "VALUES ('metrics', ?, ?, ?)",
+                (execution_id,
+                 json.dumps({'records': records}, default=str),
+                 timestamp.isoformat())
+            )
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def pending(self, limit: int = 1000) -> List[Dict]:
+        """
+        Obtiene las entradas aún no aplicadas en MongoDB, en orden de llegada
+
+        Args:
+            limit: Número máximo de entradas
+
+        Returns:
+            Lista de entradas pendientes
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, kind, execution_id, file_name, operation, status, details, "
+                "duration_ms, timestamp FROM entries WHERE replayed = 0 ORDER BY id LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+        return [
+            {
+                'id': row[0],
+                'kind': row[1],
+                'executionId': row[2],
+                'fileName': row[3],
+                'operation': row[4],
+                'status': row[5],
+                'details': json.loads(row[6]) if row[6] else {},
+                'durationMs': row[7],
+                'timestamp': datetime.fromisoformat(row[8])
+            }
+            for row in rows
+        ]
+
+    def pending_count(self) -> int:
+        """Número de entradas pendientes de aplicar en MongoDB"""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM entries WHERE replayed = 0").fetchone()[0]
+
+    def mark_replayed(self, entry_ids: List[int]):
+        """
+        Marca entradas como aplicadas en MongoDB
+
+        Args:
+            entry_ids: IDs de las entradas aplicadas
+        """
+        if not entry_ids:
+            return
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE entries SET replayed = 1 WHERE id = ?",
+                [(entry_id,) for entry_id in entry_ids]
+            )
+            self.conn.commit()
+
+    def remove(self, entry_ids: List[int]):
+        """
+        Elimina entradas que ya se escribieron directamente en MongoDB
+        (no hace falta conservarlas para reenviarlas)
+
+        Args:
+            entry_ids: IDs de las entradas
+        """
+        if not entry_ids:
+            return
+        with self._lock:
+            self.conn.executemany(
+                "DELETE FROM entries WHERE id = ?",
+                [(entry_id,) for entry_id in entry_ids]
+            )
+            self.conn.commit()
+
+    def discard_pending(self, execution_id: str, file_names: Optional[List[str]] = None) -> int:
+        """
+        Descarta etapas pendientes de archivos cuyos documentos se van a limpiar
+
+        Args:
+            execution_id: ID de ejecución
+            file_names: Archivos afectados (todos los de la ejecución si se omite)
+
+        Returns:
+            Número de entradas descartadas
+        """
+        query = "DELETE FROM entries WHERE replayed = 0 AND kind = 'stage' AND execution_id = ?"
+        params = [execution_id]
+        if file_names is not None:
+            if not file_names:
+                return 0
+            query += f" AND file_name IN ({', '.join('?' * len(file_names))})"
+            params.extend(file_names)
+
+        with self._lock:
+            cursor = self.conn.execute(query, params)
+            self.conn.commit()
+            return cursor.rowcount
+
+    def purge_replayed(self, retention_days: int = JOURNAL_RETENTION_DAYS) -> int:
+        """
+        Elimina entradas ya aplicadas más antiguas que la retención
+
+        Args:
+            retention_days: Días que se conservan las entradas aplicadas
+
+        Returns:
+            Número de entradas eliminadas
+        """
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM entries WHERE replayed = 1 AND timestamp < ?", (cutoff,))
+            self.conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        """Cierra el diario local"""
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,110 @@
+"""
+Servicio para cargar el mapeo de nombres de catálogos desde una fuente externa
+Archivo JSON/YAML o colección de MongoDB, recargado solo cuando cambia
+"""
+import json
+from typing import Dict, Optional
+
+from config import (
+    BASE_DIR, CATALOG_MAPPING_FILE, CATALOG_MAPPING_COLLECTION, CATALOG_MAPPING_MONGO_TIMEOUT
+)
+from utils.logger import logger
+from utils.name_mapper import set_catalog_mapping
+
+
+class MappingService:
+    """Mantiene actualizado el mapeo de nombres sin reiniciar el proceso"""
+
+    def __init__(self, mongo_service=None):
+        self.mongo_service = mongo_service
+        self.file_path = BASE_DIR / CATALOG_MAPPING_FILE if CATALOG_MAPPING_FILE else None
+        self.version = None
+
+        if self.file_path:
+            self.source = f"archivo {self.file_path}"
+        elif CATALOG_MAPPING_COLLECTION and mongo_service:
+            self.source = f"colección {CATALOG_MAPPING_COLLECTION}"
+        else:
+            self.source = None
+            logger.info("Mapeo de nombres desde config.py (CATALOG_NAME_MAPPING)")
+
+    def refresh(self) -> bool:
+        """
+        Recarga el mapeo si la fuente ha cambiado desde la última carga
+
+        Si la fuente no está disponible o es inválida se mantiene el mapeo actual.
+        MongoDB se conecta de forma perezosa, así que antes de consultar la
+        colección se espera a la conexión (CATALOG_MAPPING_MONGO_TIMEOUT).
+
+        Returns:
+            True si se cargó un mapeo nuevo
+        """
+        if not self.source:
+            return False
+
+        if not self.file_path and not self.mongo_service.ping(CATALOG_MAPPING_MONGO_TIMEOUT):
+            self._keep_current("MongoDB no está disponible")
+            return False
+
+        version = self._current_version()
+        if version is None:
+            self._keep_current("no se pudo consultar la fuente")
+            return False
+        if version == self.version:
+            return False
+
+        mapping = self._load_file() if self.file_path else self.mongo_service.get_catalog_mapping()
+        if not self._is_valid(mapping):
+            logger.error("❌ Mapeo de nombres inválido en %s", self.source)
+            self._keep_current("mapeo inválido")
+            return False
+
+        set_catalog_mapping(mapping)
+        self.version = version
+        logger.info("🔄 Mapeo de nombres cargado desde %s (%s entradas)", self.source, len(mapping))
+        return True
+
+    def _keep_current(self, reason: str):
+        """Avisa de que no se pudo recargar y de qué mapeo se sigue usando"""
+        if self.version is None:
+            logger.warning(
+                "⚠️  Mapeo de nombres de %s no disponible (%s): "
+                "se usa el de config.py (CATALOG_NAME_MAPPING)", self.source, reason)
+        else:
+            logger.warning(
+                "⚠️  Mapeo de nombres de %s no disponible (%s): "
+                "se mantiene el último cargado", self.source, reason)
+
+    def _current_version(self) -> Optional[str]:
+        """Versión de la fuente: fecha de modificación del archivo o de la colección"""
+        if not self.file_path:
+            return self.mongo_service.get_catalog_mapping_version()
+
+        try:
+            stat = self.file_path.stat()
+            return f"{stat.st_mtime_ns}:{stat.st_size}"
+        except OSError as e:
+            logger.error("❌ No se puede acceder al archivo de mapeo %s: %s", self.file_path, e)
+            return None
+
+    def _load_file(self) -> Optional[Dict[str, str]]:
+        """Lee el mapeo desde un archivo JSON o YAML"""
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                if self.file_path.suffix.lower() in ('.yaml', '.yml'):
+                    import yaml
+                    return yaml.safe_load(f)
+                return json.load(f)
+        except ImportError:
+            logger.error("❌ Se necesita PyYAML para leer el mapeo en YAML (pip install PyYAML)")
+        except Exception as e:
+            logger.error("❌ Error al leer el archivo de mapeo %s: %s", self.file_path, e)
+        return None
+
+    @staticmethod
+    def _is_valid(mapping) -> bool:
+        """Comprueba que el mapeo sea un diccionario no vacío de nombres"""
+        return (
+            isinstance(mapping, dict) and bool(mapping)
+            and all(isinstance(k, str) and isinstance(v, str) for k, v in mapping.items())
+        )
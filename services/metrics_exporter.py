@@ -0,0 +1,202 @@
+"""
+Exportación de métricas en formato de texto de Prometheus
+Servidor HTTP /metrics en modo programado y archivo para el textfile
+collector de node_exporter tras cada ejecución única
+"""
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import METRICS_PORT, METRICS_BIND_ADDRESS, METRICS_TEXTFILE_DIR
+from utils.instrumentation import HISTOGRAM_BUCKETS, Instrumentation, instrumentation
+from utils.logger import logger
+
+PREFIX = "catalog_publisher"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _labels(**labels) -> str:
+    """Formatea las etiquetas de una muestra"""
+    pairs = []
+    for key, value in labels.items():
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"')
+        pairs.append(f'{key}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _split(name: str) -> tuple:
+    """Separa 'servicio.llamada' en (servicio, llamada)"""
+    service, _, call = name.partition('.')
+    return service, call or service
+
+
+class MetricsExporter:
+    """Genera y publica las métricas acumuladas del publicador"""
+
+    def __init__(self, source: Instrumentation = instrumentation,
+                 gauges: Optional[Dict[str, Callable[[], float]]] = None):
+        """
+        Args:
+            source: Instrumentación con los histogramas y totales acumulados
+            gauges: Indicadores instantáneos {nombre: (descripción, función que devuelve el valor)}
+        """
+        self.source = source
+        self.gauges: Dict[str, Tuple[str, Callable[[], float]]] = gauges or {}
+        self._server = None
+
+    def render(self) -> str:
+        """
+        Genera las métricas en formato de texto de Prometheus
+
+        Returns:
+            Texto de exposición
+        """
+        histograms, totals = self.source.cumulative()
+        lines: List[str] = []
+
+        stage_histograms = {n: h for n, h in histograms.items() if n.startswith('stage.')}
+        call_histograms = {n: h for n, h in histograms.items() if not n.startswith('stage.')}
+        self._render_histogram(
+            lines, f"{PREFIX}_stage_duration_seconds", "Duración de cada etapa por catálogo",
+            {name: {'stage': _split(name)[1]} for name in stage_histograms}, stage_histograms)
+        self._render_histogram(
+            lines, f"{PREFIX}_call_duration_seconds", "Duración de las llamadas externas",
+            {name: dict(zip(('service', 'call'), _split(name))) for name in call_histograms},
+            call_histograms)
+
+        # Prefijo del contador: (métrica, descripción, etiqueta o pareja de etiquetas)
+        counters = {
+            'bytes': (f"{PREFIX}_bytes_total", "Bytes transferidos por destino", 'destination'),
+            'stage': (f"{PREFIX}_stage_results_total", "Resultados de etapa por destino",
+                      ('destination', 'outcome')),
+            'retries': (f"{PREFIX}_retries_total", "Reintentos por canal", 'channel'),
+            'runs': (f"{PREFIX}_runs_total", "Ejecuciones por resultado", 'outcome'),
+            'circuit': (f"{PREFIX}_circuit_events_total",
+                        "Aperturas y llamadas rechazadas de cada circuit breaker",
+                        ('destination', 'event')),
+        }
+        samples: Dict[str, List[str]] = {metric: [] for metric, _, _ in counters.values()}
+        errors = []
+        for name, value in sorted(totals.items()):
+            kind, _, rest = name.partition('.')
+            if kind in counters:
+                metric, _, label = counters[kind]
+                if isinstance(label, tuple):
+                    first, _, second = rest.partition('.')
+                    labels = {label[0]: first, label[1]: second}
+                else:
+                    labels = {label: rest}
+                samples[metric].append(f"{metric}{_labels(**labels)} {value}")
+            elif name.endswith('.errors'):
+                service, call = _split(name[:-len('.errors')])
+                errors.append(
+                    f"{PREFIX}_call_errors_total{_labels(service=service, call=call)} {value}")
+
+        for metric, description, _ in counters.values():
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(samples[metric])
+        lines.append(f"# HELP {PREFIX}_call_errors_total Errores en llamadas externas")
+        lines.append(f"# TYPE {PREFIX}_call_errors_total counter")
+        lines.extend(errors)
+
+        for name, (description, read_value) in self.gauges.items():
+            try:
+                value = read_value()
+            except Exception as e:
+                logger.debug("No se pudo leer la métrica %s: %s", name, e)
+                continue
+            lines.append(f"# HELP {PREFIX}_{name} {description}")
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(lines: List[str], metric: str, description: str,
+                          labels: Dict[str, Dict], histograms: Dict):
+        """Añade un histograma acumulado con sus buckets, suma y total"""
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} histogram")
+        for name, (buckets, total_seconds, count) in sorted(histograms.items()):
+            for bound, bucket_count in zip(HISTOGRAM_BUCKETS, buckets):
+                lines.append(f"{metric}_bucket{_labels(**labels[name], le=bound)} {bucket_count}")
+            lines.append(f"{metric}_bucket{_labels(**labels[name], le='+Inf')} {count}")
+            lines.append(f"{metric}_sum{_labels(**labels[name])} {total_seconds:.6f}")
+            lines.append(f"{metric}_count{_labels(**labels[name])} {count}")
+
+    def serve(self, port: int = METRICS_PORT, address: str = METRICS_BIND_ADDRESS) -> bool:
+        """
+        Inicia el endpoint HTTP /metrics en un hilo en segundo plano
+
+        Args:
+            port: Puerto de escucha (0 lo deshabilita)
+            address: Dirección de escucha
+
+        Returns:
+            True si el servidor quedó escuchando
+        """
+        if not port:
+            return False
+
+        exporter = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((address, port), MetricsHandler)
+        except OSError as e:
+            logger.error("❌ No se pudo abrir el endpoint de métricas en %s:%s: %s", address, port, e)
+            return False
+
+        threading.Thread(
+            target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info("📈 Métricas de Prometheus en http://%s:%s/metrics", address, port)
+        return True
+
+    def write_textfile(self, directory: str = METRICS_TEXTFILE_DIR) -> Optional[Path]:
+        """
+        Escribe las métricas para el textfile collector de node_exporter
+        (de forma atómica, para que nunca se lea un archivo a medias)
+
+        Args:
+            directory: Carpeta del textfile collector (vacía lo deshabilita)
+
+        Returns:
+            Ruta del archivo escrito o None
+        """
+        if not directory:
+            return None
+
+        path = Path(directory) / f"{PREFIX}.prom"
+        tmp_path = path.with_suffix('.prom.tmp')
+        try:
+            tmp_path.write_text(self.render(), encoding='utf-8')
+            os.replace(tmp_path, path)
+            logger.info("📈 Métricas escritas en %s", path)
+            return path
+        except OSError as e:
+            logger.error("❌ No se pudieron escribir las métricas en %s: %s", path, e)
+            return None
+
+    def shutdown(self):
+        """Detiene el endpoint HTTP"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
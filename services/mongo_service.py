@@ -1,15 +1,32 @@
 """
 Servicio para logging de operaciones en MongoDB
-Registra cada operación de publicación de catálogos
+Mantiene un documento de estado por archivo y ejecución
+La conexión se establece de forma perezosa en segundo plano
 """
+import socket
+import threading
+import time
 from typing import Dict, List, Optional
 from datetime import datetime
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, OperationFailure
+from pymongo import MongoClient, ASCENDING, UpdateOne, DeleteMany
+from pymongo.errors import CollectionInvalid, ConfigurationError, ConnectionFailure, OperationFailure
+from pymongo.uri_parser import parse_uri
 
-from config import MONGO_URI, MONGO_DB, MONGO_COLLECTION
+from config import (
+    MONGO_URI, MONGO_DB, MONGO_COLLECTION,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_IDLE_TIME_MS, MONGO_RECONNECT_INTERVAL, MONGO_RECONNECT_MAX_INTERVAL,
+    MONGO_METRICS_COLLECTION, METRICS_RETENTION_DAYS, CATALOG_MAPPING_COLLECTION,
+    MONGO_TRACES_COLLECTION
+)
+from services.journal_service import JournalService
+from utils.circuit_breaker import circuit_breakers
+from utils.instrumentation import instrumentation
 from utils.logger import logger
 
+# Etapas que debe completar un archivo para poder eliminarse del origen
+STAGES = ('local', 'drive', 'ftp')
+
 
 class MongoService:
     """Maneja el logging de operaciones en MongoDB"""
@@ -18,169 +35,608 @@ class MongoService:
         self.client = None
         self.db = None
         self.collection = None
-        self._connect()
+        self.metrics_collection = None
+        self.journal = JournalService()
+        # Serializa escrituras directas y reenvío del diario para conservar el orden
+        self._write_lock = threading.RLock()
+        self._reconnect_lock = threading.Lock()
+        self._reconnect_thread = None
+        # Se activa al terminar cada intento de conexión (con éxito o no)
+        self._attempt_done = threading.Event()
+        self._closed = threading.Event()
+        self.breaker = circuit_breakers.get('mongo')
     
-    def _connect(self):
-        """Establece conexión con MongoDB"""
+    def _ensure_connected(self) -> bool:
+        """
+        Comprueba si hay conexión; si no, lanza la conexión en segundo plano
+        sin bloquear al llamante
+        
+        Returns:
+            True si MongoDB está conectado en este momento
+        """
+        if self.client:
+            return True
+        # Con el circuito abierto no se reintenta hasta la próxima ejecución
+        if not self.breaker.is_open:
+            self._start_reconnect()
+        return False
+    
+    def _start_reconnect(self):
+        """Inicia el hilo de conexión en segundo plano si no está en marcha"""
+        with self._reconnect_lock:
+            if self._closed.is_set():
+                return
+            if self._reconnect_thread and self._reconnect_thread.is_alive():
+                return
+            self._reconnect_thread = threading.Thread(
+                target=self._reconnect_loop, name="mongo-reconnect", daemon=True)
+            self._reconnect_thread.start()
+    
+    def _reconnect_loop(self):
+        """
+        Reintenta la conexión con espera exponencial hasta conseguirla
+        o hasta que se abra el circuito de MongoDB
+        """
+        delay = MONGO_RECONNECT_INTERVAL
+        while not self._closed.is_set():
+            connected = self._connect()
+            self._attempt_done.set()
+            if connected:
+                return
+            if self.breaker.is_open:
+                logger.warning("MongoDB sigue sin responder, los cambios quedan en el diario local")
+                return
+            logger.info("🔁 Reintentando conexión con MongoDB en %ss", delay)
+            self._closed.wait(delay)
+            delay = min(delay * 2, MONGO_RECONNECT_MAX_INTERVAL)
+    
+    def _handle_connection_error(self, error: Exception):
+        """Marca la conexión como perdida y programa la reconexión"""
+        if isinstance(error, ConnectionFailure):
+            self.breaker.record_failure()
+            logger.warning("MongoDB no responde, se reintentará la conexión en segundo plano")
+            with self._write_lock:
+                if self.client:
+                    self.client.close()
+                self.client = None
+            self._start_reconnect()
+    
+    def _connect(self) -> bool:
+        """
+        Establece conexión con MongoDB
+        
+        Returns:
+            True si la conexión fue exitosa, False en caso contrario
+        """
+        client = None
         try:
-            self.client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+            client = MongoClient(
+                MONGO_URI,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS
+            )
             # Verificar conexión
-            self.client.admin.command('ping')
-            
-            self.db = self.client[MONGO_DB]
-            self.collection = self.db[MONGO_COLLECTION]
+            client.admin.command('ping')
             
-            logger.info(f"✅ Conectado a MongoDB: {MONGO_DB}.{MONGO_COLLECTION}")
+            with self._write_lock:
+                self.db = client[MONGO_DB]
+                self.collection = self.db[MONGO_COLLECTION]
+                
+                # Migrar documentos del modelo antiguo antes de crear el índice único
+                self.migrate_legacy_logs()
+                self._ensure_indexes()
+                self._ensure_metrics_collection()
+                self._ensure_traces_index()
+                
+                self.client = client
+                self.breaker.record_success()
+                logger.info("✅ Conectado a MongoDB: %s.%s", MONGO_DB, MONGO_COLLECTION)
+                
+                # Aplicar lo registrado en el diario local mientras no había conexión
+                self.replay_journal()
+            return True
             
         except ConnectionFailure as e:
-            logger.error(f"❌ No se pudo conectar a MongoDB: {str(e)}")
-            self.client = None
+            logger.error("❌ No se pudo conectar a MongoDB: %s", e)
         except Exception as e:
-            logger.error(f"❌ Error al conectar con MongoDB: {str(e)}")
-            self.client = None
+            logger.error("❌ Error al conectar con MongoDB: %s", e)
+            
+        if client:
+            client.close()
+        self.client = None
+        self.breaker.record_failure()
+        return False
+    
+    def _ensure_indexes(self):
+        """Crea el índice único (executionId, fileName) del documento de estado"""
+        try:
+            self.collection.create_index(
+                [('executionId', ASCENDING), ('fileName', ASCENDING)],
+                unique=True,
+                name='execution_file_unique'
+            )
+        except OperationFailure as e:
+            logger.warning("No se pudo crear el índice de estado: %s", e)
+    
+    def _ensure_metrics_collection(self):
+        """Crea la colección time-series de métricas con expiración TTL"""
+        expire_after = METRICS_RETENTION_DAYS * 86400
+        try:
+            self.db.create_collection(
+                MONGO_METRICS_COLLECTION,
+                timeseries={
+                    'timeField': 'timestamp',
+                    'metaField': 'meta',
+                    'granularity': 'minutes'
+                },
+                expireAfterSeconds=expire_after
+            )
+            logger.info("📈 Colección de métricas creada: %s", MONGO_METRICS_COLLECTION)
+        except CollectionInvalid:
+            pass  # Ya existe
+        except OperationFailure as e:
+            # MongoDB < 5.0 no soporta time-series: colección normal con índice TTL
+            logger.warning("Colección time-series no disponible, usando índice TTL: %s", e)
+            try:
+                self.db[MONGO_METRICS_COLLECTION].create_index(
+                    'timestamp', expireAfterSeconds=expire_after, name='metrics_ttl')
+            except OperationFailure as e:
+                logger.warning("No se pudo crear el índice TTL de métricas: %s", e)
+                
+        self.metrics_collection = self.db[MONGO_METRICS_COLLECTION]
+    
+    def _ensure_traces_index(self):
+        """Crea el índice TTL de la colección de trazas"""
+        try:
+            self.db[MONGO_TRACES_COLLECTION].create_index(
+                'timestamp', expireAfterSeconds=METRICS_RETENTION_DAYS * 86400, name='traces_ttl')
+        except OperationFailure as e:
+            logger.warning("No se pudo crear el índice TTL de trazas: %s", e)
     
-    def insert_log(self, execution_id: str, file_name: str, operation: str, 
-                   status: str, details: Dict = None) -> bool:
+    def _probe_servers(self, timeout: float) -> bool:
         """
-        Inserta un registro de operación en MongoDB
+        Comprueba por TCP que algún servidor de MONGO_URI acepta conexiones,
+        para no esperar la selección de servidor si la conexión se rechaza
+        
+        Args:
+            timeout: Plazo máximo en segundos por servidor
+            
+        Returns:
+            True si algún servidor acepta la conexión (o no se puede comprobar)
+        """
+        try:
+            nodes = parse_uri(MONGO_URI, connect_timeout=timeout)['nodelist']
+        except (ConfigurationError, ValueError) as e:
+            logger.debug("No se pudo obtener la lista de servidores de MongoDB: %s", e)
+            return True
+        
+        for host, port in nodes:
+            if host.endswith('.sock'):
+                return True
+            try:
+                with socket.create_connection((host, port), timeout=timeout):
+                    return True
+            except OSError as e:
+                logger.debug("MongoDB %s:%s no acepta conexiones: %s", host, port, e)
+        return False
+    
+    def ping(self, timeout: float) -> bool:
+        """
+        Comprueba que MongoDB responde; si no hay conexión, espera como
+        máximo `timeout` segundos al siguiente intento de conexión en segundo
+        plano. Si ningún servidor acepta la conexión falla al instante
+        
+        Args:
+            timeout: Plazo máximo en segundos
+            
+        Returns:
+            True si MongoDB está disponible
+        """
+        if not self.client:
+            if self.breaker.is_open:
+                return False
+            start = time.monotonic()
+            if not self._probe_servers(timeout):
+                logger.error("❌ MongoDB rechaza la conexión")
+                return False
+            self._attempt_done.clear()
+            self._ensure_connected()
+            self._attempt_done.wait(max(timeout - (time.monotonic() - start), 0))
+            return self.client is not None
+            
+        try:
+            with instrumentation.timer('mongo.ping'):
+                self.client.admin.command('ping')
+            return True
+        except Exception as e:
+            logger.error("❌ MongoDB no responde al ping: %s", e)
+            self._handle_connection_error(e)
+            return False
+    
+    def migrate_legacy_logs(self) -> int:
+        """
+        Migra los documentos del modelo antiguo (uno por etapa y archivo)
+        al modelo de estado (uno por ejecución y archivo)
+        
+        Returns:
+            Número de documentos antiguos migrados
+        """
+        legacy_query = {'operation': {'$exists': True}}
+        if not self.collection.find_one(legacy_query, {'_id': 1}):
+            return 0
+            
+        logger.info("🔁 Migrando logs antiguos de MongoDB al modelo de estado...")
+        
+        requests = []
+        legacy_ids = []
+        for log in self.collection.find(legacy_query).sort('timestamp', ASCENDING):
+            operation = log.get('operation')
+            legacy_ids.append(log['_id'])
+            if operation not in STAGES or not log.get('fileName'):
+                continue
+                
+            requests.append(UpdateOne(
+                {
+                    'executionId': log.get('executionId'),
+                    'fileName': log['fileName'],
+                    'operation': {'$exists': False}
+                },
+                {
+                    '$set': {
+                        f'stages.{operation}': {
+                            'status': log.get('status'),
+                            'timestamp': log.get('timestamp'),
+                            'durationMs': None,
+                            'details': log.get('details') or {}
+                        },
+                        'updatedAt': log.get('timestamp')
+                    },
+                    '$setOnInsert': {'createdAt': log.get('timestamp')}
+                },
+                upsert=True
+            ))
+            
+        if requests:
+            self.collection.bulk_write(requests, ordered=True)
+        self.collection.delete_many({'_id': {'$in': legacy_ids}})
+        
+        logger.info("✅ Migrados %s logs antiguos", len(legacy_ids))
+        return len(legacy_ids)
+    
+    def update_stage(self, execution_id: str, file_name: str, operation: str,
+                     status: str, details: Dict = None,
+                     duration_ms: Optional[float] = None) -> bool:
+        """
+        Actualiza el estado de una etapa en el documento del archivo
+        (lo crea si aún no existe para esta ejecución)
+        
+        El cambio se registra primero en el diario local; si MongoDB no está
+        disponible queda pendiente y se aplica al recuperar la conexión.
         
         Args:
             execution_id: ID único de ejecución
             file_name: Nombre del archivo
-            operation: Tipo de operación (local, drive, ftp)
+            operation: Etapa (local, drive, ftp)
             status: Estado (success, error)
             details: Detalles adicionales
+            duration_ms: Duración de la etapa en milisegundos
             
         Returns:
-            True si se insertó correctamente, False en caso contrario
+            True si se aplicó en MongoDB, False si quedó pendiente en el diario
         """
-        if not self.client:
-            logger.warning("MongoDB no está conectado, no se puede insertar log")
+        now = datetime.now()
+        entry_id = self.journal.append_stage(
+            execution_id, file_name, operation, status, details, duration_ms, now)
+            
+        if not self._ensure_connected():
+            logger.debug("MongoDB no está conectado, estado guardado en el diario local")
             return False
-        
+            
         try:
-            document = {
-                'executionId': execution_id,
-                'fileName': file_name,
-                'operation': operation,
-                'status': status,
-                'timestamp': datetime.now(),
-                'details': details or {}
+            with self._write_lock, instrumentation.timer('mongo.update_stage'):
+                result = self.collection.update_one(
+                    *self._stage_update(execution_id, file_name, operation, status,
+                                        details, duration_ms, now),
+                    upsert=True
+                )
+                self.journal.remove([entry_id])
+            logger.debug("Estado actualizado: %s - %s - %s", operation, file_name, status)
+            return result.acknowledged
+            
+        except Exception as e:
+            logger.error("❌ Error al actualizar estado en MongoDB: %s", e)
+            self._handle_connection_error(e)
+            return False
+    
+    @staticmethod
+    def _stage_update(execution_id: str, file_name: str, operation: str, status: str,
+                      details: Optional[Dict], duration_ms: Optional[float],
+                      timestamp: datetime) -> tuple:
+        """Construye el filtro y la actualización $set de una etapa"""
+        return (
+            {'executionId': execution_id, 'fileName': file_name},
+            {
+                '$set': {
+                    f'stages.{operation}': {
+                        'status': status,
+                        'timestamp': timestamp,
+                        'durationMs': duration_ms,
+                        'details': details or {}
+                    },
+                    'updatedAt': timestamp
+                },
+                '$setOnInsert': {'createdAt': timestamp}
             }
+        )
+    
+    def replay_journal(self, batch_size: int = 500) -> int:
+        """
+        Aplica en bloque en MongoDB las entradas pendientes del diario local
+        
+        Args:
+            batch_size: Entradas por cada bulk_write
             
-            result = self.collection.insert_one(document)
-            logger.debug(f"Log insertado: {operation} - {file_name} - {status}")
-            return bool(result.inserted_id)
+        Returns:
+            Número de entradas aplicadas
+        """
+        if not self.client:
+            return 0
+            
+        replayed = 0
+        try:
+            while True:
+                entries = self.journal.pending(batch_size)
+                if not entries:
+                    break
+                    
+                requests = []
+                metrics = []
+                for entry in entries:
+                    if entry['kind'] == 'metrics':
+                        metrics.extend(
+                            {**record, 'timestamp': entry['timestamp']}
+                            for record in entry['details']['records'])
+                    elif entry['kind'] == 'delete':
+                        query = {'executionId': entry['executionId']}
+                        file_names = entry['details'].get('fileNames')
+                        if file_names is not None:
+                            query['fileName'] = {'$in': file_names}
+                        requests.append(DeleteMany(query))
+                    else:
+                        requests.append(UpdateOne(
+                            *self._stage_update(
+                                entry['executionId'], entry['fileName'], entry['operation'],
+                                entry['status'], entry['details'], entry['durationMs'],
+                                entry['timestamp']),
+                            upsert=True
+                        ))
+                        
+                with instrumentation.timer('mongo.replay'):
+                    if requests:
+                        self.collection.bulk_write(requests, ordered=True)
+                    if metrics:
+                        self.metrics_collection.insert_many(metrics, ordered=False)
+                self.journal.mark_replayed([entry['id'] for entry in entries])
+                replayed += len(entries)
+                
+            if replayed:
+                logger.info("🔁 Aplicadas %s operaciones pendientes del diario local", replayed)
+            self.journal.purge_replayed()
             
         except Exception as e:
-            logger.error(f"❌ Error al insertar log en MongoDB: {str(e)}")
-            return False
+            logger.error("❌ Error al aplicar el diario local en MongoDB: %s", e)
+            self._handle_connection_error(e)
+            
+        return replayed
     
-    def get_logs_by_execution(self, execution_id: str) -> List[Dict]:
+    def record_run_metrics(self, execution_id: str, results: List[Dict],
+                           duration_ms: float, outcome: str,
+                           timings: Optional[Dict] = None,
+                           memory: Optional[Dict] = None,
+                           circuits: Optional[Dict] = None) -> bool:
         """
-        Obtiene todos los logs de una ejecución
+        Registra las métricas de la ejecución y de cada etapa en la colección time-series
+        
+        El campo meta (por el que MongoDB agrupa los buckets) solo lleva claves de
+        baja cardinalidad (type, stage); executionId y fileName son campos normales.
+        Las métricas se guardan antes en el diario local, así que si MongoDB no
+        está disponible se insertan al reconectar.
         
         Args:
             execution_id: ID de ejecución
+            results: Resultados de process_catalog (con métricas por etapa)
+            duration_ms: Duración total de la ejecución en milisegundos
+            outcome: Resultado global (success, partial, failed, error)
+            timings: Resumen p50/p95/máximo por etapa y llamada externa
+            memory: Memoria residente al terminar y pico de la ejecución
+            circuits: Estado del circuit breaker de cada destino
             
         Returns:
-            Lista de documentos encontrados
+            True si se registraron en MongoDB, False si quedaron pendientes en el diario
         """
-        if not self.client:
-            logger.warning("MongoDB no está conectado")
-            return []
+        now = datetime.now()
+        records = []
+        total_bytes = 0
+        
+        for result in results:
+            for stage, metrics in result.get('stages', {}).items():
+                total_bytes += metrics['bytes']
+                records.append({
+                    'meta': {'type': 'stage', 'stage': stage},
+                    'executionId': execution_id,
+                    'fileName': result['relPath'],
+                    'durationMs': metrics['durationMs'],
+                    'bytes': metrics['bytes'],
+                    'throughputBps': self._throughput(metrics['bytes'], metrics['durationMs']),
+                    'outcome': metrics['outcome']
+                })
+                
+        records.append({
+            'meta': {'type': 'run'},
+            'executionId': execution_id,
+            'durationMs': duration_ms,
+            'bytes': total_bytes,
+            'throughputBps': self._throughput(total_bytes, duration_ms),
+            'outcome': outcome,
+            'catalogs': len(results),
+            'published': sum(1 for r in results if r['local'] and r['drive'] and r['ftp']),
+            'timings': timings or {},
+            'memory': memory or {},
+            'circuits': circuits or {}
+        })
+        entry_id = self.journal.append_metrics(execution_id, records, now)
         
+        if not self._ensure_connected():
+            logger.warning("MongoDB no está conectado, métricas guardadas en el diario local")
+            return False
+            
         try:
-            logs = list(self.collection.find({'executionId': execution_id}))
-            logger.debug(f"Recuperados {len(logs)} logs para ejecución {execution_id}")
-            return logs
+            with self._write_lock, instrumentation.timer('mongo.record_metrics'):
+                self.metrics_collection.insert_many(
+                    [{**record, 'timestamp': now} for record in records], ordered=False)
+                self.journal.remove([entry_id])
+            logger.debug("Registradas %s métricas para ejecución %s", len(records), execution_id)
+            return True
             
         except Exception as e:
-            logger.error(f"❌ Error al obtener logs: {str(e)}")
-            return []
+            logger.error("❌ Error al registrar métricas en MongoDB: %s", e)
+            self._handle_connection_error(e)
+            return False
+    
+    def purge_journal(self) -> int:
+        """
+        Elimina del diario local las entradas reenviadas más antiguas que
+        JOURNAL_RETENTION_DAYS (se llama al final de cada ejecución)
+        
+        Returns:
+            Número de entradas eliminadas
+        """
+        purged = self.journal.purge_replayed()
+        if purged:
+            logger.debug("Eliminadas %s entradas antiguas del diario local", purged)
+        return purged
     
-    def delete_logs(self, execution_id: str, file_name: Optional[str] = None) -> int:
+    def record_trace(self, trace: Dict) -> bool:
         """
-        Elimina logs de una ejecución
+        Guarda la traza compacta de una ejecución
+        
+        Args:
+            trace: Traza (executionId, traceId, startTime, durationUs, spans)
+            
+        Returns:
+            True si se guardó correctamente, False en caso contrario
+        """
+        if not self._ensure_connected():
+            logger.warning("MongoDB no está conectado, traza de ejecución descartada")
+            return False
+            
+        try:
+            self.db[MONGO_TRACES_COLLECTION].insert_one({**trace, 'timestamp': datetime.now()})
+            logger.debug("Traza de la ejecución %s guardada en MongoDB", trace['executionId'])
+            return True
+            
+        except Exception as e:
+            logger.error("❌ Error al guardar la traza en MongoDB: %s", e)
+            self._handle_connection_error(e)
+            return False
+    
+    @staticmethod
+    def _throughput(size: int, duration_ms: float) -> float:
+        """Calcula bytes por segundo"""
+        return size / (duration_ms / 1000) if duration_ms > 0 else 0.0
+    
+    def delete_logs(self, execution_id: str, file_names: Optional[List[str]] = None) -> int:
+        """
+        Elimina logs de una ejecución en una sola operación
         
         Args:
             execution_id: ID de ejecución
-            file_name: Nombre de archivo específico (opcional)
+            file_names: Nombres de archivo a limpiar (opcional, todos si se omite)
             
         Returns:
             Número de documentos eliminados
         """
-        if not self.client:
-            logger.warning("MongoDB no está conectado")
-            return 0
+        if file_names is not None:
+            if not file_names:
+                return 0
+            file_names = list(file_names)
+            
+        # Las etapas aún no aplicadas de estos archivos ya no son necesarias
+        self.journal.discard_pending(execution_id, file_names)
         
+        if not self._ensure_connected():
+            logger.warning("MongoDB no está conectado, limpieza guardada en el diario local")
+            self.journal.append_delete(execution_id, file_names)
+            return 0
+            
         try:
             query = {'executionId': execution_id}
-            if file_name:
-                query['fileName'] = file_name
-            
-            result = self.collection.delete_many(query)
+            if file_names is not None:
+                query['fileName'] = {'$in': file_names}
+                
+            with self._write_lock, instrumentation.timer('mongo.delete_logs'):
+                result = self.collection.delete_many(query)
             deleted = result.deleted_count
             
-            logger.debug(f"Eliminados {deleted} logs de MongoDB")
+            logger.debug("Eliminados %s logs de MongoDB", deleted)
             return deleted
             
         except Exception as e:
-            logger.error(f"❌ Error al eliminar logs: {str(e)}")
+            logger.error("❌ Error al eliminar logs: %s", e)
+            self.journal.append_delete(execution_id, file_names)
+            self._handle_connection_error(e)
             return 0
     
-    def get_files_to_delete(self, execution_id: str) -> List[Dict]:
+    def get_catalog_mapping_version(self) -> Optional[str]:
         """
-        Obtiene los archivos que pueden ser eliminados
-        (aquellos que completaron exitosamente todas las operaciones)
+        Obtiene la versión de la colección de mapeo de nombres
+        (número de documentos y última fecha de modificación)
         
-        Args:
-            execution_id: ID de ejecución
-            
         Returns:
-            Lista de archivos que pueden ser eliminados
+            Versión de la colección o None si MongoDB no está disponible
         """
-        logs = self.get_logs_by_execution(execution_id)
-        
-        if not logs:
-            return []
-        
-        # Agrupar por archivo
-        file_status = {}
-        for log in logs:
-            file_name = log.get('fileName')
-            if not file_name:
-                continue
+        if not self._ensure_connected():
+            return None
             
-            if file_name not in file_status:
-                file_status[file_name] = {
-                    'fileName': file_name,
-                    'local': False,
-                    'drive': False,
-                    'ftp': False
-                }
-            
-            if log.get('status') == 'success':
-                operation = log.get('operation')
-                if operation in ['local', 'drive', 'ftp']:
-                    file_status[file_name][operation] = True
-        
-        # Retornar archivos que completaron todas las operaciones
-        files_to_delete = [
-            {
-                'fileName': file_name,
-                'canDelete': data['local'] and data['drive'] and data['ftp']
-            }
-            for file_name, data in file_status.items()
-        ]
-        
-        deletable = [f for f in files_to_delete if f['canDelete']]
-        logger.info(f"📋 {len(deletable)} archivos pueden ser eliminados de {len(files_to_delete)} procesados")
+        try:
+            mapping_collection = self.db[CATALOG_MAPPING_COLLECTION]
+            count = mapping_collection.count_documents({})
+            latest = mapping_collection.find_one(
+                {}, {'_id': 0, 'updatedAt': 1}, sort=[('updatedAt', -1)])
+            return f"{count}:{(latest or {}).get('updatedAt')}"
+            
+        except Exception as e:
+            logger.error("❌ Error al consultar la versión del mapeo: %s", e)
+            self._handle_connection_error(e)
+            return None
+    
+    def get_catalog_mapping(self) -> Optional[Dict[str, str]]:
+        """
+        Obtiene el mapeo de nombres desde la colección de mapeo
+        (documentos {original, normalized, updatedAt})
         
-        return files_to_delete
+        Returns:
+            Diccionario {nombre_original: nombre_normalizado} o None si hay error
+        """
+        if not self._ensure_connected():
+            return None
+            
+        try:
+            docs = self.db[CATALOG_MAPPING_COLLECTION].find(
+                {}, {'_id': 0, 'original': 1, 'normalized': 1})
+            return {doc['original']: doc['normalized'] for doc in docs}
+            
+        except Exception as e:
+            logger.error("❌ Error al obtener el mapeo de nombres: %s", e)
+            self._handle_connection_error(e)
+            return None
     
     def close(self):
         """Cierra la conexión con MongoDB"""
+        self._closed.set()
         if self.client:
             self.client.close()
             logger.info("🔌 Conexión MongoDB cerrada")
+        self.journal.close()
@@ -0,0 +1,190 @@
+"""
+Bandeja de salida persistente de notificaciones
+Guarda en SQLite cada mensaje de email o Slack hasta que se entrega,
+con reintentos y espera exponencial si el canal no responde
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from config import (
+    NOTIFICATION_OUTBOX_FILE, NOTIFICATION_RETRY_BASE_SECONDS,
+    NOTIFICATION_RETRY_MAX_SECONDS, NOTIFICATION_OUTBOX_RETENTION_DAYS
+)
+
+
+class NotificationOutbox:
+    """Cola persistente de notificaciones pendientes de entrega"""
+
+    def __init__(self, path=NOTIFICATION_OUTBOX_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at TEXT NOT NULL,
+                last_error TEXT,
+                created_at TEXT NOT NULL,
+                sent_at TEXT
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_messages_due ON messages (status, next_attempt_at)")
+        self.conn.commit()
+
+    def enqueue(self, channel: str, payload: Dict[str, Any]) -> int:
+        """
+        Guarda un mensaje pendiente de entrega
+
+        Args:
+            channel: Canal de entrega (email, slack)
+            payload: Contenido ya formateado del mensaje
+
+        Returns:
+            ID del mensaje en la bandeja
+        """
+        now = datetime.now().isoformat()
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT INTO messages (channel, payload, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (channel, json.dumps(payload, ensure_ascii=False, default=str), now, now)
+            )
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def due(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Obtiene los mensajes pendientes cuyo próximo intento ya ha llegado
+
+        Args:
+            limit: Número máximo de mensajes
+
+        Returns:
+            Lista de mensajes en orden de llegada
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, channel, payload, attempts FROM messages "
+                "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (datetime.now().isoformat(), limit)
+            ).fetchall()
+
+        return [
+            {'id': row[0], 'channel': row[1], 'payload': json.loads(row[2]), 'attempts': row[3]}
+            for row in rows
+        ]
+
+    def get(self, message_id: int) -> Optional[Dict[str, Any]]:
+        """Obtiene un mensaje por su ID (None si no existe)"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT id, channel, payload, attempts, status FROM messages WHERE id = ?",
+                (message_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return {'id': row[0], 'channel': row[1], 'payload': json.loads(row[2]),
+                'attempts': row[3], 'status': row[4]}
+
+    def mark_sent(self, message_id: int):
+        """Marca un mensaje como entregado"""
+        with self._lock:
+            self.conn.execute(
+                "UPDATE messages SET status = 'sent', attempts = attempts + 1, sent_at = ? "
+                "WHERE id = ?",
+                (datetime.now().isoformat(), message_id)
+            )
+            self.conn.commit()
+
+    def mark_skipped(self, message_id: int, reason: str):
+        """Descarta un mensaje que no se entregará (p. ej. su canal está deshabilitado)"""
+        with self._lock:
+            self.conn.execute(
+                "UPDATE messages SET status = 'skipped', last_error = ? WHERE id = ?",
+                (reason[:500], message_id)
+            )
+            self.conn.commit()
+
+    def defer(self, message_id: int, reason: str) -> datetime:
+        """
+        Aplaza un mensaje que no se llegó a intentar (p. ej. circuito abierto)
+        sin contarlo como intento ni aumentar la espera
+
+        Args:
+            message_id: ID del mensaje
+            reason: Motivo del aplazamiento
+
+        Returns:
+            Momento del próximo intento
+        """
+        next_attempt = datetime.now() + timedelta(seconds=NOTIFICATION_RETRY_BASE_SECONDS)
+        with self._lock:
+            self.conn.execute(
+                "UPDATE messages SET next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (next_attempt.isoformat(), reason[:500], message_id)
+            )
+            self.conn.commit()
+        return next_attempt
+
+    def mark_failed(self, message_id: int, error: str, permanent: bool = False) -> datetime:
+        """
+        Registra un intento fallido y programa el siguiente con espera exponencial
+
+        Args:
+            message_id: ID del mensaje
+            error: Descripción del error
+            permanent: Si el error no se resolverá reintentando
+
+        Returns:
+            Momento del próximo intento
+        """
+        with self._lock:
+            attempts = self.conn.execute(
+                "SELECT attempts FROM messages WHERE id = ?", (message_id,)).fetchone()[0] + 1
+            delay = min(NOTIFICATION_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+                        NOTIFICATION_RETRY_MAX_SECONDS)
+            next_attempt = datetime.now() + timedelta(seconds=delay)
+            self.conn.execute(
+                "UPDATE messages SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? "
+                "WHERE id = ?",
+                ('failed' if permanent else 'pending', attempts,
+                 next_attempt.isoformat(), error[:500], message_id)
+            )
+            self.conn.commit()
+            return next_attempt
+
+    def pending_count(self) -> int:
+        """Número de mensajes pendientes de entrega"""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE status = 'pending'").fetchone()[0]
+
+    def purge_sent(self, retention_days: int = NOTIFICATION_OUTBOX_RETENTION_DAYS) -> int:
+        """
+        Elimina mensajes terminados (entregados, descartados o con error
+        definitivo) más antiguos que la retención
+
+        Returns:
+            Número de mensajes eliminados
+        """
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM messages WHERE status IN ('sent', 'skipped', 'failed') "
+                "AND COALESCE(sent_at, next_attempt_at) < ?", (cutoff,))
+            self.conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        """Cierra la bandeja de salida"""
+        with self._lock:
+            self.conn.close()
@@ -5,18 +5,30 @@ Utilizado para notificar eventos en la publicación de catálogos.
 import asyncio
 import aiohttp
 import aiosmtplib
+import contextvars
 import os
 import logging
+import threading
 from datetime import datetime
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from typing import List, Optional, Dict, Any
 from dotenv import load_dotenv
 
+from services.alert_state import AlertStateStore
+from services.notification_outbox import NotificationOutbox
+from utils.circuit_breaker import CircuitOpenError, circuit_breakers
+from utils.instrumentation import instrumentation
+from utils.tracing import tracer
+
 # Configurar logging para este módulo
 logger = logging.getLogger("CatalogPublicationLogger")
 
 
+class PermanentDeliveryError(Exception):
+    """El canal rechazó el mensaje de forma definitiva (reintentar no servirá)."""
+
+
 class NotificationManager:
     """Gestor de notificaciones para email y Slack."""
 
@@ -42,6 +54,24 @@ class NotificationManager:
             "username": os.getenv("SLACK_USERNAME", "Catalog-Bot")
         }
 
+        # Modo resumen: agrupa las alertas de una ejecución en un único envío por severidad
+        self.digest_enabled = os.getenv("NOTIFICATION_DIGEST_ENABLED", "true").lower() == "true"
+        self._digest: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._digest_lock = threading.Lock()
+
+        # Bandeja de salida persistente con reintentos
+        self.outbox = NotificationOutbox()
+        self._inflight = set()
+
+        # Deduplicación y enfriamiento de alertas entre ejecuciones
+        self.alert_state = AlertStateStore()
+
+        # Conexiones reutilizables (ligadas al event loop que las crea)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._http_session: Optional[aiohttp.ClientSession] = None
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._smtp_lock: Optional[asyncio.Lock] = None
+
         # Validar configuración
         self._validate_config()
 
@@ -69,155 +99,340 @@ class NotificationManager:
                     "Slack notifications enabled but webhook URL missing. Disabling Slack notifications.")
                 self.slack_config["enabled"] = False
 
-    async def send_email_notification(self, subject: str, message: str, error_details: Optional[Dict[str, Any]] = None, is_critical: bool = False):
+    def _bind_loop(self):
+        """Descarta las conexiones creadas en otro event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._http_session = None
+            self._smtp = None
+            self._smtp_lock = asyncio.Lock()
+
+    async def _get_http_session(self) -> aiohttp.ClientSession:
+        """Devuelve la sesión HTTP compartida, creándola si es necesario."""
+        self._bind_loop()
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=4, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+        return self._http_session
+
+    async def _get_smtp(self) -> aiosmtplib.SMTP:
+        """Devuelve el cliente SMTP autenticado, conectándolo si es necesario."""
+        if self._smtp is None or not self._smtp.is_connected:
+            smtp = aiosmtplib.SMTP(
+                hostname=self.email_config["smtp_server"],
+                port=self.email_config["smtp_port"],
+                start_tls=True,
+                username=self.email_config["sender_email"],
+                password=self.email_config["sender_password"],
+                timeout=30
+            )
+            # connect() negocia STARTTLS y autentica con las credenciales
+            await smtp.connect()
+            self._smtp = smtp
+            logger.debug("SMTP connection established")
+        return self._smtp
+
+    async def _close_smtp(self):
+        """Cierra el cliente SMTP sin propagar errores."""
+        if self._smtp is not None:
+            try:
+                if self._smtp.is_connected:
+                    await self._smtp.quit()
+            except Exception:
+                self._smtp.close()
+            self._smtp = None
+
+    async def check_smtp(self) -> bool:
+        """Comprueba que el servidor SMTP acepta la conexión y las credenciales (preflight)."""
+        self._bind_loop()
+        async with self._smtp_lock:
+            smtp = await self._get_smtp()
+            with instrumentation.timer('smtp.noop'):
+                await smtp.noop()
+        return True
+
+    async def _send_smtp_message(self, email_msg: MIMEMultipart):
+        """Envía un mensaje por la conexión SMTP persistente, reconectando una vez si se cayó."""
+        self._bind_loop()
+        async with self._smtp_lock:
+            for attempt in (1, 2):
+                try:
+                    smtp = await self._get_smtp()
+                    with instrumentation.timer('smtp.send'):
+                        await smtp.send_message(email_msg)
+                    return
+                except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPTimeoutError, ConnectionError) as e:
+                    await self._close_smtp()
+                    if attempt == 2:
+                        raise
+                    logger.warning("SMTP connection lost (%s), reconnecting", e)
+
+    async def _post_slack(self, payload: Dict[str, Any]) -> aiohttp.ClientResponse:
+        """Publica en el webhook de Slack con la sesión compartida, reintentando una vez si falla la conexión."""
+        for attempt in (1, 2):
+            session = await self._get_http_session()
+            try:
+                with instrumentation.timer('slack.post'):
+                    async with session.post(self.slack_config["webhook_url"], json=payload) as response:
+                        await response.read()
+                        return response
+            except aiohttp.ClientConnectionError as e:
+                if attempt == 2:
+                    raise
+                logger.warning("Slack connection lost (%s), retrying", e)
+                await session.close()
+
+    async def close(self):
+        """Cierra la sesión HTTP, la conexión SMTP persistente y la bandeja de salida."""
+        if self._http_session is not None and not self._http_session.closed:
+            await self._http_session.close()
+        self._http_session = None
+        await self._close_smtp()
+        pending = self.outbox.pending_count()
+        if pending:
+            logger.warning("%s notifications remain in the outbox and will be retried on next start",
+                           pending)
+        self.outbox.close()
+
+    def enqueue_email(self, subject: str, message: str, error_details: Optional[Dict[str, Any]] = None, is_critical: bool = False) -> Optional[int]:
         """
-        Envía notificación por email.
+        Guarda un email en la bandeja de salida, en el hilo de quien notifica.
 
         Args:
             subject: Asunto del email
             message: Mensaje principal
             error_details: Detalles adicionales del error
             is_critical: Si es un error crítico (afecta el formato del mensaje)
+
+        Returns:
+            ID del mensaje en la bandeja, o None si el canal está deshabilitado
         """
         if not self.email_config["enabled"]:
             logger.info("Email notifications are disabled")
-            return False
-
-        try:
-            # Crear el mensaje de email
-            email_msg = MIMEMultipart("alternative")
-            email_msg["From"] = self.email_config["sender_email"]
-            email_msg["To"] = ", ".join(
-                self.email_config["notification_emails"])
-
-            # Añadir prefijo según criticidad
-            priority_prefix = "[ERROR CRÍTICO]" if is_critical else "[ADVERTENCIA]"
-            email_msg["Subject"] = f"{priority_prefix} - Publicación de Catálogos: {subject}"
-
-            # Crear contenido HTML y texto plano
-            html_content = self._create_html_email_content(
-                subject, message, error_details, is_critical)
-            plain_content = self._create_plain_email_content(
-                subject, message, error_details, is_critical)
+            return None
 
-            # Adjuntar ambos formatos
-            email_msg.attach(MIMEText(plain_content, "plain", "utf-8"))
-            email_msg.attach(MIMEText(html_content, "html", "utf-8"))
+        # Añadir prefijo según criticidad
+        priority_prefix = "[ERROR CRÍTICO]" if is_critical else "[ADVERTENCIA]"
 
-            # Enviar email usando aiosmtplib
-            await aiosmtplib.send(
-                email_msg,
-                hostname=self.email_config["smtp_server"],
-                port=self.email_config["smtp_port"],
-                start_tls=True,
-                username=self.email_config["sender_email"],
-                password=self.email_config["sender_password"],
-                timeout=30
-            )
-
-            logger.info(
-                f"Email notification sent successfully to {len(self.email_config['notification_emails'])} recipients")
-            return True
-
-        except Exception as e:
-            logger.error(f"Failed to send email notification: {e}")
-            return False
+        # Crear contenido HTML y texto plano
+        payload = {
+            "subject": f"{priority_prefix} - Publicación de Catálogos: {subject}",
+            "html": self._create_html_email_content(
+                subject, message, error_details, is_critical),
+            "plain": self._create_plain_email_content(
+                subject, message, error_details, is_critical)
+        }
+        return self.outbox.enqueue("email", payload)
 
-    async def send_slack_notification(self, message: str, error_details: Optional[Dict[str, Any]] = None, is_critical: bool = False, type: str = "info"):
+    def enqueue_slack(self, message: str, error_details: Optional[Dict[str, Any]] = None, is_critical: bool = False, type: str = "info") -> Optional[int]:
         """
-        Envía notificación por Slack.
+        Guarda un mensaje de Slack en la bandeja de salida, en el hilo de quien notifica.
 
         Args:
             message: Mensaje principal
             error_details: Detalles adicionales del error
             is_critical: Si es un error crítico
             type: Tipo de notificación (info, warning, error)
+
+        Returns:
+            ID del mensaje en la bandeja, o None si el canal está deshabilitado
         """
         if not self.slack_config["enabled"]:
             logger.info("Slack notifications are disabled")
-            return False
+            return None
+
+        # Crear el payload para Slack
+        slack_payload = self._create_slack_payload(
+            message, error_details, is_critical, type=type)
+        return self.outbox.enqueue("slack", slack_payload)
+
+    def _build_email_message(self, payload: Dict[str, str]) -> MIMEMultipart:
+        """Construye el email a partir del contenido guardado en la bandeja."""
+        email_msg = MIMEMultipart("alternative")
+        email_msg["From"] = self.email_config["sender_email"]
+        email_msg["To"] = ", ".join(
+            self.email_config["notification_emails"])
+        email_msg["Subject"] = payload["subject"]
+
+        # Adjuntar ambos formatos
+        email_msg.attach(MIMEText(payload["plain"], "plain", "utf-8"))
+        email_msg.attach(MIMEText(payload["html"], "html", "utf-8"))
+        return email_msg
+
+    async def _deliver(self, channel: str, payload: Dict[str, Any]):
+        """
+        Entrega un mensaje por su canal.
+
+        Raises:
+            PermanentDeliveryError: Si el canal rechaza el mensaje y reintentar no servirá
+            Exception: Cualquier otro fallo (se reintentará)
+        """
+        breaker = circuit_breakers.get("smtp" if channel == "email" else "slack")
+        if not breaker.allow():
+            raise CircuitOpenError(f"{breaker.name} circuit is open")
 
         try:
-            # Crear el payload para Slack
-            slack_payload = self._create_slack_payload(
-                message, error_details, is_critical, type=type)
-
-            # Enviar usando aiohttp
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.slack_config["webhook_url"],
-                    json=slack_payload,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status == 200:
-                        logger.info("Slack notification sent successfully")
-                        return True
-                    else:
-                        logger.error(f"Slack API returned status {response.status}: {await response.text()}")
-                        return False
+            if channel == "email":
+                # Enviar email por la conexión SMTP persistente
+                await self._send_smtp_message(self._build_email_message(payload))
+                breaker.record_success()
+                logger.info(
+                    "Email notification sent successfully to %s recipients",
+                    len(self.email_config['notification_emails']))
+                return
+
+            # Enviar usando la sesión aiohttp compartida
+            response = await self._post_slack(payload)
+        except Exception:
+            breaker.record_failure()
+            raise
+
+        if response.status == 200:
+            breaker.record_success()
+            logger.info("Slack notification sent successfully")
+            return
+
+        error = f"Slack API returned status {response.status}: {await response.text()}"
+        if 400 <= response.status < 500 and response.status != 429:
+            # Slack responde: el mensaje es el problema, no el destino
+            breaker.record_success()
+            raise PermanentDeliveryError(error)
+        breaker.record_failure()
+        raise RuntimeError(error)
+
+    async def _attempt_delivery(self, message: Dict[str, Any]) -> bool:
+        """Intenta entregar un mensaje de la bandeja y registra el resultado."""
+        message_id = message["id"]
+        if message_id in self._inflight:
+            return False
 
+        self._inflight.add(message_id)
+        try:
+            await self._deliver(message["channel"], message["payload"])
+            self.outbox.mark_sent(message_id)
+            return True
+        except PermanentDeliveryError as e:
+            logger.error("%s notification rejected, not retrying: %s", message['channel'], e)
+            self.outbox.mark_failed(message_id, str(e), permanent=True)
+            return False
+        except CircuitOpenError as e:
+            # Sin intento real: se aplaza sin gastar un intento ni alargar la espera
+            next_attempt = self.outbox.defer(message_id, str(e))
+            logger.warning(
+                "%s notification deferred until %s: %s",
+                message['channel'], next_attempt.strftime('%H:%M:%S'), e)
+            return False
         except Exception as e:
-            logger.error(f"Failed to send Slack notification: {e}")
+            next_attempt = self.outbox.mark_failed(message_id, str(e) or type(e).__name__)
+            instrumentation.count(f"retries.{message['channel']}")
+            logger.error(
+                "Failed to send %s notification, retrying at %s: %s",
+                message['channel'], next_attempt.strftime('%H:%M:%S'), e)
             return False
+        finally:
+            self._inflight.discard(message_id)
 
-    async def send_critical_notification(self, title: str, message: str, error_details: Optional[Dict[str, Any]] = None):
+    async def deliver(self, message_ids: List[Optional[int]]) -> bool:
         """
-        Envía notificación crítica por todos los canales disponibles.
+        Hace el primer intento de entrega de mensajes ya guardados en la bandeja.
+
+        Los mensajes se guardan al notificar, así que si el proceso termina antes
+        de este intento (o se agota el plazo de vaciado al cerrar) no se pierden:
+        process_outbox los envía en la siguiente pasada o el siguiente arranque.
 
         Args:
-            title: Título/asunto de la notificación
-            message: Mensaje descriptivo del problema
-            error_details: Detalles técnicos del error
+            message_ids: IDs devueltos por enqueue_email / enqueue_slack (se ignoran los None)
+
+        Returns:
+            True si se entregó al menos un mensaje
         """
-        logger.info(f"Sending critical notification: {title}")
+        messages = [self.outbox.get(message_id) for message_id in message_ids if message_id is not None]
+        # process_outbox puede haberlo entregado ya desde que se guardó
+        messages = [message for message in messages if message and message["status"] == "pending"]
+        if not messages:
+            return False
 
-        # Enviar por ambos canales simultáneamente
-        email_task = self.send_email_notification(
-            title, message, error_details, is_critical=True)
-        slack_task = self.send_slack_notification(
-            f"{title}: {message}", error_details, is_critical=True)
+        with tracer.span("notificacion", channels=",".join(message["channel"] for message in messages)):
+            results = await asyncio.gather(*(self._attempt_delivery(message) for message in messages))
+        return any(results)
 
-        # Ejecutar ambas tareas
-        email_result, slack_result = await asyncio.gather(email_task, slack_task, return_exceptions=True)
+    async def process_outbox(self, batch_size: int = 50) -> int:
+        """
+        Reintenta en bloque los mensajes pendientes cuyo plazo de espera ha vencido.
 
-        # Log results
-        if isinstance(email_result, Exception):
-            logger.error(f"Email notification failed: {email_result}")
-            email_result = False
+        Args:
+            batch_size: Número máximo de mensajes por pasada
 
-        if isinstance(slack_result, Exception):
-            logger.error(f"Slack notification failed: {slack_result}")
-            slack_result = False
+        Returns:
+            Número de mensajes entregados
+        """
+        delivered = 0
+        for message in self.outbox.due(batch_size):
+            config = self.email_config if message["channel"] == "email" else self.slack_config
+            if not config["enabled"]:
+                self.outbox.mark_skipped(message["id"], f"{message['channel']} notifications are disabled")
+                continue
+            if await self._attempt_delivery(message):
+                delivered += 1
+
+        if delivered:
+            logger.info("Delivered %s pending notifications from outbox", delivered)
+        self.outbox.purge_sent()
+        return delivered
+
+    def enqueue_critical(self, title: str, message: str, error_details: Optional[Dict[str, Any]] = None) -> List[Optional[int]]:
+        """
+        Guarda una notificación crítica para todos los canales disponibles.
 
-        success = email_result or slack_result
-        if success:
-            logger.info(
-                "At least one critical notification was sent successfully")
-        else:
-            logger.error("All critical notification channels failed")
+        Args:
+            title: Título/asunto de la notificación
+            message: Mensaje descriptivo del problema
+            error_details: Detalles técnicos del error
 
-        return success
+        Returns:
+            IDs de los mensajes en la bandeja
+        """
+        logger.info("Queueing critical notification: %s", title)
+        return [
+            self.enqueue_email(title, message, error_details, is_critical=True),
+            self.enqueue_slack(f"{title}: {message}", error_details, is_critical=True)
+        ]
 
-    async def send_info_notification(self, title: str, message: str, type: str = "info"):
+    def enqueue_info(self, title: str, message: str, type: str = "info") -> List[Optional[int]]:
         """
-        Envía notificación informativa (no crítica).
+        Guarda una notificación informativa (no crítica).
 
         Args:
             title: Título de la notificación
             message: Mensaje informativo
             type: Tipo de notificación (info, success)
+
+        Returns:
+            IDs de los mensajes en la bandeja
         """
-        logger.info(f"Sending info notification: {title}")
+        logger.info("Queueing info notification: %s", title)
+
+        # Para notificaciones informativas, preferimos Slack; si falla, la bandeja
+        # de salida lo reintenta, así que el email solo se usa si Slack está deshabilitado
+        if self.slack_config["enabled"]:
+            return [self.enqueue_slack(f"{title}: {message}", is_critical=False, type=type)]
 
-        # Para notificaciones informativas, preferimos Slack
-        slack_result = await self.send_slack_notification(f"{title}: {message}", is_critical=False, type=type)
+        return [self.enqueue_email(title, message, is_critical=False)]
 
-        if not slack_result:
-            # Si Slack falla, enviar por email como respaldo
-            email_result = await self.send_email_notification(title, message, is_critical=False)
-            return email_result
+    def enqueue_warning(self, title: str, message: str, error_details: Optional[Dict[str, Any]] = None, type: str = "info") -> List[Optional[int]]:
+        """
+        Guarda una advertencia para email y Slack.
 
-        return slack_result
+        Returns:
+            IDs de los mensajes en la bandeja
+        """
+        return [
+            self.enqueue_email(title, message, error_details, is_critical=False),
+            self.enqueue_slack(f"{title}: {message}", error_details, is_critical=False, type=type)
+        ]
 
     def _create_html_email_content(self, subject: str, message: str, error_details: Optional[Dict[str, Any]], is_critical: bool) -> str:
         """Crea contenido HTML para el email."""
@@ -399,36 +614,305 @@ Publicación de Catálogos - Sistema Automatizado - Generado automáticamente
 
         return "\n".join(details)
 
-    async def notify_critical_error(self, title: str, message: str, error_details: Optional[Dict[str, Any]] = None):
+    def register_alert(self, stage: str, error_class: str, file_name: Optional[str] = None) -> Optional[int]:
+        """
+        Registra una alerta y decide si debe enviarse.
+
+        Args:
+            stage: Etapa en la que ocurrió
+            error_class: Tipo de error
+            file_name: Archivo afectado (opcional)
+
+        Returns:
+            None si se suprime por enfriamiento; si no, las repeticiones suprimidas desde el último envío
+        """
+        return self.alert_state.register(stage, error_class, file_name)
+
+    def resolve_alerts(self, stage: str, file_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Marca como resueltas las alertas activas de una etapa y archivo.
+
+        Returns:
+            Alertas que estaban activas y se han resuelto
+        """
+        resolved = self.alert_state.resolve(stage, file_name)
+        for entry in resolved:
+            logger.info("Alert resolved: %s - %s - %s",
+                        entry['stage'], entry['errorClass'], entry['fileName'])
+        return resolved
+
+    def start_digest(self):
+        """Empieza a acumular alertas para enviarlas agrupadas al final de la ejecución."""
+        if not self.digest_enabled:
+            return
+        with self._digest_lock:
+            self._digest = {"critical": [], "warning": [], "resolved": []}
+
+    def collect(self, severity: str, title: str, message: str, error_details: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Acumula una alerta en el resumen de la ejecución.
+
+        Args:
+            severity: Severidad (critical, warning)
+            title: Título de la alerta
+            message: Mensaje descriptivo
+            error_details: Detalles adicionales
+
+        Returns:
+            True si se acumuló, False si no hay resumen activo y debe enviarse ya
+        """
+        with self._digest_lock:
+            if self._digest is None:
+                return False
+            self._digest[severity].append({
+                "title": title,
+                "message": message,
+                "details": error_details or {},
+                "timestamp": datetime.now()
+            })
+            return True
+
+    def take_digest(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Devuelve las alertas acumuladas y desactiva el resumen."""
+        with self._digest_lock:
+            events = self._digest or {"critical": [], "warning": [], "resolved": []}
+            self._digest = None
+            return events
+
+    def send_digest(self, events: Dict[str, List[Dict[str, Any]]]):
+        """
+        Guarda un único mensaje agrupado por severidad y devuelve la corrutina
+        que lo entrega (para NotificationDispatcher.submit).
+
+        Args:
+            events: Alertas acumuladas por severidad (ver take_digest)
+        """
+        message_ids = []
+        for severity, items in events.items():
+            if not items:
+                continue
+
+            lines = []
+            for item in items:
+                archivo = item["details"].get("archivo")
+                lines.append(f"• {item['title']}: {item['message']}" + (f" ({archivo})" if archivo else ""))
+            message = "\n".join(lines)
+
+            affected = sorted({item["details"]["archivo"] for item in items if item["details"].get("archivo")})
+            details = {"eventos": len(items)}
+            if affected:
+                details["archivos_afectados"] = ", ".join(affected)
+
+            if severity == "critical":
+                title = f"Resumen de ejecución: {len(items)} errores críticos"
+                message_ids += self.enqueue_critical(title, message, details)
+            elif severity == "resolved":
+                title = f"Incidencias resueltas: {len(items)}"
+                message_ids += self.enqueue_info(title, message, "success")
+            else:
+                title = f"Resumen de ejecución: {len(items)} advertencias"
+                message_ids += self.enqueue_warning(title, message, details, type="warning")
+
+        return self.deliver(message_ids)
+
+    # Las funciones notify_* guardan el mensaje al llamarlas (en el hilo de quien
+    # notifica) y devuelven la corrutina de entrega para el despachador
+
+    def notify_critical_error(self, title: str, message: str, error_details: Optional[Dict[str, Any]] = None):
         """Función de conveniencia para notificar errores críticos."""
-        return await self.send_critical_notification(title, message, error_details)
+        return self.deliver(self.enqueue_critical(title, message, error_details))
 
-    async def notify_warning(self, title: str, message: str, error_details: Optional[Dict[str, Any]] = None):
+    def notify_warning(self, title: str, message: str, error_details: Optional[Dict[str, Any]] = None):
         """Función de conveniencia para notificar advertencias."""
-        email_result = await self.send_email_notification(title, message, error_details, is_critical=False)
-        slack_result = await self.send_slack_notification(f"{title}: {message}", error_details, is_critical=False)
-        return email_result or slack_result
+        return self.deliver(self.enqueue_warning(title, message, error_details))
 
-    async def notify_info(self, title: str, message: str):
+    def notify_info(self, title: str, message: str):
         """Función de conveniencia para notificar información."""
-        return await self.send_info_notification(title, message, "info")
+        return self.deliver(self.enqueue_info(title, message, "info"))
 
-    async def notify_success(self, title: str, message: str):
+    def notify_success(self, title: str, message: str):
         """Función de conveniencia para notificar éxito."""
-        return await self.send_info_notification(title, message, "success")
-
-
-def run_notification_sync(coro):
-    """Helper para ejecutar notificaciones desde código síncrono."""
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            # Si ya hay un loop corriendo, crear una tarea
-            task = asyncio.create_task(coro)
-            return task
-        else:
-            # Si no hay loop, usar run
-            return loop.run_until_complete(coro)
-    except RuntimeError:
-        # Si no hay loop, crear uno nuevo
-        return asyncio.run(coro)
+        return self.deliver(self.enqueue_info(title, message, "success"))
+
+
+class NotificationDispatcher:
+    """
+    Despacha notificaciones en segundo plano.
+
+    Mantiene un único event loop asyncio en un hilo propio y recibe las
+    corrutinas a través de una cola, de modo que quien notifica no espera
+    a SMTP ni a Slack. Cada corrutina se ejecuta con el contexto de quien la
+    encoló (contexto de logging y span actual de la traza).
+    """
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._periodic: List[asyncio.Task] = []
+        self._closed = False
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run_loop, name="notification-dispatcher", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        """Ejecuta el event loop del despachador hasta que se detenga."""
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._worker = self._loop.create_task(self._consume())
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _consume(self):
+        """Procesa las notificaciones de la cola en orden de llegada."""
+        while True:
+            coro, context = await self._queue.get()
+            try:
+                await self._loop.create_task(coro, context=context)
+            except Exception as e:
+                logger.error("Notification dispatch failed: %s", e)
+            finally:
+                with self._pending_lock:
+                    self._pending -= 1
+                self._queue.task_done()
+
+    def submit(self, coro) -> bool:
+        """
+        Encola una corrutina de notificación y retorna inmediatamente.
+
+        Args:
+            coro: Corrutina a ejecutar (p. ej. notifier.notify_warning(...))
+
+        Returns:
+            True si se encoló, False si el despachador ya está detenido
+        """
+        if self._closed:
+            logger.warning("Notification dispatcher is stopped, dropping notification")
+            coro.close()
+            return False
+
+        with self._pending_lock:
+            self._pending += 1
+        self._loop.call_soon_threadsafe(
+            self._queue.put_nowait, (coro, contextvars.copy_context()))
+        return True
+
+    def schedule_periodic(self, coro_factory, interval: float):
+        """
+        Ejecuta periódicamente una tarea en el loop del despachador.
+
+        Args:
+            coro_factory: Función que devuelve la corrutina a ejecutar en cada pasada
+            interval: Segundos entre pasadas (la primera es inmediata)
+        """
+        async def _loop():
+            while True:
+                try:
+                    await coro_factory()
+                except Exception as e:
+                    logger.error("Periodic notification task failed: %s", e)
+                await asyncio.sleep(interval)
+
+        def _start():
+            self._periodic.append(self._loop.create_task(_loop()))
+
+        self._loop.call_soon_threadsafe(_start)
+
+    def run_sync(self, coro, timeout: Optional[float] = None):
+        """
+        Ejecuta una corrutina en el loop del despachador (sin pasar por la cola) y espera su resultado.
+
+        Args:
+            coro: Corrutina a ejecutar
+            timeout: Plazo máximo en segundos
+
+        Returns:
+            Lo que devuelva la corrutina
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def pending(self) -> int:
+        """Número de notificaciones encoladas o en curso."""
+        return self._pending
+
+    async def _drain(self, timeout: float) -> bool:
+        """Espera a que la cola se vacíe como máximo `timeout` segundos."""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def flush(self, timeout: float) -> bool:
+        """
+        Espera a que se envíen las notificaciones encoladas.
+
+        Args:
+            timeout: Plazo máximo en segundos
+
+        Returns:
+            True si la cola quedó vacía dentro del plazo
+        """
+        if self._closed:
+            return True
+        future = asyncio.run_coroutine_threadsafe(self._drain(timeout), self._loop)
+        try:
+            return future.result(timeout + 1)
+        except Exception:
+            return False
+
+    def shutdown(self, timeout: float) -> bool:
+        """
+        Vacía la cola con un plazo máximo y detiene el hilo del despachador.
+
+        Args:
+            timeout: Plazo máximo en segundos para enviar lo pendiente
+
+        Returns:
+            True si se enviaron todas las notificaciones pendientes
+        """
+        if self._closed:
+            return True
+
+        # Detener las tareas periódicas antes de vaciar la cola
+        try:
+            asyncio.run_coroutine_threadsafe(self._cancel_periodic(), self._loop).result(5)
+        except Exception as e:
+            logger.error("Error stopping periodic notification tasks: %s", e)
+
+        flushed = self.flush(timeout)
+        self._closed = True
+        if not flushed:
+            logger.warning(
+                "Notification queue not flushed within %ss, "
+                "%s deliveries left in the outbox for the next start", timeout, self.pending())
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result(5)
+        except Exception as e:
+            logger.error("Error stopping notification dispatcher: %s", e)
+        self._thread.join(timeout=5)
+        return flushed
+
+    async def _cancel_periodic(self):
+        """Cancela las tareas periódicas y espera a que terminen."""
+        for task in self._periodic:
+            task.cancel()
+        await asyncio.gather(*self._periodic, return_exceptions=True)
+        self._periodic.clear()
+
+    async def _stop(self):
+        """Cancela el consumidor, descarta lo pendiente y detiene el loop."""
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        while not self._queue.empty():
+            coro, _ = self._queue.get_nowait()
+            coro.close()
+        self._loop.call_soon(self._loop.stop)
@@ -0,0 +1,111 @@
+"""
+Comprobación previa (preflight) de los destinos
+Prueba todos los destinos en paralelo, cada uno con su plazo máximo, antes
+de procesar catálogos; los que fallan se omiten durante la ejecución
+abriendo su circuito. Los hilos de prueba se reutilizan entre ejecuciones,
+con como máximo una prueba en curso por destino
+"""
+import contextvars
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Optional
+
+from config import PREFLIGHT_TIMEOUTS
+from utils.circuit_breaker import circuit_breakers
+from utils.logger import logger
+from utils.tracing import tracer
+
+
+class PreflightChecker:
+    """Ejecuta en paralelo las comprobaciones de los destinos"""
+
+    def __init__(self):
+        self._checks: Dict[str, Callable[[float], bool]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Última prueba de cada destino: una que se quedó colgada no se repite
+        self._futures: Dict[str, Future] = {}
+
+    def register(self, name: str, check: Callable[[float], bool]):
+        """
+        Registra la comprobación de un destino
+
+        Args:
+            name: Destino (nombre de su circuito: local, drive, ftp...)
+            check: Función que recibe el plazo en segundos y devuelve True si el destino responde
+        """
+        self._checks[name] = check
+
+    def _run_check(self, name: str, check: Callable[[float], bool], timeout: float) -> tuple:
+        """Ejecuta una comprobación y devuelve (resultado, duración en ms)"""
+        check_start = time.perf_counter()
+        with tracer.span(f"preflight.{name}"):
+            ok = bool(check(timeout))
+        return ok, (time.perf_counter() - check_start) * 1000
+
+    def run(self) -> Dict[str, Dict]:
+        """
+        Comprueba todos los destinos a la vez; la duración total es la de la
+        comprobación más lenta (como máximo, el mayor de los plazos)
+
+        Returns:
+            Diccionario {destino: {'ok', 'durationMs', 'error'}}
+        """
+        if not self._checks:
+            return {}
+
+        start = time.perf_counter()
+        results = {}
+        if self._executor is None:
+            # Un hilo por destino: con una sola prueba en curso por destino nunca falta hilo
+            self._executor = ThreadPoolExecutor(
+                max_workers=len(self._checks), thread_name_prefix="preflight")
+
+        stuck = set()
+        for name, check in self._checks.items():
+            previous = self._futures.get(name)
+            if previous is not None and not previous.done():
+                stuck.add(name)
+                continue
+            self._futures[name] = self._executor.submit(
+                contextvars.copy_context().run, self._run_check,
+                name, check, PREFLIGHT_TIMEOUTS.get(name, PREFLIGHT_TIMEOUTS['default']))
+
+        for name in self._checks:
+            timeout = PREFLIGHT_TIMEOUTS.get(name, PREFLIGHT_TIMEOUTS['default'])
+            if name in stuck:
+                results[name] = {'ok': False, 'durationMs': 0.0,
+                                 'error': "la comprobación anterior sigue sin responder"}
+                continue
+            remaining = max(timeout - (time.perf_counter() - start), 0)
+            error = None
+            try:
+                ok, duration_ms = self._futures[name].result(remaining)
+                if not ok:
+                    error = "no responde"
+            except FutureTimeoutError:
+                ok, duration_ms = False, timeout * 1000
+                error = f"sin respuesta en {timeout:.0f} s"
+            except Exception as e:
+                ok, duration_ms = False, (time.perf_counter() - start) * 1000
+                error = str(e) or type(e).__name__
+            results[name] = {'ok': ok, 'durationMs': round(duration_ms, 1), 'error': error}
+
+        for name, result in results.items():
+            breaker = circuit_breakers.get(name)
+            if result['ok']:
+                breaker.record_success()
+                logger.info("🩺 Preflight %s: OK (%.0f ms)", name, result['durationMs'])
+            else:
+                logger.error("🩺 Preflight %s: %s", name, result['error'])
+                breaker.trip(f"preflight: {result['error']}")
+        logger.info(
+            "🩺 Preflight completado en %.0f ms: %s/%s destinos disponibles",
+            (time.perf_counter() - start) * 1000,
+            sum(1 for r in results.values() if r['ok']), len(results))
+        return results
+
+    def close(self):
+        """Libera los hilos de prueba sin esperar a las que sigan colgadas"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,151 @@
+"""
+Configuración común de las pruebas
+Los archivos de estado (SQLite, instantáneas) van a un directorio temporal
+y no se intenta conectar con servicios externos
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+# Antes de importar config: estado en un directorio temporal y sin trazas en disco
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="catalog_tests_")
+os.environ.setdefault("TRACE_ENABLED", "false")
+os.environ.setdefault("MONGO_SERVER_SELECTION_TIMEOUT_MS", "200")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest  # noqa: E402
+
+import main  # noqa: E402
+from services.checkpoint_store import CheckpointStore  # noqa: E402
+from utils.circuit_breaker import circuit_breakers  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def reset_circuit_breakers():
+    """Cada prueba empieza con todos los circuitos cerrados"""
+    circuit_breakers._breakers.clear()
+    yield
+    circuit_breakers._breakers.clear()
+
+
+CATALOG = {'fileName': 'CLIMATIZACION.pdf', 'relPath': 'CLIMATIZACION.pdf',
+           'fullPath': '/origen/CLIMATIZACION.pdf', 'size': 3}
+
+
+class FakeBreaker:
+    is_open = False
+
+
+class FakeFileService:
+    def __init__(self):
+        self.content = b'abc'
+        self.copies = 0
+        self.deleted = []
+
+    def list_catalogs(self, changed_only=None):
+        return [dict(CATALOG)]
+
+    def read_file_with_checksums(self, path):
+        return {'content': self.content, 'size': len(self.content),
+                'sha256': f"sha-{self.content.hex()}", 'md5': 'md5'}
+
+    def copy_to_destination(self, source, dest, source_sha256=None, content=None):
+        self.copies += 1
+        return {'success': True, 'action': 'copied', 'bytes': 3, 'throughputBps': 1.0}
+
+    def delete_file(self, path):
+        self.deleted.append(path)
+        return True
+
+    def mark_processed(self, paths):
+        pass
+
+
+class FakeDriveService:
+    def __init__(self):
+        self.uploads = 0
+        self.interrupt = False
+
+    def upload_or_update(self, content, name, expected_md5=None):
+        if self.interrupt:
+            raise KeyboardInterrupt
+        self.uploads += 1
+        return {'success': True, 'action': 'created', 'file_id': 'id', 'md5Checksum': expected_md5}
+
+
+class FakeFTPService:
+    breaker = FakeBreaker()
+
+    def __init__(self):
+        self.uploads = 0
+
+    def upload_file(self, content, name, verify_size=False):
+        self.uploads += 1
+        return True
+
+
+class FakeMongoService:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: True
+
+
+class FakeNotifier:
+    def start_digest(self):
+        pass
+
+    def take_digest(self):
+        return {}
+
+    def register_alert(self, *args):
+        return 0
+
+    def collect(self, *args):
+        return True
+
+    def resolve_alerts(self, *args):
+        return []
+
+    def __getattr__(self, name):
+        async def notify(*args, **kwargs):
+            return True
+        return notify
+
+
+class FakeMemoryMonitor:
+    @contextmanager
+    def window(self):
+        yield {'rssBytes': 0, 'peakRssBytes': 0, 'deltaBytes': 0}
+
+
+class FakeMemoryBudget:
+    def admit(self, size):
+        return True
+
+    def release(self, size):
+        pass
+
+
+@pytest.fixture
+def publisher(tmp_path, monkeypatch):
+    """CatalogPublisher con servicios simulados y puntos de control reales"""
+    monkeypatch.setattr(main, 'normalize_catalog_name', lambda name: ('CLIMATIZACION.pdf', True))
+    monkeypatch.setattr(main, 'PREFLIGHT_ENABLED', False)
+
+    publisher = object.__new__(main.CatalogPublisher)
+    publisher.profiler = None
+    publisher.resume = False
+    publisher.file_service = FakeFileService()
+    publisher.drive_service = FakeDriveService()
+    publisher.ftp_service = FakeFTPService()
+    publisher.mongo_service = FakeMongoService()
+    publisher.mapping_service = type('Mapping', (), {'refresh': lambda self: False})()
+    publisher.notifier = FakeNotifier()
+    publisher.dispatcher = type('Dispatcher', (), {'submit': lambda self, coro: coro.close()})()
+    publisher.memory_monitor = FakeMemoryMonitor()
+    publisher.memory_budget = FakeMemoryBudget()
+    publisher.checkpoints = CheckpointStore(tmp_path / 'checkpoints.db')
+    yield publisher
+    publisher.checkpoints.close()
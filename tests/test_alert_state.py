@@ -0,0 +1,88 @@
+"""
+Deduplicación de alertas entre ejecuciones con periodo de enfriamiento
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import services.alert_state as alert_module
+from services.alert_state import AlertStateStore
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    return tmp_path / 'alert_state.json'
+
+
+def age(path, **delta):
+    """Retrasa en el archivo de estado el último envío y la última repetición"""
+    state = json.loads(path.read_text(encoding='utf-8'))
+    for entry in state.values():
+        for field in ('lastSent', 'lastSeen'):
+            entry[field] = (datetime.fromisoformat(entry[field]) - timedelta(**delta)).isoformat()
+    path.write_text(json.dumps(state), encoding='utf-8')
+
+
+def test_repeats_are_suppressed_across_restarts(state_path):
+    assert AlertStateStore(state_path, cooldown_minutes=60).register('ftp', 'timeout', 'A.pdf') == 0
+
+    # Nueva ejecución (nuevo proceso): misma alerta dentro del enfriamiento
+    restarted = AlertStateStore(state_path, cooldown_minutes=60)
+    assert restarted.register('ftp', 'timeout', 'A.pdf') is None
+    assert restarted.register('ftp', 'timeout', 'A.pdf') is None
+    # Otro archivo u otro error son alertas distintas
+    assert restarted.register('ftp', 'timeout', 'B.pdf') == 0
+    assert restarted.register('ftp', 'login', 'A.pdf') == 0
+
+
+def test_alert_is_sent_again_after_cooldown_with_suppressed_count(state_path):
+    store = AlertStateStore(state_path, cooldown_minutes=60)
+    store.register('drive', 'quota', 'A.pdf')
+    store.register('drive', 'quota', 'A.pdf')
+    store.register('drive', 'quota', 'A.pdf')
+    age(state_path, minutes=61)
+
+    assert AlertStateStore(state_path, cooldown_minutes=60).register('drive', 'quota', 'A.pdf') == 2
+
+
+def test_resolved_alert_is_sent_at_once_if_it_returns(state_path):
+    store = AlertStateStore(state_path, cooldown_minutes=60)
+    store.register('ftp', 'timeout', 'A.pdf')
+
+    [resolved] = store.resolve('ftp', 'A.pdf')
+
+    assert (resolved['stage'], resolved['errorClass'], resolved['fileName']) == ('ftp', 'timeout', 'A.pdf')
+    assert store.resolve('ftp', 'A.pdf') == []
+    assert store.register('ftp', 'timeout', 'A.pdf') == 0
+
+
+def test_stale_alerts_are_forgotten(state_path):
+    store = AlertStateStore(state_path, cooldown_minutes=60)
+    store.register('ftp', 'timeout', 'A.pdf')
+    age(state_path, days=alert_module.STALE_AFTER.days + 1)
+
+    store = AlertStateStore(state_path, cooldown_minutes=60)
+    store.register('drive', 'quota', 'B.pdf')
+
+    assert [entry['fileName'] for entry in json.loads(state_path.read_text()).values()] == ['B.pdf']
+
+
+def test_corrupt_state_file_starts_empty(state_path):
+    state_path.write_text('{no es json', encoding='utf-8')
+
+    assert AlertStateStore(state_path).register('ftp', 'timeout') == 0
+
+
+def test_publisher_drops_suppressed_alerts_and_reports_repeats(publisher, monkeypatch):
+    collected = []
+    monkeypatch.setattr(publisher.notifier, 'collect',
+                        lambda severity, title, message, details: collected.append(details) or True,
+                        raising=False)
+    repeats = iter([None, 3])
+    monkeypatch.setattr(publisher.notifier, 'register_alert', lambda *args: next(repeats), raising=False)
+
+    publisher._notify_warning("Subida FTP", "Tiempo agotado", {'archivo': 'A.pdf'}, stage='ftp')
+    publisher._notify_warning("Subida FTP", "Tiempo agotado", {'archivo': 'A.pdf'}, stage='ftp')
+
+    assert collected == [{'archivo': 'A.pdf', 'repeticiones_suprimidas': 3}]
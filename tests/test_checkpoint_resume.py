@@ -0,0 +1,61 @@
+"""
+Reanudación de una ejecución interrumpida (--resume)
+"""
+import pytest
+
+from conftest import CATALOG
+
+
+def test_interrupted_run_stays_open_and_resumes_missing_stages(publisher):
+    publisher.drive_service.interrupt = True
+    with pytest.raises(KeyboardInterrupt):
+        publisher.run()
+
+    interrupted = publisher.checkpoints.last_incomplete_run()
+    assert interrupted is not None
+    assert publisher.file_service.copies == 1
+
+    # Reinicio con --resume: misma ejecución y solo las etapas pendientes
+    publisher.drive_service.interrupt = False
+    publisher.resume = True
+    publisher.run()
+
+    assert publisher.checkpoints.last_incomplete_run() is None
+    assert publisher.file_service.copies == 1
+    assert publisher.drive_service.uploads == 1
+    assert publisher.ftp_service.uploads == 1
+    assert publisher.file_service.deleted == [CATALOG['fullPath']]
+
+
+def test_resume_redoes_stages_when_content_changed(publisher):
+    publisher.drive_service.interrupt = True
+    with pytest.raises(KeyboardInterrupt):
+        publisher.run()
+
+    publisher.file_service.content = b'abcd'
+    publisher.drive_service.interrupt = False
+    publisher.resume = True
+    publisher.run()
+
+    assert publisher.file_service.copies == 2
+
+
+def test_run_with_handled_error_is_not_resumable(publisher, monkeypatch):
+    def fail(changed_only=None):
+        raise RuntimeError("origen no disponible")
+
+    monkeypatch.setattr(publisher.file_service, 'list_catalogs', fail)
+    publisher.run()
+
+    assert publisher.checkpoints.last_incomplete_run() is None
+
+
+def test_every_run_prunes_old_checkpoints(publisher):
+    publisher.checkpoints.mark_stage('exec-antigua', '/origen/VIEJO.pdf', 'abc', 'local')
+    publisher.checkpoints.conn.execute(
+        "UPDATE checkpoints SET completed_at = '2000-01-01T00:00:00' WHERE execution_id = 'exec-antigua'")
+    publisher.checkpoints.conn.commit()
+
+    publisher.run()
+
+    assert publisher.checkpoints.completed_stages('/origen/VIEJO.pdf', 'abc') == {}
@@ -0,0 +1,94 @@
+"""
+Transiciones de estado de los circuit breakers
+"""
+from utils.circuit_breaker import CircuitBreaker, circuit_breakers, CLOSED, HALF_OPEN, OPEN
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker('ftp', failure_threshold=3)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.allow() is False
+    assert breaker.allow() is False
+    assert breaker.snapshot()['rejected'] == 2
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker('ftp', failure_threshold=2)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == CLOSED
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker('drive', failure_threshold=1)
+    breaker.record_failure()
+    breaker.tick()
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+
+
+def test_successful_probe_closes_the_circuit():
+    breaker = CircuitBreaker('drive', failure_threshold=1)
+    breaker.record_failure()
+    breaker.tick()
+    breaker.allow()
+
+    breaker.record_success()
+
+    assert breaker.state == CLOSED
+    assert breaker.failures == 0
+    assert breaker.allow() is True
+
+
+def test_failed_probe_reopens_the_circuit():
+    breaker = CircuitBreaker('drive', failure_threshold=5)
+    breaker.trip("preflight")
+    breaker.tick()
+    breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+
+
+def test_tick_only_affects_open_circuits():
+    breaker = CircuitBreaker('smtp', failure_threshold=3)
+    breaker.record_failure()
+    breaker.tick()
+
+    assert breaker.state == CLOSED
+    assert breaker.failures == 1
+
+
+def test_disabled_breaker_never_opens():
+    breaker = CircuitBreaker('slack', failure_threshold=1, enabled=False)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.trip("preflight")
+
+    assert breaker.state == CLOSED
+    assert breaker.allow() is True
+
+
+def test_registry_ticks_and_counts_open_circuits():
+    circuit_breakers.get('ftp').trip("preflight")
+    circuit_breakers.get('drive')
+    assert circuit_breakers.open_count() == 1
+
+    circuit_breakers.tick()
+
+    assert circuit_breakers.open_count() == 0
+    assert circuit_breakers.states()['ftp']['state'] == HALF_OPEN
+    assert circuit_breakers.states()['drive']['state'] == CLOSED
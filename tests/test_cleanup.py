@@ -0,0 +1,65 @@
+"""
+Limpieza del origen decidida con los resultados en memoria
+"""
+from services.mongo_service import MongoService
+
+
+class RecordingMongo:
+    """MongoService simulado que registra las llamadas"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls.append((name, args))
+            return True
+        return call
+
+
+def result(rel_path, local=True, drive=True, ftp=True):
+    return {'fileName': rel_path, 'relPath': rel_path, 'fullPath': f'/origen/{rel_path}',
+            'local': local, 'drive': drive, 'ftp': ftp}
+
+
+def test_only_files_published_everywhere_are_deleted(publisher):
+    publisher.mongo_service = RecordingMongo()
+    results = [result('A.pdf'), result('B.pdf', ftp=False), result('C.pdf')]
+
+    deleted, errors = publisher.cleanup_source_files('exec-1', results)
+
+    assert deleted == ['A.pdf', 'C.pdf']
+    assert errors == ['B.pdf']
+    assert sorted(publisher.file_service.deleted) == ['/origen/A.pdf', '/origen/C.pdf']
+    # Sin lecturas de MongoDB y un solo borrado para todos los archivos procesados
+    assert publisher.mongo_service.calls == [('delete_logs', ('exec-1', ['A.pdf', 'B.pdf', 'C.pdf']))]
+
+
+def test_file_that_cannot_be_deleted_is_reported(publisher, monkeypatch):
+    monkeypatch.setattr(publisher.file_service, 'delete_file', lambda path: False)
+
+    deleted, errors = publisher.cleanup_source_files('exec-1', [result('A.pdf')])
+
+    assert deleted == []
+    assert errors == ['A.pdf']
+
+
+def test_delete_logs_is_a_single_delete_many(monkeypatch):
+    queries = []
+
+    class Collection:
+        def delete_many(self, query):
+            queries.append(query)
+            return type('DeleteResult', (), {'deleted_count': 2})()
+
+    mongo = MongoService()
+    try:
+        mongo.collection = Collection()
+        monkeypatch.setattr(mongo, '_ensure_connected', lambda: True)
+
+        assert mongo.delete_logs('exec-1', ['A.pdf', 'B.pdf']) == 2
+        assert mongo.delete_logs('exec-1', []) == 0
+    finally:
+        mongo.close()
+
+    assert queries == [{'executionId': 'exec-1', 'fileName': {'$in': ['A.pdf', 'B.pdf']}}]
@@ -0,0 +1,122 @@
+"""
+Descubrimiento de solo archivos nuevos o modificados (DISCOVERY_CHANGED_ONLY)
+"""
+import json
+import os
+
+import pytest
+
+import services.file_service as file_module
+from conftest import CATALOG
+from services.file_service import FileService
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    """Carpeta origen con dos catálogos y la instantánea en un directorio temporal"""
+    snapshot_file = tmp_path / 'discovery_snapshot.json'
+    monkeypatch.setattr(file_module, 'DISCOVERY_CHANGED_ONLY', True)
+    monkeypatch.setattr(file_module, 'DISCOVERY_SNAPSHOT_FILE', snapshot_file)
+    folder = tmp_path / 'origen'
+    folder.mkdir()
+    (folder / 'A.pdf').write_bytes(b'a')
+    (folder / 'B.pdf').write_bytes(b'b')
+    return folder
+
+
+def new_service(folder):
+    service = FileService()
+    service.source_path = folder
+    return service
+
+
+def names(catalogs):
+    return sorted(c['relPath'] for c in catalogs)
+
+
+def snapshot():
+    return json.loads(file_module.DISCOVERY_SNAPSHOT_FILE.read_text())
+
+
+def test_discovery_does_not_persist_unprocessed_files(source):
+    service = new_service(source)
+    assert names(service.list_catalogs()) == ['A.pdf', 'B.pdf']
+
+    # Interrupción antes de procesar: un nuevo proceso los vuelve a listar
+    assert names(new_service(source).list_catalogs()) == ['A.pdf', 'B.pdf']
+    assert snapshot() == {}
+
+
+def test_processed_files_left_in_place_are_not_listed_again(source):
+    service = new_service(source)
+    service.list_catalogs()
+    # A.pdf falló y sigue en el origen; B.pdf no llegó a procesarse
+    service.mark_processed(['A.pdf'])
+
+    assert list(snapshot()) == ['A.pdf']
+    assert names(new_service(source).list_catalogs()) == ['B.pdf']
+
+
+def test_modified_file_is_listed_again(source):
+    service = new_service(source)
+    service.mark_processed(names(service.list_catalogs()))
+    assert service.list_catalogs() == []
+
+    path = source / 'A.pdf'
+    path.write_bytes(b'aa')
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))
+
+    assert names(service.list_catalogs()) == ['A.pdf']
+    # Sigue fuera de la instantánea hasta que se procese de nuevo
+    assert 'A.pdf' not in snapshot()
+
+
+def test_published_file_dropped_again_with_same_metadata_is_listed(source):
+    service = new_service(source)
+    service.list_catalogs()
+    # A.pdf se publicó y se eliminó del origen: no entra en la instantánea
+    path = source / 'A.pdf'
+    stat = path.stat()
+    path.unlink()
+    service.mark_processed(['B.pdf'])
+
+    path.write_bytes(b'a')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert names(new_service(source).list_catalogs()) == ['A.pdf']
+
+
+def test_same_name_in_subfolders_is_tracked_separately(source):
+    for folder in ('norte', 'sur'):
+        (source / folder).mkdir()
+        (source / folder / 'C.pdf').write_bytes(folder.encode())
+
+    service = new_service(source)
+    catalogs = service.list_catalogs(recursive=True)
+    assert names(catalogs) == ['A.pdf', 'B.pdf', 'norte/C.pdf', 'sur/C.pdf']
+    assert {c['fileName'] for c in catalogs if c['relPath'].endswith('C.pdf')} == {'C.pdf'}
+
+    service.mark_processed(['norte/C.pdf'])
+    assert names(service.list_catalogs(recursive=True)) == ['A.pdf', 'B.pdf', 'sur/C.pdf']
+
+
+def test_run_keys_results_by_relative_path(publisher, monkeypatch):
+    catalogs = [dict(CATALOG, relPath=f'{zone}/CLIMATIZACION.pdf',
+                     fullPath=f'/origen/{zone}/CLIMATIZACION.pdf') for zone in ('norte', 'sur')]
+    monkeypatch.setattr(publisher.file_service, 'list_catalogs', lambda: catalogs)
+    monkeypatch.setattr(publisher.file_service, 'read_file_with_checksums', lambda path: {
+        'content': path.encode(), 'size': len(path), 'sha256': path, 'md5': 'md5'})
+
+    def upload(content, name, expected_md5=None):
+        if b'sur' in content:
+            return {'success': False, 'action': 'update', 'error': 'quota'}
+        return {'success': True, 'action': 'update', 'file_id': 'id', 'md5Checksum': expected_md5}
+
+    monkeypatch.setattr(publisher.drive_service, 'upload_or_update', upload)
+    marked = []
+    monkeypatch.setattr(publisher.file_service, 'mark_processed', marked.extend)
+
+    publisher.run()
+
+    assert publisher.file_service.deleted == ['/origen/norte/CLIMATIZACION.pdf']
+    assert marked == ['sur/CLIMATIZACION.pdf']
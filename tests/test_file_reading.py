@@ -0,0 +1,62 @@
+"""
+Lectura de catálogos con checksums y copia local desde memoria
+"""
+import hashlib
+
+import pytest
+
+import services.file_service as file_module
+from services.file_service import FileService
+from utils.memory import BufferReader
+
+CONTENT = bytes(range(256)) * 41
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    # Bloques pequeños para recorrer varias lecturas parciales
+    monkeypatch.setattr(file_module, 'COPY_BLOCK_SIZE', 1000)
+    service = FileService()
+    service.dest_path = tmp_path / 'destino'
+    return service
+
+
+def test_read_computes_checksums_while_reading(service, tmp_path):
+    source = tmp_path / 'A.pdf'
+    source.write_bytes(CONTENT)
+
+    read = service.read_file_with_checksums(str(source))
+
+    assert read['content'] == CONTENT
+    assert read['size'] == len(CONTENT)
+    assert read['sha256'] == hashlib.sha256(CONTENT).hexdigest()
+    assert read['md5'] == hashlib.md5(CONTENT).hexdigest()
+
+
+def test_local_copy_reuses_content_already_read(service, tmp_path, monkeypatch):
+    source = tmp_path / 'A.pdf'
+    source.write_bytes(CONTENT)
+    read = service.read_file_with_checksums(str(source))
+
+    def reread(*args):
+        raise AssertionError("el origen no debe volver a leerse")
+
+    monkeypatch.setattr(file_module, 'KERNEL_COPY', False)
+    monkeypatch.setattr(FileService, '_copy_contents', staticmethod(reread))
+    result = service.copy_to_destination(
+        str(source), 'A.pdf', source_sha256=read['sha256'], content=read['content'])
+
+    assert result['success'] and result['bytes'] == len(CONTENT)
+    assert (service.dest_path / 'A.pdf').read_bytes() == CONTENT
+
+
+def test_buffer_reader_reads_and_seeks_without_copying():
+    buffer = bytearray(CONTENT)
+    reader = BufferReader(buffer)
+
+    assert reader.read(10) == CONTENT[:10]
+    assert reader.seek(0, 2) == len(CONTENT)
+    reader.seek(-5, 2)
+    assert reader.read() == CONTENT[-5:]
+    reader.seek(0)
+    assert reader.read() == CONTENT
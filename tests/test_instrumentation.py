@@ -0,0 +1,58 @@
+"""
+Temporizadores por etapa y por llamada externa: p50/p95/máximo y acumulados
+"""
+import pytest
+
+import utils.instrumentation as instrumentation_module
+from utils.instrumentation import HISTOGRAM_BUCKETS, Instrumentation
+
+
+def test_summary_reports_nearest_rank_percentiles():
+    timings = Instrumentation()
+    for duration_ms in range(100, 0, -1):
+        timings.record('ftp.stor', duration_ms)
+
+    assert timings.summary()['timings']['ftp.stor'] == {
+        'count': 100, 'p50': 50, 'p95': 95, 'max': 100, 'totalMs': 5050}
+
+
+def test_timer_records_duration_and_counts_errors():
+    timings = Instrumentation()
+    with timings.timer('drive.upload'):
+        pass
+    with pytest.raises(OSError):
+        with timings.timer('drive.upload'):
+            raise OSError("conexión reiniciada")
+
+    summary = timings.summary()
+    assert summary['timings']['drive.upload']['count'] == 2
+    assert summary['counters'] == {'drive.upload.errors': 1}
+
+
+def test_reset_keeps_cumulative_histograms_and_totals():
+    timings = Instrumentation()
+    timings.record('stage.ftp', 200)
+    timings.count('bytes.ftp', 1024)
+    timings.reset()
+    timings.record('stage.ftp', 3000)
+
+    assert timings.summary()['timings']['stage.ftp']['count'] == 1
+    histograms, totals = timings.cumulative()
+    buckets, total_seconds, count = histograms['stage.ftp']
+    assert count == 2 and total_seconds == pytest.approx(3.2)
+    # Cumulativos: cada límite cuenta las medidas menores o iguales
+    assert buckets[HISTOGRAM_BUCKETS.index(0.25)] == 1
+    assert buckets[HISTOGRAM_BUCKETS.index(5)] == 2
+    assert totals == {'bytes.ftp': 1024}
+
+
+def test_slow_calls_are_logged(monkeypatch):
+    warnings = []
+    monkeypatch.setattr(instrumentation_module.logger, 'warning',
+                        lambda message, *args, **kwargs: warnings.append(message % args))
+    timings = Instrumentation(slow_threshold_ms=1000)
+
+    timings.record('mongo.ping', 999)
+    timings.record('ftp.login', 1500)
+
+    assert warnings == ["🐢 Llamada lenta: ftp.login tardó 1500 ms (umbral 1000 ms)"]
@@ -0,0 +1,141 @@
+"""
+Diario local de MongoDB: los cambios sin conexión se reenvían al reconectar
+"""
+import pytest
+from pymongo import DeleteMany, UpdateOne
+
+from services.journal_service import JournalService
+from services.mongo_service import MongoService
+
+
+class FakeCollection:
+    """Colección que registra las operaciones recibidas"""
+
+    def __init__(self):
+        self.bulk = []
+        self.inserted = []
+
+    def bulk_write(self, requests, ordered=True):
+        self.bulk.extend(requests)
+
+    def insert_many(self, documents, ordered=True):
+        self.inserted.extend(documents)
+
+    def update_one(self, query, update, upsert=False):
+        self.bulk.append(UpdateOne(query, update, upsert=upsert))
+        return type('UpdateResult', (), {'acknowledged': True})()
+
+
+class FakeClient:
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def mongo(tmp_path, monkeypatch):
+    """MongoService sin conexión, con el diario en un directorio temporal"""
+    mongo = MongoService()
+    mongo.journal.close()
+    mongo.journal = JournalService(tmp_path / 'journal.db')
+    monkeypatch.setattr(mongo, '_ensure_connected', lambda: False)
+    yield mongo
+    mongo.close()
+
+
+def reconnect(mongo):
+    """Simula la reconexión con colecciones falsas"""
+    mongo.client = FakeClient()
+    mongo.collection = FakeCollection()
+    mongo.metrics_collection = FakeCollection()
+
+
+def journal_size(mongo):
+    """Entradas en el diario, pendientes o ya aplicadas"""
+    return mongo.journal.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+def test_offline_changes_are_journaled(mongo):
+    assert mongo.update_stage('exec-1', 'A.pdf', 'local', 'success', duration_ms=12.5) is False
+    assert mongo.record_run_metrics('exec-1', [], 100.0, 'success') is False
+    assert mongo.delete_logs('exec-1', ['B.pdf']) == 0
+
+    assert [entry['kind'] for entry in mongo.journal.pending()] == ['stage', 'metrics', 'delete']
+
+
+def test_replay_applies_pending_entries_in_order(mongo):
+    mongo.update_stage('exec-1', 'A.pdf', 'local', 'success', duration_ms=12.5)
+    mongo.update_stage('exec-1', 'A.pdf', 'ftp', 'error', {'error': 'timeout'})
+    mongo.delete_logs('exec-1', ['B.pdf'])
+    mongo.record_run_metrics('exec-1', [], 100.0, 'partial')
+
+    reconnect(mongo)
+    assert mongo.replay_journal() == 4
+
+    assert mongo.journal.pending_count() == 0
+    assert [type(request) for request in mongo.collection.bulk] == [UpdateOne, UpdateOne, DeleteMany]
+    local, ftp, delete = (request._doc if isinstance(request, UpdateOne) else request._filter
+                          for request in mongo.collection.bulk)
+    assert local['$set']['stages.local']['durationMs'] == 12.5
+    assert ftp['$set']['stages.ftp']['details'] == {'error': 'timeout'}
+    assert delete == {'executionId': 'exec-1', 'fileName': {'$in': ['B.pdf']}}
+
+    [run] = mongo.metrics_collection.inserted
+    assert run['meta'] == {'type': 'run'}
+    assert run['outcome'] == 'partial'
+    assert 'timestamp' in run
+
+
+def test_cleanup_discards_pending_stages_of_the_same_files(mongo):
+    mongo.update_stage('exec-1', 'A.pdf', 'local', 'success')
+    mongo.update_stage('exec-1', 'B.pdf', 'local', 'success')
+    mongo.delete_logs('exec-1', ['A.pdf'])
+
+    reconnect(mongo)
+    mongo.replay_journal()
+
+    stage_files = [request._filter['fileName'] for request in mongo.collection.bulk
+                   if isinstance(request, UpdateOne)]
+    assert stage_files == ['B.pdf']
+
+
+def test_replay_without_connection_keeps_entries(mongo):
+    mongo.update_stage('exec-1', 'A.pdf', 'local', 'success')
+
+    assert mongo.replay_journal() == 0
+    assert mongo.journal.pending_count() == 1
+
+
+def test_journal_stays_bounded_across_runs_with_mongo_connected(mongo, monkeypatch):
+    reconnect(mongo)
+    monkeypatch.setattr(mongo, '_ensure_connected', lambda: True)
+
+    for run in range(3):
+        for stage in ('local', 'drive', 'ftp'):
+            assert mongo.update_stage(f'exec-{run}', 'A.pdf', stage, 'success') is True
+        assert mongo.record_run_metrics(f'exec-{run}', [], 100.0, 'success') is True
+        mongo.purge_journal()
+
+    assert journal_size(mongo) == 0
+    assert len(mongo.collection.bulk) == 9
+
+
+def test_replayed_entries_are_purged_after_retention(mongo):
+    mongo.update_stage('exec-1', 'A.pdf', 'local', 'success')
+    reconnect(mongo)
+    mongo.replay_journal()
+    mongo.client = None
+    mongo.update_stage('exec-2', 'A.pdf', 'local', 'success')
+
+    assert mongo.journal.purge_replayed(retention_days=0) == 1
+    assert journal_size(mongo) == 1
+    assert mongo.journal.pending_count() == 1
+
+
+def test_every_run_purges_the_journal(publisher):
+    purges = []
+    publisher.mongo_service.purge_journal = lambda: purges.append(True)
+
+    publisher.run()
+    publisher.run()
+
+    assert purges == [True, True]
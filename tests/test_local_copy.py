@@ -0,0 +1,87 @@
+"""
+Copia local: omisión de destinos idénticos y copia en el kernel
+"""
+import os
+
+import pytest
+
+import services.file_service as file_module
+from services.file_service import FileService
+
+CONTENT = b'%PDF-1.7 catalogo' * 500
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_module, 'COPY_BLOCK_SIZE', 1000)
+    service = FileService()
+    service.dest_path = tmp_path / 'destino'
+    return service
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'A.pdf'
+    path.write_bytes(CONTENT)
+    return path
+
+
+def test_identical_destination_is_not_copied_again(service, source):
+    assert service.copy_to_destination(str(source), 'A.pdf')['action'] == 'copied'
+
+    result = service.copy_to_destination(str(source), 'A.pdf')
+
+    assert result == {'success': True, 'action': 'skipped', 'bytes': 0, 'throughputBps': None}
+
+
+def test_destination_with_other_size_is_replaced(service, source):
+    service.dest_path.mkdir()
+    (service.dest_path / 'A.pdf').write_bytes(b'antiguo')
+
+    result = service.copy_to_destination(str(source), 'A.pdf')
+
+    assert result['action'] == 'copied' and result['bytes'] == len(CONTENT)
+    assert result['throughputBps'] > 0
+    assert (service.dest_path / 'A.pdf').read_bytes() == CONTENT
+    assert not list(service.dest_path.glob('*.tmp'))
+
+
+def test_hash_verification_detects_same_size_and_date(service, source, monkeypatch):
+    monkeypatch.setattr(file_module, 'LOCAL_COPY_VERIFY_HASH', True)
+    service.copy_to_destination(str(source), 'A.pdf')
+    destination = service.dest_path / 'A.pdf'
+    stat = destination.stat()
+    destination.write_bytes(CONTENT[::-1])
+    os.utime(destination, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert service.copy_to_destination(str(source), 'A.pdf')['action'] == 'copied'
+    assert destination.read_bytes() == CONTENT
+
+
+def test_linux_copies_in_the_kernel_even_with_content_in_memory(service, source, monkeypatch):
+    monkeypatch.setattr(file_module, 'KERNEL_COPY', True)
+    calls = []
+    kernel_copy = FileService._copy_contents
+
+    def record(src, dst):
+        calls.append(src)
+        return kernel_copy(src, dst)
+
+    monkeypatch.setattr(FileService, '_copy_contents', staticmethod(record))
+    result = service.copy_to_destination(str(source), 'A.pdf', content=bytearray(CONTENT))
+
+    assert calls == [source]
+    assert result['bytes'] == len(CONTENT)
+    assert (service.dest_path / 'A.pdf').read_bytes() == CONTENT
+
+
+def test_copy_falls_back_to_blocks_without_kernel_support(tmp_path, source, monkeypatch):
+    def unsupported(*args):
+        raise OSError(95, "Operation not supported")
+
+    monkeypatch.setattr(file_module.os, 'copy_file_range', unsupported, raising=False)
+    monkeypatch.setattr(file_module.os, 'sendfile', unsupported, raising=False)
+    destination = tmp_path / 'copia.pdf'
+
+    assert FileService._copy_contents(source, destination) == len(CONTENT)
+    assert destination.read_bytes() == CONTENT
@@ -0,0 +1,118 @@
+"""
+Logging: escritura desde un hilo aparte, formateo perezoso y registros JSON con contexto
+"""
+import ast
+import importlib
+import json
+import logging
+import logging.handlers
+import sys
+from pathlib import Path
+
+from utils.logger import ContextFilter, JsonFormatter, bind_log_context, log_context, logger, reset_log_context
+
+# utils/__init__ exporta el logger con el mismo nombre que el módulo
+logger_module = importlib.import_module('utils.logger')
+
+ROOT = Path(__file__).resolve().parent.parent
+LEVELS = {'debug', 'info', 'warning', 'error', 'critical', 'exception'}
+
+
+def eager_log_calls(path: Path):
+    """Llamadas logger.x(...) cuyo mensaje se formatea antes de saber si se registra"""
+    tree = ast.parse(path.read_text(encoding='utf-8'))
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr in LEVELS and node.args
+                and ast.unparse(node.func.value).endswith('logger')):
+            continue
+        message = node.args[0]
+        formatted = (
+            isinstance(message, ast.JoinedStr)
+            or (isinstance(message, ast.BinOp) and isinstance(message.op, ast.Mod))
+            or (isinstance(message, ast.Call) and isinstance(message.func, ast.Attribute)
+                and message.func.attr == 'format')
+        )
+        if formatted:
+            yield f"{path.relative_to(ROOT)}:{node.lineno}"
+
+
+def test_log_messages_are_formatted_lazily():
+    sources = [path for path in ROOT.rglob('*.py')
+               if 'tests' not in path.parts and '.venv' not in path.parts]
+
+    assert [call for path in sources for call in eager_log_calls(path)] == []
+
+
+def test_arguments_are_not_formatted_below_the_log_level():
+    class Expensive:
+        formatted = 0
+
+        def __str__(self):
+            Expensive.formatted += 1
+            return "caro"
+
+    previous = logger.level
+    logger.setLevel(logging.INFO)
+    try:
+        logger.debug("Detalle: %s", Expensive())
+    finally:
+        logger.setLevel(previous)
+
+    assert Expensive.formatted == 0
+
+
+def test_logger_only_enqueues_and_a_listener_writes():
+    assert [type(handler) for handler in logger.handlers] == [logging.handlers.QueueHandler]
+    assert logger_module._listener is not None
+    assert logger_module._listener._thread.is_alive()
+
+
+def test_rotated_files_keep_the_log_extension():
+    assert logger_module._rotated_name('logs/catalog.log.2026-10-19') == 'logs/catalog.2026-10-19.log'
+
+
+def record(message, *args, exc_info=None, **extra):
+    """Registro como el que crea logger.info(message, *args, extra=extra)"""
+    entry = logging.LogRecord('catalog_publisher', logging.INFO, __file__, 1, message, args, exc_info)
+    entry.__dict__.update(extra)
+    return entry
+
+
+def test_json_lines_include_the_run_context():
+    token = bind_log_context(execution_id='exec-1', stage='ftp')
+    try:
+        with log_context(fileName='norte/A.pdf'):
+            entry = record("⏱️  Etapa %s en %.0f ms", 'completada', 12.3, duration_ms=12.3, bytes=3)
+            ContextFilter().filter(entry)
+        after = record("Fin")
+        ContextFilter().filter(after)
+    finally:
+        reset_log_context(token)
+
+    line = json.loads(JsonFormatter().format(entry))
+    assert line['message'] == "⏱️  Etapa completada en 12 ms"
+    assert line['level'] == 'INFO' and line['logger'] == 'catalog_publisher'
+    assert {field: line[field] for field in ('execution_id', 'fileName', 'stage', 'duration_ms', 'bytes')} == {
+        'execution_id': 'exec-1', 'fileName': 'norte/A.pdf', 'stage': 'ftp', 'duration_ms': 12.3, 'bytes': 3}
+    # Al salir del bloque el archivo deja de formar parte del contexto
+    assert not hasattr(after, 'fileName') and after.stage == 'ftp'
+
+
+def test_explicit_extra_fields_win_over_the_context():
+    with log_context(stage='drive'):
+        entry = record("Subida", stage='drive.upload')
+        ContextFilter().filter(entry)
+
+    assert json.loads(JsonFormatter().format(entry))['stage'] == 'drive.upload'
+
+
+def test_json_lines_carry_the_exception():
+    try:
+        raise ValueError("cuota excedida")
+    except ValueError:
+        entry = record("Error al subir", exc_info=sys.exc_info())
+
+    line = json.loads(JsonFormatter().format(entry))
+    assert 'ValueError: cuota excedida' in line['exception']
+    assert 'execution_id' not in line
@@ -0,0 +1,62 @@
+"""
+Control de admisión por presupuesto de memoria
+"""
+import threading
+import time
+
+import utils.memory as memory_module
+from utils.memory import MemoryBudget
+
+MB = 1024 * 1024
+
+
+def budget(monkeypatch, rss_mb=0, timeout=0.3):
+    monkeypatch.setattr(memory_module, 'get_memory_usage', lambda: {'rss': rss_mb * MB, 'peak': rss_mb * MB})
+    return MemoryBudget(budget_mb=100, copy_factor=2, timeout=timeout)
+
+
+def test_oversized_catalog_runs_alone(monkeypatch):
+    memory_budget = budget(monkeypatch)
+
+    assert memory_budget.admit(80 * MB) is True
+    # Mientras el archivo grande está en curso no entra ningún otro
+    assert memory_budget.admit(1 * MB) is False
+    memory_budget.release(80 * MB)
+    assert memory_budget.admit(1 * MB) is True
+
+
+def test_oversized_catalog_waits_for_catalogs_in_flight(monkeypatch):
+    memory_budget = budget(monkeypatch, timeout=5)
+    assert memory_budget.admit(10 * MB) is True
+
+    releaser = threading.Timer(0.2, memory_budget.release, args=(10 * MB,))
+    releaser.start()
+    try:
+        assert memory_budget.admit(80 * MB) is True
+    finally:
+        releaser.join()
+
+
+def test_oversized_catalog_fails_when_others_never_finish(monkeypatch):
+    memory_budget = budget(monkeypatch)
+    assert memory_budget.admit(10 * MB) is True
+
+    assert memory_budget.admit(80 * MB) is False
+
+
+def test_catalog_that_does_not_fit_runs_alone_without_waiting(monkeypatch):
+    monkeypatch.setattr(memory_module, 'get_memory_usage', lambda: {'rss': 150 * MB, 'peak': 150 * MB})
+    memory_budget = MemoryBudget(budget_mb=400, copy_factor=3, timeout=5)
+
+    start = time.monotonic()
+    assert memory_budget.admit(90 * MB) is True
+    assert time.monotonic() - start < 1
+    memory_budget.release(90 * MB)
+    assert memory_budget.admit(150 * MB) is True
+
+
+def test_catalog_is_refused_when_resident_memory_and_others_in_flight_do_not_fit(monkeypatch):
+    memory_budget = budget(monkeypatch, rss_mb=70)
+    assert memory_budget.admit(10 * MB) is True
+
+    assert memory_budget.admit(10 * MB) is False
@@ -0,0 +1,22 @@
+"""
+Exportación de métricas de Prometheus
+"""
+from services.metrics_exporter import MetricsExporter
+from utils.circuit_breaker import CircuitBreaker
+from utils.instrumentation import Instrumentation
+
+
+def test_circuit_counters_and_gauge_help_are_exported(monkeypatch):
+    source = Instrumentation()
+    monkeypatch.setattr('utils.circuit_breaker.instrumentation', source)
+    breaker = CircuitBreaker('ftp', failure_threshold=1, enabled=True)
+    breaker.record_failure()
+    breaker.allow()
+
+    text = MetricsExporter(source, gauges={'queue_depth': ("Profundidad de la cola", lambda: 2)}).render()
+
+    assert 'catalog_publisher_circuit_events_total{destination="ftp",event="opened"} 1' in text
+    assert 'catalog_publisher_circuit_events_total{destination="ftp",event="rejected"} 1' in text
+    assert '# HELP catalog_publisher_queue_depth Profundidad de la cola' in text
+    assert 'catalog_publisher_queue_depth 2' in text
+
@@ -0,0 +1,73 @@
+"""
+Conexión perezosa con MongoDB: nunca bloquea al llamante
+"""
+import threading
+import time
+
+import pytest
+from pymongo.errors import ConnectionFailure
+
+import services.mongo_service as mongo_module
+from services.journal_service import JournalService
+from services.mongo_service import MongoService
+
+
+class SlowClient:
+    """MongoClient cuyo ping tarda hasta que la prueba lo libera y luego falla"""
+
+    created = []
+    release = threading.Event()
+
+    def __init__(self, uri, **options):
+        SlowClient.created.append(options)
+        self.admin = self
+
+    def command(self, name):
+        SlowClient.release.wait(5)
+        raise ConnectionFailure("sin servidor")
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def mongo(tmp_path, monkeypatch):
+    SlowClient.created = []
+    SlowClient.release = threading.Event()
+    monkeypatch.setattr(mongo_module, 'MongoClient', SlowClient)
+    mongo = MongoService()
+    mongo.journal.close()
+    mongo.journal = JournalService(tmp_path / 'journal.db')
+    yield mongo
+    SlowClient.release.set()
+    mongo.close()
+
+
+def test_service_does_not_connect_until_first_use(mongo):
+    assert mongo._reconnect_thread is None
+    assert SlowClient.created == []
+
+
+def test_writes_return_at_once_while_connecting_in_background(mongo):
+    start = time.perf_counter()
+    assert mongo.update_stage('exec-1', 'A.pdf', 'local', 'success') is False
+    assert mongo.update_stage('exec-1', 'A.pdf', 'drive', 'success') is False
+    assert time.perf_counter() - start < 0.5
+
+    # Una sola conexión en curso y los cambios quedan en el diario local
+    assert len(SlowClient.created) == 1
+    assert mongo._reconnect_thread.is_alive()
+    assert mongo.journal.pending_count() == 2
+
+
+def test_client_uses_the_configured_pool(mongo):
+    mongo._ensure_connected()
+    SlowClient.release.set()
+    mongo._attempt_done.wait(5)
+
+    assert SlowClient.created[0] == {
+        'serverSelectionTimeoutMS': mongo_module.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        'maxPoolSize': mongo_module.MONGO_MAX_POOL_SIZE,
+        'minPoolSize': mongo_module.MONGO_MIN_POOL_SIZE,
+        'maxIdleTimeMS': mongo_module.MONGO_MAX_IDLE_TIME_MS,
+    }
@@ -0,0 +1,51 @@
+"""
+Normalización de nombres de catálogos sin distinguir acentos ni mayúsculas
+"""
+import pytest
+
+import utils.name_mapper as name_mapper
+from utils.name_mapper import canonical_name, normalize_catalog_name, set_catalog_mapping
+
+
+@pytest.fixture(autouse=True)
+def mapping():
+    """Mapeo de prueba; al terminar se restaura el configurado"""
+    original = name_mapper.get_all_mapped_names()
+    set_catalog_mapping({
+        'Catálogo Niños.pdf': 'catalogo-ninos.pdf',
+        'PEQUEÑOS ELECTRODOMÉSTICOS.pdf': 'pequenos-electrodomesticos.pdf',
+    })
+    yield
+    set_catalog_mapping(original)
+
+
+def test_canonical_name_ignores_accents_case_and_separators():
+    assert canonical_name('Catálogo_Niños.PDF') == canonical_name('catalogo ninos.pdf')
+    assert canonical_name('ÉXITO - Ñandú') == 'exitonandu'
+
+
+@pytest.mark.parametrize('filename', [
+    'Catálogo Niños.pdf',
+    'catalogo ninos.pdf',
+    'CATALOGO_NIÑOS.PDF',
+    'Catalogo-Ninos.pdf',
+])
+def test_accent_insensitive_names_match(filename):
+    assert normalize_catalog_name(filename) == ('catalogo-ninos.pdf', True)
+
+
+def test_decomposed_unicode_matches_composed_mapping():
+    # "ñ" y "é" escritos como letra + acento combinante (p. ej. nombres desde macOS)
+    decomposed = 'Pequeños electrodomésticos.pdf'
+    assert normalize_catalog_name(decomposed) == ('pequenos-electrodomesticos.pdf', True)
+
+
+def test_unknown_name_is_returned_unchanged():
+    assert normalize_catalog_name('Ofertas.pdf') == ('Ofertas.pdf', False)
+
+
+def test_typo_is_only_suggested_without_fuzzy_match(monkeypatch):
+    monkeypatch.setattr(name_mapper, 'CATALOG_NAME_FUZZY_MATCH', False)
+
+    assert normalize_catalog_name('Catalogo Nimos.pdf') == ('Catalogo Nimos.pdf', False)
+    assert name_mapper.suggest_catalog_name('Catalogo Nimos.pdf') == 'Catálogo Niños.pdf'
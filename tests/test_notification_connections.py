@@ -0,0 +1,129 @@
+"""
+Conexiones reutilizadas: una sesión HTTP para Slack y un cliente SMTP autenticado
+"""
+import asyncio
+from email.mime.multipart import MIMEMultipart
+
+import aiosmtplib
+import pytest
+from aiohttp import web
+
+import services.notifications as notifications_module
+from services.notification_outbox import NotificationOutbox
+from services.notifications import NotificationManager
+
+
+@pytest.fixture
+def notifier(tmp_path, monkeypatch):
+    monkeypatch.setenv('EMAIL_NOTIFICATIONS_ENABLED', 'true')
+    monkeypatch.setenv('SENDER_EMAIL', 'catalogos@example.com')
+    monkeypatch.setenv('SENDER_PASSWORD', 'secreto')
+    monkeypatch.setenv('NOTIFICATION_EMAILS', 'equipo@example.com')
+    monkeypatch.setenv('SLACK_NOTIFICATIONS_ENABLED', 'true')
+    monkeypatch.setenv('SLACK_WEBHOOK_URL', 'https://hooks.slack.invalid/test')
+    notifier = NotificationManager()
+    notifier.outbox.close()
+    notifier.outbox = NotificationOutbox(tmp_path / 'outbox.db')
+    yield notifier
+    notifier.outbox.close()
+
+
+class FakeSMTP:
+    """Cliente SMTP que cuenta conexiones y puede perder la conexión una vez"""
+
+    connections = 0
+    drop_next = False
+
+    def __init__(self, **options):
+        self.options = options
+        self.is_connected = False
+        self.sent = []
+
+    async def connect(self):
+        FakeSMTP.connections += 1
+        self.is_connected = True
+
+    async def send_message(self, message):
+        if FakeSMTP.drop_next:
+            FakeSMTP.drop_next = False
+            self.is_connected = False
+            raise aiosmtplib.SMTPServerDisconnected("conexión cerrada")
+        self.sent.append(message)
+
+    async def quit(self):
+        self.is_connected = False
+
+    def close(self):
+        self.is_connected = False
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    FakeSMTP.connections = 0
+    FakeSMTP.drop_next = False
+    monkeypatch.setattr(notifications_module.aiosmtplib, 'SMTP', FakeSMTP)
+    return FakeSMTP
+
+
+def test_smtp_connection_is_authenticated_once_and_reused(notifier, smtp):
+    async def send_two():
+        await notifier._send_smtp_message(MIMEMultipart())
+        await notifier._send_smtp_message(MIMEMultipart())
+        return notifier._smtp
+
+    client = asyncio.run(send_two())
+
+    assert smtp.connections == 1
+    assert len(client.sent) == 2
+    assert client.options['username'] == 'catalogos@example.com'
+
+
+def test_dropped_smtp_connection_reconnects_once(notifier, smtp):
+    async def send_after_drop():
+        await notifier._send_smtp_message(MIMEMultipart())
+        smtp.drop_next = True
+        await notifier._send_smtp_message(MIMEMultipart())
+        return notifier._smtp
+
+    client = asyncio.run(send_after_drop())
+
+    assert smtp.connections == 2
+    assert len(client.sent) == 1
+
+
+def test_slack_posts_share_one_http_connection(notifier):
+    peers = []
+
+    async def webhook(request):
+        peers.append(request.transport.get_extra_info('peername'))
+        return web.Response(text='ok')
+
+    async def post_three():
+        app = web.Application()
+        app.router.add_post('/hook', webhook)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        notifier.slack_config['webhook_url'] = f'http://127.0.0.1:{port}/hook'
+        try:
+            statuses = [(await notifier._post_slack({'text': str(i)})).status for i in range(3)]
+            await notifier.close()
+        finally:
+            await runner.cleanup()
+        return statuses
+
+    assert asyncio.run(post_three()) == [200, 200, 200]
+    assert len(peers) == 3
+    assert len(set(peers)) == 1
+
+
+def test_connections_are_not_reused_across_event_loops(notifier):
+    async def session():
+        return await notifier._get_http_session()
+
+    first = asyncio.run(session())
+    second = asyncio.run(session())
+
+    assert first is not second
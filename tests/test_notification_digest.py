@@ -0,0 +1,81 @@
+"""
+Resumen de alertas agrupado por severidad al final de la ejecución
+"""
+import asyncio
+import json
+
+import pytest
+
+from services.notification_outbox import NotificationOutbox
+from services.notifications import NotificationManager
+
+
+@pytest.fixture
+def notifier(tmp_path, monkeypatch):
+    """Notificador solo con Slack y una entrega simulada que registra los envíos"""
+    monkeypatch.setenv('EMAIL_NOTIFICATIONS_ENABLED', 'false')
+    monkeypatch.setenv('SLACK_NOTIFICATIONS_ENABLED', 'true')
+    monkeypatch.setenv('SLACK_WEBHOOK_URL', 'https://hooks.slack.invalid/test')
+    monkeypatch.setenv('NOTIFICATION_DIGEST_ENABLED', 'true')
+    notifier = NotificationManager()
+    notifier.outbox.close()
+    notifier.outbox = NotificationOutbox(tmp_path / 'outbox.db')
+    notifier.delivered = []
+
+    async def deliver(channel, payload):
+        notifier.delivered.append(json.dumps(payload, ensure_ascii=False))
+
+    monkeypatch.setattr(notifier, '_deliver', deliver)
+    yield notifier
+    notifier.outbox.close()
+
+
+def test_alerts_of_a_run_are_sent_as_one_message_per_severity(notifier):
+    notifier.start_digest()
+    assert notifier.collect('warning', "Subida FTP", "Tiempo agotado", {'archivo': 'A.pdf'})
+    assert notifier.collect('warning', "Subida FTP", "Tiempo agotado", {'archivo': 'B.pdf'})
+    assert notifier.collect('critical', "Google Drive", "Cuota excedida", {'archivo': 'A.pdf'})
+
+    events = notifier.take_digest()
+    assert [len(events[severity]) for severity in ('critical', 'warning', 'resolved')] == [1, 2, 0]
+    assert asyncio.run(notifier.send_digest(events)) is True
+
+    critical, warning = notifier.delivered
+    assert "1 errores críticos" in critical
+    assert "2 advertencias" in warning
+    assert "• Subida FTP: Tiempo agotado (A.pdf)" in warning
+    assert "A.pdf, B.pdf" in warning
+
+
+def test_take_digest_ends_the_collection(notifier):
+    notifier.start_digest()
+    notifier.take_digest()
+
+    # Fuera de una ejecución la alerta se envía al momento
+    assert notifier.collect('warning', "Drive", "Sin conexión") is False
+
+
+def test_disabled_digest_sends_alerts_individually(notifier):
+    notifier.digest_enabled = False
+    notifier.start_digest()
+
+    assert notifier.collect('critical', "FTP", "Login rechazado") is False
+    assert notifier.take_digest() == {'critical': [], 'warning': [], 'resolved': []}
+
+
+def test_failed_stages_of_a_run_end_in_a_single_digest(publisher, monkeypatch):
+    collected, submitted = [], []
+    monkeypatch.setattr(publisher.ftp_service, 'upload_file', lambda *args, **kwargs: False)
+    monkeypatch.setattr(publisher.notifier, 'collect',
+                        lambda severity, *args: collected.append(severity) or True, raising=False)
+    monkeypatch.setattr(publisher.notifier, 'take_digest',
+                        lambda: {'warning': list(collected)}, raising=False)
+    monkeypatch.setattr(publisher.notifier, 'send_digest',
+                        lambda events: ('resumen', events), raising=False)
+    publisher.dispatcher = type('Dispatcher', (), {'submit': lambda self, coro: submitted.append(coro)})()
+
+    publisher.run()
+
+    assert collected
+    # Solo el resumen: ninguna alerta individual durante la ejecución
+    assert submitted == [('resumen', {'warning': collected})]
@@ -0,0 +1,97 @@
+"""
+Despachador de notificaciones en segundo plano
+"""
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+
+from services.notifications import NotificationDispatcher
+
+request = contextvars.ContextVar('request', default=None)
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = NotificationDispatcher()
+    yield dispatcher
+    dispatcher.shutdown(timeout=1)
+
+
+def test_submit_returns_without_waiting_for_delivery(dispatcher):
+    release = threading.Event()
+    done = []
+
+    async def slow():
+        await asyncio.get_running_loop().run_in_executor(None, release.wait, 5)
+        done.append('lenta')
+
+    start = time.perf_counter()
+    assert dispatcher.submit(slow()) is True
+    assert time.perf_counter() - start < 0.1
+    assert dispatcher.pending() == 1
+
+    release.set()
+    assert dispatcher.flush(timeout=2) is True
+    assert done == ['lenta']
+    assert dispatcher.pending() == 0
+
+
+def test_coroutines_run_in_order_with_the_submitter_context(dispatcher):
+    seen = []
+
+    async def record(name):
+        seen.append((name, request.get(), threading.current_thread().name))
+
+    for name in ('A.pdf', 'B.pdf'):
+        token = request.set(name)
+        dispatcher.submit(record(name))
+        request.reset(token)
+
+    assert dispatcher.flush(timeout=2) is True
+    assert seen == [('A.pdf', 'A.pdf', 'notification-dispatcher'),
+                    ('B.pdf', 'B.pdf', 'notification-dispatcher')]
+
+
+def test_failed_notification_does_not_stop_the_queue(dispatcher):
+    done = []
+
+    async def broken():
+        raise RuntimeError("smtp caído")
+
+    async def ok():
+        done.append(True)
+
+    dispatcher.submit(broken())
+    dispatcher.submit(ok())
+
+    assert dispatcher.flush(timeout=2) is True
+    assert done == [True]
+
+
+def test_periodic_task_runs_at_once_and_stops_on_shutdown():
+    dispatcher = NotificationDispatcher()
+    runs = threading.Event()
+
+    async def tick():
+        runs.set()
+
+    dispatcher.schedule_periodic(tick, interval=60)
+    assert runs.wait(2)
+
+    assert dispatcher.shutdown(timeout=1) is True
+    assert not dispatcher._thread.is_alive()
+
+
+def test_submit_after_shutdown_is_dropped():
+    dispatcher = NotificationDispatcher()
+    dispatcher.shutdown(timeout=1)
+
+    async def late():
+        pass
+
+    coro = late()
+    assert dispatcher.submit(coro) is False
+    assert coro.cr_frame is None
@@ -0,0 +1,109 @@
+"""
+Durabilidad de la bandeja de salida de notificaciones
+"""
+import asyncio
+
+import pytest
+
+from services.notification_outbox import NotificationOutbox
+from services.notifications import NotificationDispatcher, NotificationManager
+from utils.circuit_breaker import CircuitOpenError
+
+
+@pytest.fixture
+def outbox_path(tmp_path):
+    return tmp_path / 'outbox.db'
+
+
+@pytest.fixture
+def notifier(outbox_path, monkeypatch):
+    """Notificador solo con Slack y una entrega simulada que registra los envíos"""
+    monkeypatch.setenv('EMAIL_NOTIFICATIONS_ENABLED', 'false')
+    monkeypatch.setenv('SLACK_NOTIFICATIONS_ENABLED', 'true')
+    monkeypatch.setenv('SLACK_WEBHOOK_URL', 'https://hooks.slack.invalid/test')
+    notifier = NotificationManager()
+    notifier.outbox.close()
+    notifier.outbox = NotificationOutbox(outbox_path)
+    notifier.delivered = []
+
+    async def deliver(channel, payload):
+        notifier.delivered.append(channel)
+
+    monkeypatch.setattr(notifier, '_deliver', deliver)
+    yield notifier
+    notifier.outbox.close()
+
+
+def test_notification_is_stored_before_dispatch(notifier, outbox_path):
+    delivery = notifier.notify_warning("Copia local", "No se pudo copiar", {"archivo": "A.pdf"})
+
+    # Caída antes de que el despachador ejecute la entrega
+    assert notifier.outbox.pending_count() == 1
+    delivery.close()
+
+    restarted = NotificationOutbox(outbox_path)
+    try:
+        assert [m['channel'] for m in restarted.due()] == ['slack']
+    finally:
+        restarted.close()
+
+
+def test_pending_delivery_survives_shutdown_timeout(notifier):
+    dispatcher = NotificationDispatcher()
+    release = asyncio.Event()
+
+    async def blocked():
+        await release.wait()
+
+    dispatcher.submit(blocked())
+    dispatcher.submit(notifier.notify_success("Publicación completada", "1 catálogo"))
+    assert dispatcher.shutdown(timeout=0.2) is False
+
+    assert notifier.delivered == []
+    assert notifier.outbox.pending_count() == 1
+    assert asyncio.run(notifier.process_outbox()) == 1
+    assert notifier.delivered == ['slack']
+
+
+def test_delivery_skips_messages_already_sent_from_outbox(notifier):
+    delivery = notifier.notify_info("Info", "mensaje")
+    assert asyncio.run(notifier.process_outbox()) == 1
+
+    assert asyncio.run(delivery) is False
+    assert notifier.delivered == ['slack']
+
+
+def test_messages_for_disabled_channels_are_skipped(notifier):
+    notifier.notify_warning("Drive", "Sin conexión").close()
+    notifier.slack_config['enabled'] = False
+
+    assert asyncio.run(notifier.process_outbox()) == 0
+    assert notifier.outbox.pending_count() == 0
+    assert notifier.delivered == []
+
+
+def test_open_circuit_defers_without_spending_an_attempt(notifier, monkeypatch):
+    async def circuit_open(channel, payload):
+        raise CircuitOpenError("circuito slack abierto")
+
+    monkeypatch.setattr(notifier, '_deliver', circuit_open)
+    message_id = notifier.outbox.enqueue('slack', {'text': "FTP sin conexión"})
+
+    for _ in range(3):
+        assert asyncio.run(notifier.deliver([message_id])) is False
+
+    message = notifier.outbox.get(message_id)
+    assert message['attempts'] == 0
+    assert message['status'] == 'pending'
+
+
+def test_finished_messages_are_purged_after_retention(notifier):
+    sent, failed, pending = (notifier.outbox.enqueue('slack', {'text': text})
+                             for text in ('enviado', 'rechazado', 'pendiente'))
+    notifier.outbox.mark_sent(sent)
+    notifier.outbox.mark_failed(failed, "invalid_payload", permanent=True)
+
+    assert notifier.outbox.purge_sent(retention_days=-1) == 2
+    assert notifier.outbox.get(sent) is None
+    assert notifier.outbox.get(failed) is None
+    assert notifier.outbox.get(pending)['status'] == 'pending'
@@ -0,0 +1,144 @@
+"""
+Comprobación previa de los destinos: casos de fallo
+"""
+import socket
+import threading
+import time
+
+import pytest
+
+import services.mongo_service as mongo_module
+import services.preflight as preflight_module
+from services.drive_service import DriveService
+from services.ftp_service import FTPService
+from services.mongo_service import MongoService
+from services.preflight import PreflightChecker
+from utils.circuit_breaker import circuit_breakers, CLOSED, OPEN
+
+
+@pytest.fixture
+def closed_port():
+    """Puerto local en el que nadie escucha (conexión rechazada)"""
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+@pytest.fixture
+def short_timeouts(monkeypatch):
+    monkeypatch.setattr(preflight_module, 'PREFLIGHT_TIMEOUTS', {'default': 0.3})
+
+
+def test_failed_checks_open_their_circuit(short_timeouts):
+    def broken(timeout):
+        raise OSError("sin ruta al destino")
+
+    checker = PreflightChecker()
+    checker.register('local', lambda timeout: True)
+    checker.register('ftp', lambda timeout: False)
+    checker.register('drive', broken)
+
+    results = checker.run()
+
+    assert results['local'] == {'ok': True, 'durationMs': results['local']['durationMs'], 'error': None}
+    assert results['ftp']['error'] == "no responde"
+    assert results['drive']['error'] == "sin ruta al destino"
+    assert circuit_breakers.get('local').state == CLOSED
+    assert circuit_breakers.get('ftp').state == OPEN
+    assert circuit_breakers.get('drive').state == OPEN
+
+
+def test_slow_check_does_not_hold_the_run(short_timeouts):
+    checker = PreflightChecker()
+    checker.register('slow', lambda timeout: time.sleep(2) or True)
+
+    start = time.perf_counter()
+    results = checker.run()
+
+    assert time.perf_counter() - start < 1
+    assert results['slow']['ok'] is False
+    assert results['slow']['error'].startswith("sin respuesta")
+    assert circuit_breakers.get('slow').is_open
+
+
+def test_hung_check_is_not_started_again_while_it_runs(short_timeouts):
+    release = threading.Event()
+    calls = []
+
+    def hung(timeout):
+        calls.append(timeout)
+        return release.wait(5)
+
+    checker = PreflightChecker()
+    checker.register('local', hung)
+    checker.register('ftp', lambda timeout: True)
+    try:
+        for _ in range(3):
+            results = checker.run()
+
+        assert len(calls) == 1
+        assert results['local']['error'] == "la comprobación anterior sigue sin responder"
+        assert results['ftp']['ok'] is True
+        assert checker._executor._max_workers == 2
+
+        release.set()
+        checker._futures['local'].result(1)
+        assert checker.run()['local']['ok'] is True
+        assert len(calls) == 2
+    finally:
+        release.set()
+        checker.close()
+
+
+def test_ftp_silent_server_times_out():
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    # Acepta la conexión TCP pero nunca envía el saludo FTP
+    server.listen(1)
+    ftp = FTPService()
+    ftp.host, ftp.port = server.getsockname()
+
+    try:
+        start = time.perf_counter()
+        assert ftp.test_connection(timeout=0.3) is False
+        assert time.perf_counter() - start < 2
+    finally:
+        server.close()
+
+
+def test_drive_probe_uses_a_connection_with_socket_timeout():
+    requests = []
+
+    class About:
+        def get(self, fields):
+            return self
+
+        def execute(self, http=None):
+            requests.append(http)
+
+    drive = DriveService()
+    drive.service = type('Service', (), {'about': lambda self: About()})()
+
+    assert drive.test_connection(timeout=4) is True
+    [http] = requests
+    assert http.http.timeout == 4
+
+
+def test_ftp_refused_connection_returns_false(closed_port):
+    ftp = FTPService()
+    ftp.host, ftp.port = '127.0.0.1', closed_port
+
+    assert ftp.test_connection(timeout=1) is False
+
+
+def test_mongo_refused_connection_fails_fast(closed_port, monkeypatch):
+    monkeypatch.setattr(mongo_module, 'MONGO_URI', f"mongodb://127.0.0.1:{closed_port}/")
+    mongo = MongoService()
+    try:
+        start = time.perf_counter()
+        assert mongo.ping(timeout=5) is False
+        assert time.perf_counter() - start < 1
+    finally:
+        mongo.close()
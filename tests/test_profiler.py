@@ -0,0 +1,66 @@
+"""
+Perfilado de una ejecución (--profile / --profile-memory)
+"""
+import json
+import pstats
+
+from utils.profiler import RunProfiler
+
+
+def inner():
+    return sum(i * i for i in range(20000))
+
+
+def outer():
+    return inner() + inner()
+
+
+def test_profile_saves_stats_summary_and_collapsed_stacks(tmp_path):
+    profiler = RunProfiler(tmp_path)
+
+    assert profiler.profile('exec-1', outer) == 2 * inner()
+
+    assert pstats.Stats(str(tmp_path / 'profile_exec-1.pstats')).total_calls > 0
+    assert 'cumulative' in (tmp_path / 'profile_exec-1.txt').read_text(encoding='utf-8')
+    stacks = (tmp_path / 'profile_exec-1.collapsed').read_text(encoding='utf-8').splitlines()
+    assert any('test_profiler.py:outer;test_profiler.py:inner' in line for line in stacks)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in stacks)
+    assert not (tmp_path / 'profile_exec-1.memory.json').exists()
+
+
+def test_profile_memory_records_the_peak_of_each_stage(tmp_path):
+    profiler = RunProfiler(tmp_path, trace_memory=True)
+
+    def run():
+        profiler.mark_stage('lectura')
+        buffer = bytearray(4 * 1024 * 1024)
+        del buffer
+        profiler.mark_stage('ftp')
+
+    profiler.profile('exec-2', run)
+
+    peaks = json.loads((tmp_path / 'profile_exec-2.memory.json').read_text(encoding='utf-8'))
+    assert set(peaks) == {'lectura', 'ftp'}
+    assert peaks['lectura'] >= 4 * 1024 * 1024 > peaks['ftp']
+
+
+def test_profile_is_saved_when_the_run_fails(tmp_path):
+    def broken():
+        raise KeyboardInterrupt
+
+    try:
+        RunProfiler(tmp_path).profile('exec-3', broken)
+    except KeyboardInterrupt:
+        pass
+
+    assert (tmp_path / 'profile_exec-3.pstats').exists()
+
+
+def test_run_is_profiled_by_execution_id(publisher, tmp_path):
+    publisher.profiler = RunProfiler(tmp_path)
+
+    publisher.run()
+
+    [stats] = tmp_path.glob('profile_*.pstats')
+    assert publisher.checkpoints.last_incomplete_run() is None
+    assert 'main.py:process_catalog' in stats.with_suffix('.collapsed').read_text(encoding='utf-8')
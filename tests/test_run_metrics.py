@@ -0,0 +1,92 @@
+"""
+Métricas de ejecución y de etapa en la colección time-series
+"""
+import pytest
+from pymongo.errors import OperationFailure
+
+import services.mongo_service as mongo_module
+from services.journal_service import JournalService
+from services.mongo_service import MongoService
+
+
+class FakeCollection:
+    def __init__(self):
+        self.inserted = []
+        self.indexes = []
+
+    def insert_many(self, documents, ordered=True):
+        self.inserted.extend(documents)
+
+    def create_index(self, keys, **options):
+        self.indexes.append((keys, options))
+
+
+class FakeDatabase:
+    """Base de datos que registra la creación de la colección de métricas"""
+
+    def __init__(self, timeseries=True):
+        self.timeseries = timeseries
+        self.created = []
+        self.collections = {}
+
+    def create_collection(self, name, **options):
+        self.created.append((name, options))
+        if not self.timeseries:
+            raise OperationFailure("time-series no soportado")
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+
+@pytest.fixture
+def mongo(tmp_path, monkeypatch):
+    mongo = MongoService()
+    mongo.journal.close()
+    mongo.journal = JournalService(tmp_path / 'journal.db')
+    monkeypatch.setattr(mongo, '_ensure_connected', lambda: True)
+    mongo.metrics_collection = FakeCollection()
+    yield mongo
+    mongo.close()
+
+
+def stage(duration_ms, size, outcome='success'):
+    return {'durationMs': duration_ms, 'bytes': size, 'outcome': outcome}
+
+
+def test_run_and_stage_records_share_a_low_cardinality_meta(mongo):
+    results = [{'relPath': 'norte/A.pdf', 'local': True, 'drive': True, 'ftp': False,
+                'stages': {'local': stage(500, 1000), 'ftp': stage(0, 0, 'error')}}]
+
+    assert mongo.record_run_metrics('exec-1', results, 2000, 'partial',
+                                    circuits={'ftp': 'open'}) is True
+
+    local, ftp, run = mongo.metrics_collection.inserted
+    assert local['meta'] == {'type': 'stage', 'stage': 'local'}
+    assert local['fileName'] == 'norte/A.pdf' and local['executionId'] == 'exec-1'
+    assert local['throughputBps'] == 2000
+    assert ftp['outcome'] == 'error' and ftp['throughputBps'] == 0.0
+    assert run['meta'] == {'type': 'run'}
+    assert (run['bytes'], run['catalogs'], run['published']) == (1000, 1, 0)
+    assert run['circuits'] == {'ftp': 'open'}
+    assert len({record['timestamp'] for record in (local, ftp, run)}) == 1
+    # Registradas en MongoDB: no quedan en el diario local
+    assert mongo.journal.pending_count() == 0
+
+
+def test_metrics_collection_is_time_series_with_ttl(mongo):
+    mongo.db = FakeDatabase()
+    mongo._ensure_metrics_collection()
+
+    [(name, options)] = mongo.db.created
+    assert name == mongo_module.MONGO_METRICS_COLLECTION
+    assert options['timeseries']['metaField'] == 'meta'
+    assert options['expireAfterSeconds'] == mongo_module.METRICS_RETENTION_DAYS * 86400
+
+
+def test_old_servers_fall_back_to_a_ttl_index(mongo):
+    mongo.db = FakeDatabase(timeseries=False)
+    mongo._ensure_metrics_collection()
+
+    [(keys, options)] = mongo.metrics_collection.indexes
+    assert keys == 'timestamp'
+    assert options['expireAfterSeconds'] == mongo_module.METRICS_RETENTION_DAYS * 86400
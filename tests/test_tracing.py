@@ -0,0 +1,110 @@
+"""
+Trazas de ejecución: spans anidados, etapas y exportación
+"""
+import contextvars
+import json
+
+import pytest
+
+import main
+from utils.tracing import Tracer, tracer as shared_tracer
+
+
+@pytest.fixture
+def tracer():
+    return Tracer(enabled=True)
+
+
+def by_name(trace):
+    return {span.name: span for span in trace.finished_spans()}
+
+
+def test_spans_nest_under_the_current_span(tracer):
+    with tracer.trace('exec-1') as trace:
+        with tracer.span('catalogo', fileName='A.pdf'):
+            with tracer.span('ftp.stor'):
+                pass
+
+    spans = by_name(trace)
+    assert spans['catalogo'].parent is trace.root
+    assert spans['ftp.stor'].parent is spans['catalogo']
+    assert spans['catalogo'].attributes == {'fileName': 'A.pdf'}
+    assert all(span.end_ns for span in trace.spans)
+
+
+def test_exceptions_are_recorded_as_span_errors(tracer):
+    with pytest.raises(ValueError):
+        with tracer.trace('exec-1') as trace:
+            with tracer.span('drive.upload'):
+                raise ValueError("cuota excedida")
+
+    assert by_name(trace)['drive.upload'].error == "ValueError: cuota excedida"
+    assert trace.root.error == "ValueError: cuota excedida"
+
+
+def test_mark_stage_closes_the_previous_stage(tracer):
+    with tracer.trace('exec-1') as trace:
+        with tracer.span('catalogo'):
+            tracer.mark_stage('local')
+            tracer.mark_stage('drive')
+            with tracer.span('drive.upload'):
+                pass
+            tracer.mark_stage(None)
+
+    spans = by_name(trace)
+    assert spans['local'].end_ns <= spans['drive'].start_ns
+    assert spans['drive'].parent is spans['catalogo']
+    assert spans['drive.upload'].parent is spans['drive']
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer(enabled=False)
+    with tracer.trace('exec-1') as trace:
+        with tracer.span('catalogo') as span:
+            pass
+
+    assert trace is None
+    assert span is None
+
+
+def test_spans_started_after_the_trace_closes_are_dropped(tracer):
+    with tracer.trace('exec-1') as trace:
+        # Contexto capturado por el despachador al encolar una notificación
+        context = contextvars.copy_context()
+
+    def late_delivery():
+        with tracer.span('notificacion') as span:
+            return span
+
+    assert context.run(late_delivery) is None
+    assert [span.name for span in trace.spans] == ['ejecucion']
+
+
+def test_chrome_and_otlp_exports(tracer, tmp_path):
+    with tracer.trace('exec-1') as trace:
+        with tracer.span('ftp.stor', bytes=3):
+            pass
+
+    chrome = json.loads(tracer.save(trace, tmp_path, 'chrome').read_text(encoding='utf-8'))
+    events = [event for event in chrome['traceEvents'] if event['ph'] == 'X']
+    assert {event['name'] for event in events} == {'ejecucion', 'ftp.stor'}
+
+    otlp = json.loads(tracer.save(trace, tmp_path, 'otlp').read_text(encoding='utf-8'))
+    [span] = [span for span in otlp['resourceSpans'][0]['scopeSpans'][0]['spans']
+              if span['name'] == 'ftp.stor']
+    assert span['parentSpanId'] == trace.root.span_id
+    assert {'key': 'bytes', 'value': {'intValue': '3'}} in span['attributes']
+
+
+def test_run_saves_the_trace_without_waiting_for_notifications(publisher, monkeypatch):
+    saved = []
+    monkeypatch.setattr(shared_tracer, 'enabled', True)
+    monkeypatch.setattr(main, 'TRACE_STORE', 'mongo')
+    monkeypatch.setattr(publisher.mongo_service, 'record_trace', saved.append, raising=False)
+    publisher.dispatcher.flush = lambda timeout: pytest.fail("la ejecución esperó al despachador")
+
+    publisher.run()
+
+    [trace] = saved
+    names = {span['name'] for span in trace['spans']}
+    assert {'ejecucion', 'descubrimiento', 'catalogo', 'local', 'drive', 'ftp'} <= names
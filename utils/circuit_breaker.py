@@ -0,0 +1,175 @@
+"""
+Circuit breakers por destino (local, Drive, FTP, MongoDB, SMTP, Slack)
+Tras varios fallos consecutivos el circuito se abre y las llamadas fallan
+al instante durante el resto de la ejecución; en la siguiente ejecución
+pasa a semiabierto y una llamada de prueba decide si se cierra o se reabre
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+from config import CIRCUIT_BREAKER_ENABLED, CIRCUIT_BREAKER_THRESHOLD
+from utils.instrumentation import instrumentation
+from utils.logger import logger
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Llamada rechazada porque el circuito del destino está abierto"""
+
+
+class CircuitBreaker:
+    """Circuito de un destino"""
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_BREAKER_THRESHOLD,
+                 enabled: bool = CIRCUIT_BREAKER_ENABLED):
+        """
+        Args:
+            name: Nombre del destino (ftp, drive...)
+            failure_threshold: Fallos consecutivos que abren el circuito
+            enabled: Si es False el circuito nunca se abre
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.enabled = enabled
+        self.state = CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """True si las llamadas se rechazan sin intentarlo"""
+        return self.state == OPEN
+
+    def allow(self) -> bool:
+        """
+        Indica si se puede llamar al destino; en semiabierto solo deja
+        pasar una llamada de prueba a la vez
+
+        Returns:
+            True si la llamada puede hacerse
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+        instrumentation.count(f"circuit.{self.name}.rejected")
+        return False
+
+    def record_success(self):
+        """Registra una llamada correcta (cierra el circuito si estaba en prueba)"""
+        with self._lock:
+            previous = self.state
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._probe_in_flight = False
+        if previous != CLOSED:
+            logger.info("✅ Circuito %s cerrado: el destino responde de nuevo", self.name)
+
+    def record_failure(self):
+        """Registra un fallo; abre el circuito al alcanzar el umbral o si falla la prueba"""
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            should_open = self.enabled and self.state != OPEN and (
+                self.state == HALF_OPEN or self.failures >= self.failure_threshold)
+            if should_open:
+                self.state = OPEN
+                self.opened_at = time.time()
+        if should_open:
+            instrumentation.count(f"circuit.{self.name}.opened")
+            logger.warning(
+                "🔌 Circuito %s abierto tras %s fallos consecutivos: "
+                "se omite el destino hasta la próxima ejecución", self.name, self.failures)
+
+    def trip(self, reason: str):
+        """
+        Abre el circuito sin esperar al umbral (p. ej. si falla el preflight)
+
+        Args:
+            reason: Motivo, para el log
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.state = OPEN
+            self.opened_at = time.time()
+            self._probe_in_flight = False
+        instrumentation.count(f"circuit.{self.name}.opened")
+        logger.warning("🔌 Circuito %s abierto (%s): se omite el destino en esta ejecución",
+                       self.name, reason)
+
+    def tick(self):
+        """Pasa un circuito abierto a semiabierto (al inicio de cada ejecución)"""
+        with self._lock:
+            if self.state != OPEN:
+                return
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+            self.rejected = 0
+        logger.info("🔌 Circuito %s semiabierto: la próxima llamada será de prueba", self.name)
+
+    def snapshot(self) -> Dict:
+        """Estado del circuito para el resumen"""
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'openedAt': self.opened_at
+            }
+
+
+class CircuitBreakerRegistry:
+    """Circuitos de todos los destinos"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        """Obtiene (o crea) el circuito de un destino"""
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(name)
+            return self._breakers[name]
+
+    def tick(self):
+        """Pasa a semiabierto todos los circuitos abiertos"""
+        for breaker in list(self._breakers.values()):
+            breaker.tick()
+
+    def states(self) -> Dict[str, Dict]:
+        """Estado de cada circuito {destino: snapshot}"""
+        return {name: breaker.snapshot() for name, breaker in sorted(self._breakers.items())}
+
+    def open_count(self) -> int:
+        """Número de circuitos abiertos"""
+        return sum(1 for breaker in self._breakers.values() if breaker.is_open)
+
+    def log_summary(self, states: Optional[Dict[str, Dict]] = None):
+        """Escribe en el log el estado de los circuitos que no están cerrados"""
+        states = states if states is not None else self.states()
+        if all(state['state'] == CLOSED for state in states.values()):
+            logger.info("🔌 Circuitos: todos cerrados")
+            return
+        for name, state in states.items():
+            if state['state'] != CLOSED:
+                logger.warning(
+                    "🔌 Circuito %s: %s "
+                    "(%s fallos, %s llamadas omitidas)",
+                    name, state['state'], state['failures'], state['rejected'])
+
+
+# Circuitos compartidos por todos los servicios
+circuit_breakers = CircuitBreakerRegistry()
@@ -0,0 +1,146 @@
+"""
+Instrumentación ligera: temporizadores y contadores por etapa y por llamada externa
+Agrega p50/p95/máximo por ejecución y registra las llamadas lentas; además
+mantiene histogramas y totales acumulados desde el arranque para exportarlos
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+from config import SLOW_CALL_THRESHOLD_MS
+from utils.logger import logger
+from utils.tracing import tracer
+
+# Límites (segundos) de los histogramas acumulados de duración
+HISTOGRAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _percentile(sorted_samples: List[float], percent: float) -> float:
+    """Percentil por rango más cercano de una lista ordenada"""
+    rank = math.ceil(percent / 100 * len(sorted_samples))
+    return sorted_samples[max(rank, 1) - 1]
+
+
+class Instrumentation:
+    """Acumula duraciones y contadores de la ejecución en curso"""
+
+    def __init__(self, slow_threshold_ms: float = SLOW_CALL_THRESHOLD_MS):
+        self.slow_threshold_ms = slow_threshold_ms
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = {}
+        self._counters: Dict[str, float] = {}
+        # Acumulados desde el arranque (no se reinician entre ejecuciones)
+        self._histograms: Dict[str, List] = {}
+        self._totals: Dict[str, float] = {}
+
+    def reset(self):
+        """Descarta lo acumulado de la ejecución (al inicio de cada ejecución)"""
+        with self._lock:
+            self._samples.clear()
+            self._counters.clear()
+
+    def record(self, name: str, duration_ms: float):
+        """
+        Registra la duración de una llamada o etapa
+
+        Args:
+            name: Nombre de la medida (p. ej. ftp.stor, stage.drive)
+            duration_ms: Duración en milisegundos
+        """
+        seconds = duration_ms / 1000
+        with self._lock:
+            self._samples.setdefault(name, []).append(duration_ms)
+            # [conteo por límite, suma, total]
+            histogram = self._histograms.setdefault(name, [[0] * len(HISTOGRAM_BUCKETS), 0.0, 0])
+            for i, bound in enumerate(HISTOGRAM_BUCKETS):
+                if seconds <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+        if duration_ms >= self.slow_threshold_ms:
+            logger.warning(
+                "🐢 Llamada lenta: %s tardó %.0f ms (umbral %.0f ms)",
+                name, duration_ms, self.slow_threshold_ms,
+                extra={'duration_ms': round(duration_ms, 1)})
+
+    def count(self, name: str, value: float = 1):
+        """
+        Incrementa un contador
+
+        Args:
+            name: Nombre del contador (p. ej. bytes.ftp, errors.drive)
+            value: Incremento
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+            self._totals[name] = self._totals.get(name, 0) + value
+
+    def cumulative(self) -> Tuple[Dict[str, Tuple[List[int], float, int]], Dict[str, float]]:
+        """
+        Obtiene los histogramas y totales acumulados desde el arranque
+
+        Returns:
+            Tupla ({nombre: (conteos por límite, suma en segundos, total)}, {nombre: valor})
+        """
+        with self._lock:
+            histograms = {
+                name: (list(buckets), total_seconds, count)
+                for name, (buckets, total_seconds, count) in self._histograms.items()
+            }
+            return histograms, dict(self._totals)
+
+    @contextmanager
+    def timer(self, name: str):
+        """
+        Mide la duración de un bloque; los errores se cuentan como name.errors.
+        Dentro de una ejecución el bloque queda además como span de la traza
+        """
+        start = time.perf_counter()
+        try:
+            with tracer.span(name):
+                yield
+        except BaseException:
+            self.count(f"{name}.errors")
+            raise
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def summary(self) -> Dict[str, Dict]:
+        """
+        Agrega las medidas de la ejecución
+
+        Returns:
+            Diccionario {'timings': {nombre: {count, p50, p95, max, totalMs}},
+            'counters': {nombre: valor}}
+        """
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+            counters = dict(self._counters)
+
+        timings = {
+            name: {
+                'count': len(values),
+                'p50': round(_percentile(values, 50), 1),
+                'p95': round(_percentile(values, 95), 1),
+                'max': round(values[-1], 1),
+                'totalMs': round(sum(values), 1)
+            }
+            for name, values in samples.items()
+        }
+        return {'timings': timings, 'counters': counters}
+
+    def log_summary(self):
+        """Escribe en el log la tabla p50/p95/máximo de la ejecución"""
+        timings = self.summary()['timings']
+        if not timings:
+            return
+        logger.info("⏱️  Tiempos (ms)            n      p50      p95      máx")
+        for name, stats in sorted(timings.items()):
+            logger.info("   %-22s%4s%9.0f%9.0f%9.0f",
+                        name, stats['count'], stats['p50'], stats['p95'], stats['max'])
+
+
+# Instrumentación compartida por todos los servicios
+instrumentation = Instrumentation()
@@ -1,32 +1,113 @@
 """
 Sistema de logging centralizado con colores y archivos rotativos
+Los handlers escriben desde un hilo dedicado (QueueHandler/QueueListener)
+para que el hilo que registra no espere a la consola ni al disco
 """
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
+import queue
 import sys
-from pathlib import Path
+from contextlib import contextmanager
 from datetime import datetime
 import colorlog
 
-from config import LOGS_DIR, LOG_LEVEL
+from config import LOGS_DIR, LOG_LEVEL, LOG_RETENTION_DAYS, LOG_FORMAT
+
+# Listener que vacía la cola de logs en los handlers reales
+_listener = None
+
+# Campos estructurados que acompañan a cada registro
+CONTEXT_FIELDS = ('execution_id', 'fileName', 'stage', 'duration_ms', 'bytes')
+
+# Contexto de la ejecución en curso (ejecución, archivo, etapa)
+_log_context = contextvars.ContextVar('log_context', default={})
+
+
+def bind_log_context(**fields) -> contextvars.Token:
+    """
+    Añade campos al contexto de logging del hilo o tarea actual
+
+    Args:
+        **fields: Campos a añadir (execution_id, fileName, stage...)
+
+    Returns:
+        Token para restaurar el contexto anterior con reset_log_context
+    """
+    return _log_context.set({**_log_context.get(), **fields})
+
+
+def reset_log_context(token: contextvars.Token):
+    """Restaura el contexto de logging anterior a bind_log_context"""
+    _log_context.reset(token)
+
+
+@contextmanager
+def log_context(**fields):
+    """Añade campos al contexto de logging durante un bloque"""
+    token = bind_log_context(**fields)
+    try:
+        yield
+    finally:
+        reset_log_context(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copia el contexto de logging en el registro (en el hilo que registra)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for field, value in _log_context.get().items():
+            if not hasattr(record, field):
+                setattr(record, field, value)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatea cada registro como una línea JSON con los campos de contexto"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage().strip()
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _rotated_name(default_name: str) -> str:
+    """Nombra los archivos rotados como catalog.YYYY-MM-DD.log"""
+    base, _, date = default_name.rpartition('.')
+    return f"{base[:-len('.log')]}.{date}.log"
 
 
 def setup_logger(name: str = "catalog_publisher") -> logging.Logger:
     """
     Configura un logger con salida a consola (con colores) y archivo
-    
+
     Args:
         name: Nombre del logger
-        
+
     Returns:
         Logger configurado
     """
+    global _listener
+
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, LOG_LEVEL.upper(), logging.INFO))
-    
+
     # Evitar duplicar handlers
     if logger.handlers:
         return logger
-    
+
     # Formato para consola (con colores)
     console_formatter = colorlog.ColoredFormatter(
         '%(log_color)s%(asctime)s - %(name)s - %(levelname)s%(reset)s - %(message)s',
@@ -39,26 +120,50 @@ def setup_logger(name: str = "catalog_publisher") -> logging.Logger:
             'CRITICAL': 'red,bg_white',
         }
     )
-    
-    # Formato para archivo (sin colores)
-    file_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
+
+    # Formato para archivo (sin colores, o una línea JSON por registro)
+    if LOG_FORMAT == 'json':
+        file_formatter = JsonFormatter()
+    else:
+        file_formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+
     # Handler para consola
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
-    
-    # Handler para archivo (log diario)
-    log_file = LOGS_DIR / f"catalog_{datetime.now().strftime('%Y%m%d')}.log"
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
+
+    # Handler para archivo: rota a medianoche y conserva LOG_RETENTION_DAYS días
+    file_handler = logging.handlers.TimedRotatingFileHandler(
+        LOGS_DIR / "catalog.log",
+        when='midnight',
+        backupCount=LOG_RETENTION_DAYS,
+        encoding='utf-8'
+    )
+    file_handler.namer = _rotated_name
     file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
-    
+
+    # El logger solo encola; el listener escribe en un hilo aparte
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    logger.addHandler(queue_handler)
+    _listener = logging.handlers.QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
     return logger
 
 
+def stop_logging():
+    """Vacía la cola de logs y detiene el hilo de escritura"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
 # Logger principal
 logger = setup_logger()
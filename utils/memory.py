@@ -0,0 +1,249 @@
+"""
+Medición de memoria del proceso y control de admisión por presupuesto
+Lee el RSS sin dependencias externas (Windows, Linux y otros Unix), muestrea
+el pico durante cada catálogo y retrasa el siguiente si no cabe en el presupuesto
+"""
+import gc
+import io
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from config import (
+    MEMORY_BUDGET_MB, MEMORY_COPY_FACTOR, MEMORY_ADMISSION_TIMEOUT, MEMORY_SAMPLE_INTERVAL
+)
+from utils.logger import logger
+
+
+def _rss_windows() -> Dict[str, int]:
+    """RSS y pico del proceso con GetProcessMemoryInfo"""
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ('cb', wintypes.DWORD),
+            ('PageFaultCount', wintypes.DWORD),
+            ('PeakWorkingSetSize', ctypes.c_size_t),
+            ('WorkingSetSize', ctypes.c_size_t),
+            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+            ('PagefileUsage', ctypes.c_size_t),
+            ('PeakPagefileUsage', ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    ctypes.windll.psapi.GetProcessMemoryInfo(
+        ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+    return {'rss': counters.WorkingSetSize, 'peak': counters.PeakWorkingSetSize}
+
+
+def _rss_proc() -> Dict[str, int]:
+    """RSS y pico del proceso desde /proc/self/status (Linux)"""
+    values = {}
+    with open('/proc/self/status', 'r') as f:
+        for line in f:
+            if line.startswith(('VmRSS:', 'VmHWM:')):
+                key, value = line.split(':', 1)
+                values[key] = int(value.split()[0]) * 1024
+    return {'rss': values.get('VmRSS', 0), 'peak': values.get('VmHWM', 0)}
+
+
+def _rss_resource() -> Dict[str, int]:
+    """Pico del proceso con getrusage (otros Unix; sin RSS actual)"""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS devuelve bytes; el resto de Unix, kilobytes
+    peak = peak if sys.platform == 'darwin' else peak * 1024
+    return {'rss': peak, 'peak': peak}
+
+
+def get_memory_usage() -> Dict[str, int]:
+    """
+    Obtiene la memoria residente del proceso
+
+    Returns:
+        Diccionario con rss (actual) y peak (máximo desde el arranque) en bytes;
+        ceros si no se puede medir
+    """
+    try:
+        if sys.platform == 'win32':
+            return _rss_windows()
+        if os.path.exists('/proc/self/status'):
+            return _rss_proc()
+        return _rss_resource()
+    except Exception as e:
+        logger.debug("No se pudo medir la memoria del proceso: %s", e)
+        return {'rss': 0, 'peak': 0}
+
+
+class MemoryMonitor:
+    """Muestrea el RSS en segundo plano para conocer el pico de cada tramo"""
+
+    def __init__(self, interval: float = MEMORY_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._window_peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Inicia el muestreo"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name="memory-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Detiene el muestreo"""
+        self._stop.set()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = get_memory_usage()['rss']
+            with self._lock:
+                self._window_peak = max(self._window_peak, rss)
+
+    @contextmanager
+    def window(self):
+        """
+        Mide un tramo (p. ej. un catálogo)
+
+        Yields:
+            Diccionario que al salir contiene rssBytes (al final) y peakRssBytes (pico del tramo)
+        """
+        usage = {}
+        start_rss = get_memory_usage()['rss']
+        with self._lock:
+            self._window_peak = start_rss
+        try:
+            yield usage
+        finally:
+            end_rss = get_memory_usage()['rss']
+            with self._lock:
+                peak = max(self._window_peak, end_rss)
+            usage.update(rssBytes=end_rss, peakRssBytes=peak, deltaBytes=end_rss - start_rss)
+
+
+class BufferReader(io.RawIOBase):
+    """
+    Archivo de solo lectura sobre un buffer en memoria, sin copiarlo
+    (io.BytesIO copia los bytearray completos al crearse)
+    """
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast('B')
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        count = max(0, min(len(target), len(self._view) - self._position))
+        target[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._view)}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self):
+        self._view.release()
+        super().close()
+
+
+class MemoryBudget:
+    """Control de admisión: solo empieza un catálogo si cabe en el presupuesto de memoria"""
+
+    def __init__(self, budget_mb: int = MEMORY_BUDGET_MB,
+                 copy_factor: float = MEMORY_COPY_FACTOR,
+                 timeout: float = MEMORY_ADMISSION_TIMEOUT):
+        """
+        Args:
+            budget_mb: Memoria residente máxima en MB (0 lo deshabilita)
+            copy_factor: Copias en memoria de cada archivo durante la subida
+            timeout: Segundos máximos de espera para admitir un catálogo
+        """
+        self.budget = budget_mb * 1024 * 1024
+        self.copy_factor = copy_factor
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._in_flight = 0
+
+    def estimate(self, size: int) -> int:
+        """Memoria estimada para procesar un archivo del tamaño indicado"""
+        return int(size * self.copy_factor)
+
+    def admit(self, size: int) -> bool:
+        """
+        Reserva memoria para un catálogo, esperando si no cabe todavía
+
+        Solo se espera mientras haya otros catálogos en curso que puedan liberar
+        memoria; si no hay ninguno, el catálogo que no cabe se procesa solo al
+        momento (esperar no reduciría el RSS).
+
+        Args:
+            size: Tamaño del archivo en bytes
+
+        Returns:
+            True si se admitió (hay que llamar a release), False si no cabe
+        """
+        if not self.budget:
+            return True
+
+        needed = self.estimate(size)
+        deadline = time.monotonic() + self.timeout
+        collected = False
+        with self._cond:
+            while True:
+                projected = get_memory_usage()['rss'] + self._in_flight + needed
+                if projected <= self.budget:
+                    self._in_flight += needed
+                    return True
+                if not collected:
+                    # Liberar copias de catálogos anteriores antes de esperar
+                    gc.collect()
+                    collected = True
+                    continue
+                if not self._in_flight:
+                    self._in_flight += needed
+                    logger.warning(
+                        "🧠 El archivo necesita unos %.0f MB y se proyectan "
+                        "%.0f MB de %.0f MB: "
+                        "se procesa sin otros catálogos en curso",
+                        needed / 1024 / 1024, projected / 1024 / 1024, self.budget / 1024 / 1024)
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(
+                        "🧠 Presupuesto de memoria agotado: se necesitan %.0f MB "
+                        "y se proyectan %.0f MB de %.0f MB",
+                        needed / 1024 / 1024, projected / 1024 / 1024, self.budget / 1024 / 1024)
+                    return False
+                logger.info(
+                    "⏳ Esperando memoria libre para el siguiente catálogo "
+                    "(%.0f MB proyectados de %.0f MB)", projected / 1024 / 1024, self.budget / 1024 / 1024)
+                self._cond.wait(min(remaining, 5))
+
+    def release(self, size: int):
+        """Libera la reserva hecha con admit"""
+        if not self.budget:
+            return
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - self.estimate(size))
+            self._cond.notify_all()
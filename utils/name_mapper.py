@@ -1,9 +1,126 @@
 """
 Utilidad para normalizar nombres de archivos de catálogos
 """
-from config import CATALOG_NAME_MAPPING
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Optional, Set, Tuple
+
+from config import (
+    CATALOG_NAME_MAPPING, CATALOG_NAME_FUZZY_MATCH, CATALOG_NAME_SIMILARITY_THRESHOLD
+)
 from utils.logger import logger
 
+# Espacios, signos de puntuación y guiones bajos que se ignoran al comparar
+_SEPARATORS = re.compile(r'[\W_]+')
+
+# Similitud mínima para sugerir una entrada del mapeo
+MIN_SUGGESTION_SIMILARITY = 0.4
+
+
+def canonical_name(name: str) -> str:
+    """
+    Calcula la forma canónica de un nombre para compararlo
+
+    Ignora mayúsculas, acentos (Ñ -> n, É -> e), espacios y signos de puntuación.
+
+    Args:
+        name: Nombre del archivo
+
+    Returns:
+        Nombre en forma canónica
+    """
+    decomposed = unicodedata.normalize('NFKD', name.casefold())
+    without_accents = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return _SEPARATORS.sub('', without_accents)
+
+
+def _trigrams(canonical: str) -> Set[str]:
+    """Trigramas de un nombre canónico (con relleno en los extremos)"""
+    padded = f"  {canonical} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CatalogNameIndex:
+    """Índice precalculado del mapeo de nombres: búsqueda exacta, canónica y por trigramas"""
+
+    def __init__(self, mapping: Dict[str, str]):
+        self.mapping = dict(mapping)
+        self.canonical: Dict[str, Tuple[str, str]] = {}
+        self.trigrams: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+
+        for original, mapped in self.mapping.items():
+            key = canonical_name(original)
+            if key in self.canonical:
+                logger.warning(
+                    "Mapeo ambiguo: '%s' y '%s' "
+                    "tienen la misma forma canónica; se usa el primero", original, self.canonical[key][0])
+                continue
+            self.canonical[key] = (original, mapped)
+            self.trigrams[key] = _trigrams(key)
+            for trigram in self.trigrams[key]:
+                self._postings.setdefault(trigram, set()).add(key)
+
+    def lookup(self, filename: str) -> Optional[str]:
+        """
+        Busca el nombre normalizado (exacto y después por forma canónica)
+
+        Args:
+            filename: Nombre del archivo original
+
+        Returns:
+            Nombre normalizado o None si no hay mapeo
+        """
+        if filename in self.mapping:
+            return self.mapping[filename]
+        entry = self.canonical.get(canonical_name(filename))
+        return entry[1] if entry else None
+
+    def suggest(self, filename: str) -> Optional[Tuple[str, str, float]]:
+        """
+        Busca la entrada del mapeo más parecida por similitud de trigramas
+
+        Args:
+            filename: Nombre del archivo original
+
+        Returns:
+            Tupla (nombre_original, nombre_normalizado, similitud) o None si
+            ninguna entrada se parece lo suficiente
+        """
+        query = _trigrams(canonical_name(filename))
+        shared = Counter(
+            key for trigram in query for key in self._postings.get(trigram, ()))
+        if not shared:
+            return None
+
+        # Similitud de Jaccard entre los conjuntos de trigramas
+        key, score = max(
+            ((key, common / len(query | self.trigrams[key])) for key, common in shared.items()),
+            key=lambda item: item[1]
+        )
+        if score < MIN_SUGGESTION_SIMILARITY:
+            return None
+        original, mapped = self.canonical[key]
+        return original, mapped, score
+
+
+_index = CatalogNameIndex(CATALOG_NAME_MAPPING)
+
+
+def set_catalog_mapping(mapping: Dict[str, str]):
+    """
+    Sustituye el mapeo de nombres sin reiniciar el proceso
+
+    El índice nuevo se construye aparte y se publica con una única asignación,
+    de modo que las búsquedas en curso ven el índice anterior o el nuevo completo.
+
+    Args:
+        mapping: Diccionario {nombre_original: nombre_normalizado}
+    """
+    global _index
+    _index = CatalogNameIndex(mapping)
+
 
 def normalize_catalog_name(filename: str) -> tuple[str, bool]:
     """
@@ -15,30 +132,51 @@ def normalize_catalog_name(filename: str) -> tuple[str, bool]:
     Returns:
         Tupla con (nombre_normalizado, encontrado_en_mapeo)
     """
-    # Búsqueda exacta primero
-    if filename in CATALOG_NAME_MAPPING:
-        logger.debug(f"Normalizado: {filename} -> {CATALOG_NAME_MAPPING[filename]}")
-        return CATALOG_NAME_MAPPING[filename], True
+    index = _index
+    mapped = index.lookup(filename)
+    if mapped is not None:
+        logger.debug("Normalizado: %s -> %s", filename, mapped)
+        return mapped, True
 
-    # Búsqueda flexible (sin distinguir mayúsculas/minúsculas y espacios)
-    normalized_input = filename.lower().replace(" ", "")
-
-    for original, mapped in CATALOG_NAME_MAPPING.items():
-        normalized_key = original.lower().replace(" ", "")
-        if normalized_key == normalized_input:
-            logger.debug(f"Normalizado (flexible): {filename} -> {mapped}")
-            return mapped, True
+    # Nombres con erratas: aceptar la entrada más parecida si está habilitado
+    suggestion = index.suggest(filename)
+    if (CATALOG_NAME_FUZZY_MATCH and suggestion
+            and suggestion[2] >= CATALOG_NAME_SIMILARITY_THRESHOLD):
+        original, mapped, score = suggestion
+        logger.warning(
+            "Normalizado por similitud (%.0f%%): %s -> %s (como '%s')",
+            score * 100, filename, mapped, original)
+        return mapped, True
 
     # Si no se encuentra, devolver el original y registrar advertencia
-    logger.warning(f"No se encontró mapeo para: {filename}")
+    if suggestion:
+        logger.warning(
+            "No se encontró mapeo para: %s (¿quizá '%s'? %.0f%%)",
+            filename, suggestion[0], suggestion[2] * 100)
+    else:
+        logger.warning("No se encontró mapeo para: %s", filename)
     return filename, False
 
 
+def suggest_catalog_name(filename: str) -> Optional[str]:
+    """
+    Sugiere el nombre del mapeo más parecido a un archivo sin mapeo
+
+    Args:
+        filename: Nombre del archivo original
+
+    Returns:
+        Nombre original del mapeo más parecido o None
+    """
+    suggestion = _index.suggest(filename)
+    return suggestion[0] if suggestion else None
+
+
 def get_all_mapped_names() -> dict:
     """
     Obtiene todo el mapeo de nombres
-    
+
     Returns:
         Diccionario con el mapeo completo
     """
-    return CATALOG_NAME_MAPPING.copy()
+    return _index.mapping.copy()
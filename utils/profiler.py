@@ -0,0 +1,140 @@
+"""
+Perfilado de una ejecución del publicador
+Guarda en LOGS_DIR, por execution_id, las estadísticas de cProfile (pstats),
+un resumen legible, las pilas colapsadas para flame graphs y, opcionalmente,
+el pico de memoria (tracemalloc) de cada etapa
+"""
+import cProfile
+import io
+import json
+import pstats
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from config import LOGS_DIR
+from utils.logger import logger
+
+
+def _label(func: tuple) -> str:
+    """Etiqueta de una función de pstats: archivo:función"""
+    file_name, _, function = func
+    return f"{Path(file_name).name}:{function}" if file_name != '~' else function
+
+
+class RunProfiler:
+    """Perfila ejecuciones completas y guarda los resultados por execution_id"""
+
+    def __init__(self, output_dir: Path = LOGS_DIR, trace_memory: bool = False):
+        """
+        Args:
+            output_dir: Carpeta donde se guardan los perfiles
+            trace_memory: Registrar el pico de memoria de cada etapa con tracemalloc
+        """
+        self.output_dir = Path(output_dir)
+        self.trace_memory = trace_memory
+        self._stage = None
+        self._stage_peaks: Dict[str, int] = {}
+
+    def profile(self, execution_id: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Ejecuta una función bajo cProfile y guarda los resultados
+
+        Args:
+            execution_id: ID de ejecución (nombre de los archivos)
+            func: Función a perfilar
+
+        Returns:
+            Lo que devuelva la función
+        """
+        self._stage = None
+        self._stage_peaks = {}
+        if self.trace_memory:
+            tracemalloc.start()
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            if self.trace_memory:
+                self.mark_stage(None)
+                tracemalloc.stop()
+            self._save(execution_id, profiler)
+
+    def mark_stage(self, stage: Optional[str]):
+        """
+        Cierra la etapa en curso (guardando su pico de memoria) y abre la siguiente
+
+        Args:
+            stage: Etapa que empieza (None para cerrar la última)
+        """
+        if not self.trace_memory or not tracemalloc.is_tracing():
+            return
+        if self._stage:
+            peak = tracemalloc.get_traced_memory()[1]
+            self._stage_peaks[self._stage] = max(self._stage_peaks.get(self._stage, 0), peak)
+        tracemalloc.reset_peak()
+        self._stage = stage
+
+    def _save(self, execution_id: str, profiler: cProfile.Profile):
+        """Escribe pstats, resumen, pilas colapsadas y picos de memoria"""
+        base = self.output_dir / f"profile_{execution_id}"
+        try:
+            profiler.dump_stats(f"{base}.pstats")
+
+            summary = io.StringIO()
+            stats = pstats.Stats(profiler, stream=summary)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(40)
+            Path(f"{base}.txt").write_text(summary.getvalue(), encoding='utf-8')
+
+            Path(f"{base}.collapsed").write_text(
+                "\n".join(f"{stack} {weight}" for stack, weight in
+                          sorted(self._collapsed_stacks(stats).items())) + "\n",
+                encoding='utf-8')
+
+            if self._stage_peaks:
+                Path(f"{base}.memory.json").write_text(
+                    json.dumps(self._stage_peaks, indent=2), encoding='utf-8')
+                for stage, peak in sorted(self._stage_peaks.items(), key=lambda item: -item[1]):
+                    logger.info("🧠 Pico de memoria en %s: %.1f MB", stage, peak / 1024 / 1024)
+
+            logger.info("🔬 Perfil guardado en %s.pstats (+ .txt, .collapsed)", base)
+        except Exception as e:
+            logger.error("❌ Error al guardar el perfil de %s: %s", execution_id, e)
+
+    @staticmethod
+    def _collapsed_stacks(stats: pstats.Stats) -> Dict[str, int]:
+        """
+        Reconstruye pilas colapsadas (formato flamegraph.pl / speedscope)
+
+        cProfile solo guarda relaciones llamador-llamado, así que cada función
+        se atribuye a la cadena de llamadores que más tiempo acumulado aporta.
+
+        Returns:
+            Diccionario {pila separada por ';': microsegundos de tiempo propio}
+        """
+        entries = stats.stats
+        stacks = defaultdict(int)
+        for func, (_, _, own_time, _, _) in entries.items():
+            weight = int(own_time * 1_000_000)
+            if weight <= 0:
+                continue
+
+            path = [func]
+            seen = {func}
+            current = func
+            while True:
+                callers = entries[current][4]
+                candidates = [c for c in callers if c in entries and c not in seen]
+                if not candidates:
+                    break
+                # Cada llamador: (llamadas primitivas, llamadas, tiempo propio, tiempo acumulado)
+                current = max(candidates, key=lambda caller: callers[caller][3])
+                path.append(current)
+                seen.add(current)
+
+            stacks[";".join(_label(f) for f in reversed(path))] += weight
+        return stacks
@@ -0,0 +1,316 @@
+"""
+Trazas de ejecución: spans anidados con inicio, fin, atributos y errores
+Cada ejecución genera una traza compacta que se exporta en formato Chrome
+trace (chrome://tracing, Perfetto) u OpenTelemetry JSON (OTLP)
+"""
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import TRACE_ENABLED, TRACE_DIR, TRACE_FORMAT, LOG_RETENTION_DAYS
+from utils.logger import logger
+
+SERVICE_NAME = "catalog_publisher"
+
+
+class Span:
+    """Tramo de la traza (una etapa o una llamada externa)"""
+
+    __slots__ = ('trace', 'span_id', 'parent', 'name', 'kind', 'attributes',
+                 'start_ns', 'end_ns', 'error', 'thread')
+
+    def __init__(self, trace: 'Trace', name: str, parent: Optional['Span'],
+                 attributes: Dict, kind: str = 'block'):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent = parent
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+        self.thread = threading.current_thread().name
+
+    def to_dict(self) -> Dict:
+        """Forma compacta del span (tiempos en µs desde el inicio de la traza)"""
+        origin = self.trace.root.start_ns
+        span = {
+            'id': self.span_id,
+            'parent': self.parent.span_id if self.parent else None,
+            'name': self.name,
+            'start': (self.start_ns - origin) // 1000,
+            'duration': ((self.end_ns or self.start_ns) - self.start_ns) // 1000,
+            'thread': self.thread
+        }
+        if self.attributes:
+            span['attributes'] = self.attributes
+        if self.error:
+            span['error'] = self.error
+        return span
+
+
+class Trace:
+    """Spans de una ejecución"""
+
+    def __init__(self, execution_id: str):
+        self.execution_id = execution_id
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self.root = Span(self, "ejecucion", None, {'execution_id': execution_id})
+        self.add(self.root)
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def finished_spans(self) -> List[Span]:
+        """Spans cerrados, en orden de inicio"""
+        with self._lock:
+            return sorted((s for s in self.spans if s.end_ns), key=lambda s: s.start_ns)
+
+    def to_dict(self) -> Dict:
+        """
+        Traza compacta para guardar en MongoDB
+
+        Returns:
+            Diccionario con executionId, traceId, inicio, duración y spans
+        """
+        return {
+            'executionId': self.execution_id,
+            'traceId': self.trace_id,
+            'startTime': self.root.start_ns // 1000,
+            'durationUs': ((self.root.end_ns or time.time_ns()) - self.root.start_ns) // 1000,
+            'spans': [span.to_dict() for span in self.finished_spans()]
+        }
+
+    def to_chrome(self) -> Dict:
+        """
+        Traza en formato Chrome trace (eventos completos 'X', una fila por hilo)
+
+        Returns:
+            Diccionario {'traceEvents': [...]}
+        """
+        threads = {}
+        events = []
+        for span in self.finished_spans():
+            tid = threads.setdefault(span.thread, len(threads) + 1)
+            args = dict(span.attributes)
+            if span.error:
+                args['error'] = span.error
+            events.append({
+                'name': span.name,
+                'cat': span.kind,
+                'ph': 'X',
+                'ts': span.start_ns // 1000,
+                'dur': (span.end_ns - span.start_ns) // 1000,
+                'pid': 1,
+                'tid': tid,
+                'args': args
+            })
+        for thread, tid in threads.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid,
+                           'args': {'name': thread}})
+        return {'traceEvents': events, 'otherData': {'execution_id': self.execution_id}}
+
+    def to_otlp(self) -> Dict:
+        """
+        Traza en formato OpenTelemetry JSON (OTLP/HTTP, resourceSpans)
+
+        Returns:
+            Diccionario listo para enviar a un colector OTLP o guardar
+        """
+        spans = []
+        for span in self.finished_spans():
+            attributes = [{'key': key, 'value': _otlp_value(value)}
+                          for key, value in span.attributes.items()]
+            attributes.append({'key': 'thread.name', 'value': {'stringValue': span.thread}})
+            spans.append({
+                'traceId': self.trace_id,
+                'spanId': span.span_id,
+                'parentSpanId': span.parent.span_id if span.parent else '',
+                'name': span.name,
+                'kind': 1,
+                'startTimeUnixNano': str(span.start_ns),
+                'endTimeUnixNano': str(span.end_ns),
+                'attributes': attributes,
+                # 1 = OK, 2 = ERROR
+                'status': {'code': 2, 'message': span.error} if span.error else {'code': 1}
+            })
+        return {'resourceSpans': [{
+            'resource': {'attributes': [
+                {'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+            'scopeSpans': [{'scope': {'name': SERVICE_NAME}, 'spans': spans}]
+        }]}
+
+
+def _otlp_value(value) -> Dict:
+    """Convierte un valor de atributo al formato AnyValue de OTLP"""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+# Span abierto en el hilo o tarea actual
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Tracer:
+    """Registra los spans de la ejecución en curso"""
+
+    def __init__(self, enabled: bool = TRACE_ENABLED):
+        self.enabled = enabled
+
+    @contextmanager
+    def trace(self, execution_id: str):
+        """
+        Abre la traza de una ejecución (span raíz)
+
+        Yields:
+            Trace con los spans registrados durante el bloque (None si está deshabilitado)
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        trace = Trace(execution_id)
+        token = _current_span.set(trace.root)
+        try:
+            yield trace
+        except BaseException as e:
+            trace.root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._close_until(trace.root)
+            _current_span.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """
+        Mide un bloque como span hijo del span actual; las excepciones
+        quedan registradas como error. Fuera de una traza no hace nada
+
+        Args:
+            name: Nombre del span (p. ej. ftp.stor, descubrimiento)
+            **attributes: Atributos del span
+        """
+        parent = _current_span.get()
+        # Los spans que empiezan con la traza ya cerrada (p. ej. notificaciones
+        # entregadas después de terminar la ejecución) se descartan
+        if parent is None or parent.trace.root.end_ns is not None:
+            yield None
+            return
+
+        span = Span(parent.trace, name, parent, attributes)
+        parent.trace.add(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._close_until(span)
+            _current_span.reset(token)
+
+    def mark_stage(self, stage: Optional[str], **attributes):
+        """
+        Cierra el span de la etapa en curso y abre el de la siguiente,
+        como hijo del bloque que contiene las etapas
+
+        Args:
+            stage: Etapa que empieza (None para cerrar la última)
+            **attributes: Atributos del span de la etapa
+        """
+        current = _current_span.get()
+        if current is None:
+            return
+        if current.kind == 'stage':
+            self._end(current)
+            current = current.parent
+        if stage is None:
+            _current_span.set(current)
+            return
+        span = Span(current.trace, stage, current, attributes, kind='stage')
+        current.trace.add(span)
+        _current_span.set(span)
+
+    def set_attributes(self, **attributes):
+        """Añade atributos al span actual"""
+        span = _current_span.get()
+        if span is not None:
+            span.attributes.update(attributes)
+
+    def set_error(self, message: str):
+        """Marca el span actual como fallido"""
+        span = _current_span.get()
+        if span is not None:
+            span.error = message
+
+    def _close_until(self, span: Span):
+        """Cierra el span y las etapas que hayan quedado abiertas dentro de él"""
+        open_span = _current_span.get()
+        while open_span is not None and open_span is not span:
+            if open_span.kind == 'stage':
+                self._end(open_span)
+            open_span = open_span.parent
+        self._end(span)
+
+    @staticmethod
+    def _end(span: Span):
+        if span.end_ns is None:
+            span.end_ns = time.time_ns()
+
+    def save(self, trace: Trace, directory: Path = TRACE_DIR,
+             trace_format: str = TRACE_FORMAT) -> Optional[Path]:
+        """
+        Escribe la traza en un archivo JSON y elimina las de más de LOG_RETENTION_DAYS días
+
+        Args:
+            trace: Traza a guardar
+            directory: Carpeta de destino
+            trace_format: 'chrome' u 'otlp'
+
+        Returns:
+            Ruta del archivo escrito o None
+        """
+        if trace_format == 'otlp':
+            path = Path(directory) / f"trace_{trace.execution_id}.otlp.json"
+            data = trace.to_otlp()
+        else:
+            path = Path(directory) / f"trace_{trace.execution_id}.json"
+            data = trace.to_chrome()
+
+        tmp_path = path.with_suffix('.tmp')
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(data, ensure_ascii=False, default=str), encoding='utf-8')
+            os.replace(tmp_path, path)
+            logger.info("🧵 Traza guardada en %s", path)
+        except OSError as e:
+            logger.error("❌ No se pudo guardar la traza en %s: %s", path, e)
+            return None
+
+        cutoff = time.time() - LOG_RETENTION_DAYS * 86400
+        for old in Path(directory).glob("trace_*.json"):
+            try:
+                if old.stat().st_mtime < cutoff:
+                    old.unlink()
+            except OSError:
+                pass
+        return path
+
+
+# Trazador compartido por todos los servicios
+tracer = Tracer()